@@ -0,0 +1,139 @@
+"""
+Local Detector Benchmark
+
+Runs the ONNX detector on synthetic frames with one intra-op thread and
+reports frames per second per core, split into pre-processing, inference and
+post-processing. Use a real export (e.g. yolov8n.onnx) for representative
+numbers; --synthetic-model builds a tiny YOLOv8-shaped graph (needs the
+`onnx` package) to measure the NumPy pipeline overhead alone.
+
+Usage:
+    uv run --extra detector python benchmarks/detector.py --model yolov8n.onnx
+    uv run --extra detector --with onnx python benchmarks/detector.py --synthetic-model
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.vision.detector import COCO_LABELS, OnnxDetector  # noqa: E402
+
+RESOLUTIONS = {"480p": (480, 640), "720p": (720, 1280), "1080p": (1080, 1920)}
+
+
+def synthetic_frames(height: int, width: int, count: int = 16) -> list[np.ndarray]:
+    """Noise plus a few flat rectangles, so frames differ like a moving camera"""
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        for _ in range(4):
+            y, x = rng.integers(0, height // 2), rng.integers(0, width // 2)
+            frame[y : y + height // 3, x : x + width // 3] = rng.integers(0, 255, 3)
+        frames.append(frame)
+    return frames
+
+
+def build_synthetic_model(path: Path, input_size: int) -> None:
+    """Tiny graph with YOLOv8's input/output shapes: pool -> 1x1 conv -> (1, 84, N)"""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    classes = len(COCO_LABELS)
+    weights = np.random.default_rng(0).normal(0, 1, (4 + classes, 3, 1, 1)).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node(
+                "AveragePool", ["images"], ["pooled"], kernel_shape=[8, 8], strides=[8, 8]
+            ),
+            helper.make_node("Conv", ["pooled", "w"], ["conv"]),
+            helper.make_node("Sigmoid", ["conv"], ["act"]),
+            helper.make_node("Reshape", ["act", "shape"], ["output0"]),
+        ],
+        "synthetic_yolo",
+        [
+            helper.make_tensor_value_info(
+                "images", TensorProto.FLOAT, [1, 3, input_size, input_size]
+            )
+        ],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, 4 + classes, None])],
+        initializer=[
+            numpy_helper.from_array(weights, "w"),
+            numpy_helper.from_array(np.array([1, 4 + classes, -1], dtype=np.int64), "shape"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+def bench(detector: OnnxDetector, frames: list[np.ndarray], iterations: int) -> dict[str, float]:
+    pre, infer, post = [], [], []
+    for i in range(iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        tensor, scale, pad_x, pad_y = detector.preprocess(frame)
+        t1 = time.perf_counter()
+        output = detector.session.run(None, {detector.input_name: tensor})[0]
+        t2 = time.perf_counter()
+        detector.postprocess(output, scale, pad_x, pad_y, frame.shape[:2])
+        t3 = time.perf_counter()
+        pre.append(t1 - t0)
+        infer.append(t2 - t1)
+        post.append(t3 - t2)
+    total = statistics.median(a + b + c for a, b, c in zip(pre, infer, post))
+    return {
+        "pre_ms": statistics.median(pre) * 1000,
+        "infer_ms": statistics.median(infer) * 1000,
+        "post_ms": statistics.median(post) * 1000,
+        "fps_per_core": 1.0 / total,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default=os.environ.get("DETECTOR_MODEL_PATH", ""))
+    parser.add_argument("--synthetic-model", action="store_true")
+    parser.add_argument("--input-size", type=int, default=640)
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS),
+                        choices=list(RESOLUTIONS))
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--min-fps", type=float, default=0.0,
+                        help="exit non-zero when fps/core falls below this at any resolution")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if args.synthetic_model:
+            model_path = str(Path(tmp) / "synthetic.onnx")
+            build_synthetic_model(Path(model_path), args.input_size)
+        if not model_path:
+            print("Pass --model PATH (or DETECTOR_MODEL_PATH) or --synthetic-model",
+                  file=sys.stderr)
+            return 1
+
+        detector = OnnxDetector(model_path, input_size=args.input_size, threads=1)
+        print(f"model: {model_path}  input: {args.input_size}  threads: 1")
+        print(f"{'frame':<8}{'pre ms':>9}{'infer ms':>10}{'post ms':>9}{'fps/core':>10}")
+        failed = False
+        for name in args.resolutions:
+            frames = synthetic_frames(*RESOLUTIONS[name])
+            bench(detector, frames, args.warmup)
+            r = bench(detector, frames, args.iterations)
+            print(f"{name:<8}{r['pre_ms']:>9.2f}{r['infer_ms']:>10.2f}{r['post_ms']:>9.2f}"
+                  f"{r['fps_per_core']:>10.1f}")
+            failed |= r["fps_per_core"] < args.min_fps
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
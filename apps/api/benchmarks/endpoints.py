@@ -0,0 +1,254 @@
+"""
+Coach Router Benchmark
+
+Drives the ASGI app in process (no network) against synthetic script corpora
+and reports p50/p95/p99 latency, requests per second and allocated memory per
+request for every coach endpoint. Results can be saved as a baseline and
+compared on later runs.
+
+Usage:
+    uv run python benchmarks/endpoints.py --sizes 10 100 1000
+    uv run python benchmarks/endpoints.py --save-baseline
+    uv run python benchmarks/endpoints.py --compare --max-regression 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional, get_args
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("CONTENT_HOT_RELOAD", "false")
+# 1つのクライアントから連続で叩くため、受付制御 (429/503) を外して処理時間だけを測る
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from src.main import app  # noqa: E402
+from src.models.coach import Level, Mode, Scenario  # noqa: E402
+from src.services.prompt_cache import prompt_cache  # noqa: E402
+from src.services.script_catalog import SCRIPTS_DIR, script_catalog  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+WORDS = (
+    "hello coffee table please thank you would like order check flight hotel room "
+    "reservation morning evening ticket window seat menu water tea price size "
+    "question answer meeting project schedule tomorrow today station left right"
+).split()
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    path: str
+    body: Optional[dict] = None
+
+
+@dataclass
+class Result:
+    name: str
+    corpus: int
+    requests: int
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    rps: float
+    alloc_kib: float
+
+
+def build_corpus(directory: Path, size: int, seed: int = 0) -> list[str]:
+    """Write `size` synthetic scripts modeled on the bundled ones"""
+    rng = random.Random(seed)
+    templates = [json.loads(p.read_text(encoding="utf-8")) for p in SCRIPTS_DIR.glob("*.json")]
+    ids = []
+    for i in range(size):
+        data = dict(templates[i % len(templates)])
+        script_id = f"synthetic-{i:05d}"
+        line_count = rng.randint(8, 24)
+        data.update(
+            id=script_id,
+            title=f"Synthetic {' '.join(rng.sample(WORDS, 3)).title()}",
+            difficulty=rng.choice(["beginner", "intermediate", "advanced"]),
+            category=rng.choice(["daily", "travel", "business"]),
+            estimated_minutes=rng.randint(2, 15),
+            lines=[
+                {
+                    "id": n + 1,
+                    "speaker": "partner" if n % 2 == 0 else "user",
+                    "text": " ".join(rng.choices(WORDS, k=rng.randint(4, 14))).capitalize() + ".",
+                }
+                for n in range(line_count)
+            ],
+        )
+        (directory / f"{script_id}.json").write_text(json.dumps(data), encoding="utf-8")
+        ids.append(script_id)
+    return ids
+
+
+def build_cases(script_ids: list[str]) -> list[Case]:
+    cases = [
+        Case("health", "GET", "/health"),
+        Case("scenarios", "GET", "/api/coach/scenarios"),
+        Case("scripts", "GET", "/api/coach/scripts"),
+        Case("scripts:facets", "GET",
+             "/api/coach/scripts?category=travel&difficulty=beginner&min_minutes=3&limit=20"),
+        Case("scripts:search", "GET", "/api/coach/scripts?q=coffee+please&limit=20"),
+        Case("scripts:search-prefix", "GET", "/api/coach/scripts?q=reserv&category=daily&limit=20"),
+        Case("script", "GET", f"/api/coach/scripts/{script_ids[len(script_ids) // 2]}"),
+        Case("score:line", "POST", f"/api/coach/scripts/{script_ids[0]}/score",
+             {"transcript": " ".join(WORDS[:8]), "line_id": 2}),
+        Case("score:best-line", "POST", f"/api/coach/scripts/{script_ids[0]}/score",
+             {"transcript": " ".join(WORDS[:8])}),
+        Case("score:session", "POST", f"/api/coach/scripts/{script_ids[0]}/score/session",
+             {"utterances": [" ".join(WORDS[i : i + 8]) for i in range(0, 48, 4)]}),
+    ]
+    for mode in get_args(Mode):
+        for level in get_args(Level):
+            if mode == "script":
+                body = {"mode": mode, "level": level, "script_id": script_ids[0]}
+                cases.append(Case(f"config:{mode}:{level}", "POST",
+                                  "/api/coach/voice-agent/config", body))
+                continue
+            for scenario in get_args(Scenario):
+                body = {"mode": mode, "level": level, "scenario": scenario}
+                cases.append(Case(f"config:{mode}:{level}:{scenario}", "POST",
+                                  "/api/coach/voice-agent/config", body))
+    return cases
+
+
+async def run_case(client: httpx.AsyncClient, case: Case, corpus: int,
+                   requests: int, warmup: int) -> Result:
+    async def send() -> None:
+        response = await client.request(case.method, case.path, json=case.body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{case.name}: HTTP {response.status_code}")
+
+    for _ in range(warmup):
+        await send()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter_ns()
+        await send()
+        latencies.append((time.perf_counter_ns() - t0) / 1000)
+    elapsed = time.perf_counter() - started
+
+    # 割り当て計測はtracemallocのオーバーヘッドがあるためレイテンシ計測と分ける
+    alloc_samples = []
+    tracemalloc.start()
+    for _ in range(min(requests, 50)):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        await send()
+        _, peak = tracemalloc.get_traced_memory()
+        alloc_samples.append(peak - base)
+    tracemalloc.stop()
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return Result(
+        name=case.name,
+        corpus=corpus,
+        requests=requests,
+        p50_us=round(quantiles[49], 1),
+        p95_us=round(quantiles[94], 1),
+        p99_us=round(quantiles[98], 1),
+        rps=round(requests / elapsed, 1),
+        alloc_kib=round(statistics.median(alloc_samples) / 1024, 1),
+    )
+
+
+async def run(sizes: list[int], requests: int, warmup: int, only: Optional[str]) -> list[Result]:
+    results = []
+    original_dir = script_catalog.scripts_dir
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size in sizes:
+                with tempfile.TemporaryDirectory() as tmp:
+                    script_ids = build_corpus(Path(tmp), size)
+                    script_catalog.scripts_dir = Path(tmp)
+                    script_catalog.load()
+                    prompt_cache.clear()
+                    prompt_cache.warm()
+                    for case in build_cases(script_ids):
+                        if only and only not in case.name:
+                            continue
+                        results.append(await run_case(client, case, size, requests, warmup))
+    finally:
+        script_catalog.scripts_dir = original_dir
+    return results
+
+
+def print_results(results: list[Result], baseline: dict[str, dict]) -> dict[str, float]:
+    """Print a table and return the p50 change per case compared to the baseline"""
+    header = (f"{'endpoint':<44} {'corpus':>6} {'p50 us':>9} {'p95 us':>9} "
+              f"{'p99 us':>9} {'req/s':>9} {'KiB/req':>8}")
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    deltas = {}
+    for r in results:
+        line = (f"{r.name:<44} {r.corpus:>6} {r.p50_us:>9.1f} {r.p95_us:>9.1f} "
+                f"{r.p99_us:>9.1f} {r.rps:>9.1f} {r.alloc_kib:>8.1f}")
+        base = baseline.get(f"{r.name}@{r.corpus}")
+        if base:
+            delta = (r.p50_us - base["p50_us"]) / base["p50_us"]
+            deltas[f"{r.name}@{r.corpus}"] = delta
+            line += f" {delta:>+11.1%}"
+        print(line)
+    return deltas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", help="run only cases whose name contains this string")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="fail --compare when any p50 is slower by more than this ratio")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.requests, args.warmup, args.only))
+
+    baseline = {}
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"Baseline not found: {args.baseline}", file=sys.stderr)
+            return 1
+        baseline = json.loads(args.baseline.read_text())
+
+    deltas = print_results(results, baseline)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(
+            {f"{r.name}@{r.corpus}": asdict(r) for r in results}, indent=2, sort_keys=True
+        ) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.compare:
+        regressions = {k: d for k, d in deltas.items() if d > args.max_regression}
+        for key, delta in regressions.items():
+            print(f"REGRESSION: {key} p50 {delta:+.1%}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Response Serialization Benchmark
+
+Measures the CPU time spent turning the largest coach responses into bytes,
+comparing the per-request model path (build the response model, then encode
+it the way FastAPI does: jsonable_encoder + json.dumps on FastAPI < 0.130,
+pydantic's JSON serializer on newer releases) with the prebuilt path
+(payload serialized once, per-request fields merged into the bytes).
+
+Usage:
+    uv run python benchmarks/serialization.py
+    uv run python benchmarks/serialization.py --iterations 20000 --lines 60
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("CONTENT_HOT_RELOAD", "false")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from src.models.coach import (  # noqa: E402
+    SessionBootstrapBatchResponse,
+    SessionBootstrapResponse,
+    SessionPrefetchResponse,
+    VoiceAgentConfigResponse,
+    VoiceAgentSessionConfig,
+)
+from src.models.script import Script  # noqa: E402
+from src.services.fast_json import ORJSONResponse, merge_json, model_bytes  # noqa: E402
+from src.services.prompt_cache import prompt_cache  # noqa: E402
+from src.services.script_catalog import script_catalog  # noqa: E402
+
+CREDENTIALS = {"api_key": "x" * 40, "auth_scheme": "bearer", "expires_in": 60, "min_remaining": 15}
+
+
+def cpu_us(fn: Callable[[], object], iterations: int) -> float:
+    """CPU time per call in microseconds"""
+    for _ in range(min(iterations, 200)):
+        fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def fastapi_legacy(model) -> bytes:
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fastapi_pydantic(model) -> bytes:
+    # 新しいFastAPIは応答モデルを再検証してからpydanticで直接JSON化する
+    return type(model).model_validate(model.model_dump()).model_dump_json().encode()
+
+
+def large_script(lines: int) -> Script:
+    """The longest bundled script, repeated up to `lines` lines"""
+    base = max(script_catalog.snapshot.scripts.values(), key=lambda s: len(s.lines))
+    source = [base.lines[i % len(base.lines)] for i in range(lines)]
+    return base.model_copy(update={
+        "lines": [line.model_copy(update={"id": i + 1}) for i, line in enumerate(source)]
+    })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=40, help="lines in the benchmark script")
+    parser.add_argument("--batch", type=int, default=10, help="sessions in the batch bootstrap")
+    args = parser.parse_args()
+
+    compiled = max(
+        (prompt_cache.get("situation", level, scenario)
+         for level in ("beginner", "intermediate", "advanced")
+         for scenario in ("restaurant", "directions", "hotel", "shopping")),
+        key=lambda c: len(c.prompt),
+    )
+    script = large_script(args.lines)
+    script_json = model_bytes(script)
+
+    def config_model() -> VoiceAgentConfigResponse:
+        return VoiceAgentConfigResponse(
+            **CREDENTIALS, prompt=compiled.prompt, greeting=compiled.greeting,
+            prompt_tokens=compiled.tokens,
+        )
+
+    def bootstrap_model() -> SessionBootstrapResponse:
+        return SessionBootstrapResponse(script=script, config=config_model())
+
+    def bootstrap_bytes() -> bytes:
+        config = merge_json(CREDENTIALS, compiled.config_json)
+        return b'{"script":' + script_json + b',"config":' + config + b"}"
+
+    def prefetch_model() -> SessionPrefetchResponse:
+        return SessionPrefetchResponse(script=script, config=VoiceAgentSessionConfig(
+            prompt=compiled.prompt, greeting=compiled.greeting, prompt_tokens=compiled.tokens,
+        ))
+
+    def prefetch_bytes() -> bytes:
+        return b'{"script":' + script_json + b',"config":' + compiled.config_json + b"}"
+
+    def batch_model() -> SessionBootstrapBatchResponse:
+        return SessionBootstrapBatchResponse(
+            sessions=[prefetch_model() for _ in range(args.batch)]
+        )
+
+    def batch_bytes() -> bytes:
+        return b'{"sessions":[' + b",".join(prefetch_bytes() for _ in range(args.batch)) + b"]}"
+
+    stats = {"active_calls": 12, "warm_agents": 4,
+             "calls": [{"call_id": f"call-{i}", "rss_mb": 180.5 + i} for i in range(50)]}
+
+    cases = [
+        ("voice-agent config", lambda: fastapi_legacy(config_model()),
+         lambda: fastapi_pydantic(config_model()),
+         lambda: merge_json(CREDENTIALS, compiled.config_json)),
+        ("session bootstrap (script)", lambda: fastapi_legacy(bootstrap_model()),
+         lambda: fastapi_pydantic(bootstrap_model()), bootstrap_bytes),
+        (f"bootstrap batch x{args.batch}", lambda: fastapi_legacy(batch_model()),
+         lambda: fastapi_pydantic(batch_model()), batch_bytes),
+        ("agent stats (dict)", lambda: JSONResponse(stats).body,
+         lambda: JSONResponse(stats).body, lambda: ORJSONResponse(stats).body),
+    ]
+
+    # 出力が同じJSONになることを確認してから計測する
+    for name, legacy, _, fast in cases:
+        if json.loads(legacy()) != json.loads(fast()):
+            print(f"{name}: prebuilt output differs from the model output", file=sys.stderr)
+            return 1
+
+    print(f"prompt: {len(compiled.prompt)} chars, script: {len(script.lines)} lines, "
+          f"{args.iterations} iterations")
+    header = (f"{'response':<30}{'bytes':>8}{'legacy us':>11}{'pydantic us':>13}"
+              f"{'prebuilt us':>13}{'saved':>8}")
+    print(header)
+    print("-" * len(header))
+    for name, legacy, pydantic_path, fast in cases:
+        iterations = max(args.iterations // 10, 100) if "batch" in name else args.iterations
+        legacy_us = cpu_us(legacy, iterations)
+        pydantic_us = cpu_us(pydantic_path, iterations)
+        fast_us = cpu_us(fast, iterations)
+        saved = 1 - fast_us / min(legacy_us, pydantic_us)
+        print(f"{name:<30}{len(fast()):>8}{legacy_us:>11.1f}{pydantic_us:>13.1f}"
+              f"{fast_us:>13.1f}{saved:>8.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Startup Benchmark
+
+Measures cold start of the API: time from process launch to the first
+`/health` 200, plus a per-module import-time breakdown of `src.main`.
+Both launch paths are timed: plain `uvicorn src.main:app` (local development)
+and the pre-fork `python -m src.server` the Docker image runs, which preloads
+content and freezes the heap before forking its workers.
+Exits non-zero when the budget is exceeded or a heavy SDK is imported eagerly.
+
+Usage:
+    uv run python benchmarks/startup.py --runs 5 --max-startup-ms 2500 --workers 2
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent
+
+# コーチAPIの起動経路で読み込まれてはいけないSDK
+FORBIDDEN_MODULES = ("getstream", "deepgram", "vision_agents", "google.genai", "numpy")
+
+IMPORT_TIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(**overrides: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(API_DIR)
+    env.setdefault("CONTENT_HOT_RELOAD", "false")
+    env.update(overrides)
+    return env
+
+
+def _uvicorn_command(port: int, workers: int) -> tuple[list[str], dict[str, str]]:
+    command = [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port),
+               "--log-level", "warning"]
+    return command, _env()
+
+
+def _server_command(port: int, workers: int) -> tuple[list[str], dict[str, str]]:
+    # Docker イメージと同じ起動経路 (プリロード + gc.freeze + fork)
+    command = [sys.executable, "-m", "src.server"]
+    return command, _env(HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY=str(workers))
+
+
+LAUNCHERS = {
+    "uvicorn src.main:app": _uvicorn_command,
+    "python -m src.server": _server_command,
+}
+
+
+def measure_startup(launcher: str, timeout: float, workers: int = 1) -> float:
+    """Launch the server and return seconds until /health answers 200"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    command, env = LAUNCHERS[launcher](port, workers)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        command,
+        cwd=API_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.005)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        # src.server は全ワーカーの graceful shutdown を待ってから終了する
+        proc.wait(timeout=60)
+
+
+def import_breakdown() -> list[tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for `import src.main`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=API_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def loaded_forbidden_modules() -> list[str]:
+    """Heavy SDK modules that are imported by `import src.main`"""
+    code = (
+        "import sys, src.main;"
+        f"print('\\n'.join(m for m in sys.modules if m.split('.')[0] in {FORBIDDEN_MODULES!r}"
+        f" or m in {FORBIDDEN_MODULES!r}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=API_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--top", type=int, default=15, help="modules to show in breakdown")
+    parser.add_argument("--max-startup-ms", type=float, default=2500.0,
+                        help="fail when median launch-to-/health exceeds this")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="WEB_CONCURRENCY for the src.server case")
+    parser.add_argument("--max-import-ms", type=float, default=1000.0,
+                        help="fail when `import src.main` exceeds this")
+    args = parser.parse_args()
+
+    failures = []
+
+    rows = import_breakdown()
+    total_import_ms = max((cumulative for _, _, cumulative in rows), default=0) / 1000
+    print(f"import src.main: {total_import_ms:.1f} ms")
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[
+        : args.top
+    ]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}")
+    if total_import_ms > args.max_import_ms:
+        failures.append(f"import time {total_import_ms:.1f} ms > {args.max_import_ms} ms")
+
+    forbidden = loaded_forbidden_modules()
+    if forbidden:
+        failures.append(f"heavy SDKs imported at startup: {', '.join(sorted(forbidden))}")
+
+    print()
+    for launcher in LAUNCHERS:
+        samples = [
+            measure_startup(launcher, args.timeout, args.workers) * 1000
+            for _ in range(args.runs)
+        ]
+        median = statistics.median(samples)
+        print(f"{launcher}: launch to /health 200 over {args.runs} runs: "
+              f"median {median:.1f} ms, min {min(samples):.1f} ms, max {max(samples):.1f} ms")
+        if median > args.max_startup_ms:
+            failures.append(f"{launcher} startup {median:.1f} ms > {args.max_startup_ms} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
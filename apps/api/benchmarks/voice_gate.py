@@ -0,0 +1,92 @@
+"""
+Voice Gate Benchmark
+
+Runs the relay's voice gate over a synthetic practice session: background
+noise with short utterances separated by long thinking pauses, streamed in
+the browser's 4096-sample (256ms) linear16 chunks. Reports the bytes kept
+from the agent, the KeepAlive messages sent instead, the processing time the
+gate adds per chunk, and whether every utterance onset was forwarded (pre-roll
+included) without clipping.
+
+Usage:
+    uv run --extra relay python benchmarks/voice_gate.py
+    uv run --extra relay python benchmarks/voice_gate.py --minutes 10 --noise-db -45
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.voice_gate import VoiceGate  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK = 4096
+
+
+def synthetic_session(
+    minutes: float, noise_db: float, speech_db: float, rng: np.random.Generator
+) -> tuple[np.ndarray, list[int]]:
+    """PCM samples and the sample index of each utterance onset"""
+    total = int(minutes * 60 * SAMPLE_RATE)
+    noise = rng.normal(0, 32768 * 10 ** (noise_db / 20), total)
+    onsets = []
+    position = int(rng.uniform(2, 5) * SAMPLE_RATE)
+    while position < total - 4 * SAMPLE_RATE:
+        length = int(rng.uniform(1.0, 4.0) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        # 声帯の基本周波数と倍音、音節ごとの抑揚
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = np.abs(np.sin(np.pi * t * rng.uniform(2, 4))) ** 0.5
+        noise[position : position + length] += voiced * envelope * 32768 * 10 ** (speech_db / 20)
+        onsets.append(position)
+        # 次の発話まで考える時間
+        position += length + int(rng.uniform(3, 12) * SAMPLE_RATE)
+    return np.clip(noise, -32768, 32767).astype("<i2"), onsets
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--noise-db", type=float, default=-60.0)
+    parser.add_argument("--speech-db", type=float, default=-20.0)
+    args = parser.parse_args()
+
+    samples, onsets = synthetic_session(args.minutes, args.noise_db, args.speech_db,
+                                        np.random.default_rng(0))
+    chunks = [samples[i : i + CHUNK].tobytes() for i in range(0, len(samples), CHUNK)]
+    gate = VoiceGate(sample_rate=SAMPLE_RATE)
+
+    # 転送されたチャンクの開始サンプル位置を記録して、発話の頭が送られたか確認する
+    chunk_start = {id(chunk): i * CHUNK for i, chunk in enumerate(chunks)}
+    sent_starts = set()
+    for i, chunk in enumerate(chunks):
+        now = i * CHUNK / SAMPLE_RATE
+        for message in gate.process(chunk, now):
+            if isinstance(message, bytes):
+                sent_starts.add(chunk_start[id(message)])
+
+    clipped = [o for o in onsets if (o // CHUNK) * CHUNK not in sent_starts]
+    stats = gate.stats
+    duration = len(samples) / SAMPLE_RATE
+    print(f"session: {duration:.0f}s, {len(onsets)} utterances, noise {args.noise_db}dBFS, "
+          f"speech {args.speech_db}dBFS")
+    print(f"bytes in        {stats.bytes_in:>12,}")
+    print(f"bytes forwarded {stats.bytes_forwarded:>12,}")
+    print(f"bytes saved     {stats.bytes_saved:>12,} ({stats.saved_ratio:.0%})")
+    print(f"keepalives      {stats.keepalives:>12}")
+    print(f"onsets detected {stats.onsets:>12}")
+    print(f"added latency   {stats.mean_latency_ms:>12.3f} ms/chunk "
+          f"(max {stats.max_processing_seconds * 1000:.3f} ms)")
+    if clipped:
+        print(f"{len(clipped)} utterance onsets were not forwarded", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Voice Relay Benchmark
+
+Measures time-to-first-audio (TTFA) of a voice session against a local fake
+Voice Agent server: from opening the WebSocket until the first agent audio
+frame answering the first microphone frame. Three paths are compared:
+
+    direct  the browser's current path: dial the agent, send Settings, wait
+            for SettingsApplied, then stream audio
+    cold    through /api/coach/voice-agent/relay with the pool disabled
+    warm    through the relay with a pre-opened, pre-configured connection
+
+The fake server simulates the network and setup costs of the real service
+(--handshake-ms per connection, --settings-ms per Settings message) and
+answers audio after --response-ms.
+
+Usage:
+    uv run python benchmarks/voice_relay.py
+    uv run python benchmarks/voice_relay.py --runs 50 --handshake-ms 250 --settings-ms 400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+AUDIO_FRAME = b"\x00\x01" * 4096  # 4096 サンプル (256ms, 16kHz linear16)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeAgent:
+    """Minimal stand-in for the Deepgram Voice Agent WebSocket API"""
+
+    def __init__(self, handshake: float, settings: float, response: float):
+        self.handshake = handshake
+        self.settings = settings
+        self.response = response
+        self.connections = 0
+        self.settings_messages = 0
+
+    async def process_request(self, connection, request):
+        # TLS + WebSocket ハンドシェイクの往復を模す
+        await asyncio.sleep(self.handshake)
+        return None
+
+    async def handler(self, connection) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        self.connections += 1
+        try:
+            await connection.send(json.dumps({"type": "Welcome", "request_id": "fake"}))
+            answered = False
+            async for message in connection:
+                if isinstance(message, str):
+                    data = json.loads(message)
+                    if data.get("type") == "Settings":
+                        self.settings_messages += 1
+                        await asyncio.sleep(self.settings)
+                        await connection.send(json.dumps({"type": "SettingsApplied"}))
+                        if "greeting" in data["agent"]:
+                            await connection.send(AUDIO_FRAME)
+                    continue
+                if not answered:
+                    answered = True
+                    await asyncio.sleep(self.response)
+                    await connection.send(json.dumps({"type": "AgentStartedSpeaking"}))
+                    for _ in range(3):
+                        await connection.send(AUDIO_FRAME)
+        except ConnectionClosed:
+            # 計測側は最初の音声を受け取った時点で切断する
+            pass
+
+
+async def first_audio(url: str, settings: Optional[str] = None) -> float:
+    """Seconds from connecting until the agent answers the first audio frame"""
+    from websockets.asyncio.client import connect
+
+    started = time.perf_counter()
+    async with connect(url, compression=None, max_size=None) as connection:
+        if settings is not None:
+            await connection.send(settings)
+            while True:
+                reply = await connection.recv()
+                if isinstance(reply, str) and json.loads(reply)["type"] == "SettingsApplied":
+                    break
+        await connection.send(AUDIO_FRAME)
+        while True:
+            reply = await connection.recv()
+            if isinstance(reply, bytes):
+                return time.perf_counter() - started
+
+
+def summarize(name: str, samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"{name:<8}{statistics.median(samples) * 1000:>10.1f}{p95 * 1000:>10.1f}"
+            f"{min(samples) * 1000:>10.1f}")
+
+
+async def run(args: argparse.Namespace) -> int:
+    import uvicorn
+    from websockets.asyncio.server import serve
+
+    fake = FakeAgent(args.handshake_ms / 1000, args.settings_ms / 1000, args.response_ms / 1000)
+    agent_port, api_port = _free_port(), _free_port()
+    os.environ.update({
+        "DEEPGRAM_AGENT_URL": f"ws://127.0.0.1:{agent_port}",
+        "DEEPGRAM_API_KEY": "benchmark",
+        "VOICE_RELAY_ENABLED": "true",
+        "DEEPGRAM_TOKEN_BROKER": "false",
+        "GREETING_AUDIO_ENABLED": "false",
+        "SESSION_STORE_ENABLED": "false",
+        "CONTENT_HOT_RELOAD": "false",
+        "AGENT_WARM_POOL_SIZE": "0",
+        "ADMISSION_ENABLED": "false",
+    })
+    from src.main import app
+    from src.services.prompt_cache import prompt_cache
+    from src.services.voice_relay import agent_settings, upstream_pool
+
+    async with serve(fake.handler, "127.0.0.1", agent_port, process_request=fake.process_request,
+                     compression=None, max_size=None):
+        server = uvicorn.Server(uvicorn.Config(app, port=api_port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        compiled = prompt_cache.get("situation", "beginner", "restaurant")
+        # 挨拶はキャッシュ済み音声で再生する前提 (どの経路でも最初の音声は発話への応答)
+        key, settings_message = agent_settings(compiled.config_json, False)
+        relay_url = (f"ws://127.0.0.1:{api_port}/api/coach/voice-agent/relay"
+                     f"?mode=situation&level=beginner&scenario=restaurant&greeting=played")
+
+        results = {"direct": [], "cold": [], "warm": []}
+        pool_size = upstream_pool.size
+        for _ in range(args.runs):
+            results["direct"].append(
+                await first_audio(f"ws://127.0.0.1:{agent_port}", settings_message)
+            )
+
+            upstream_pool.size = 0
+            results["cold"].append(await first_audio(relay_url))
+
+            upstream_pool.size = pool_size
+            upstream_pool.warm(key, settings_message)
+            # 前回の受け渡し後の補充が終わるまで待つ (実際の利用では利用者の操作の間に済む)
+            while not upstream_pool.idle_for(key):
+                await asyncio.sleep(0.01)
+            results["warm"].append(await first_audio(relay_url))
+
+        server.should_exit = True
+        await serving
+
+    print(f"fake agent: handshake {args.handshake_ms}ms, settings {args.settings_ms}ms, "
+          f"response {args.response_ms}ms, {args.runs} runs")
+    header = f"{'path':<8}{'p50 ms':>10}{'p95 ms':>10}{'min ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, samples in results.items():
+        print(summarize(name, samples))
+    print(f"warm pool hits: {upstream_pool.warm_hits}, cold opens: {upstream_pool.cold_opens}, "
+          f"agent connections: {fake.connections}, Settings sent: {fake.settings_messages}")
+    if upstream_pool.warm_hits < args.runs:
+        print("relay did not use the pre-opened connections", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=150.0)
+    parser.add_argument("--settings-ms", type=float, default=300.0)
+    parser.add_argument("--response-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
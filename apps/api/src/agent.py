@@ -1,9 +1,26 @@
+import asyncio
 import logging
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import Callable, Optional
 
 from vision_agents.core import Agent, User, cli
 from vision_agents.plugins import gemini, getstream
 
+from src.config import settings
+from src.models.detection import DetectedObject
+from src.services.detection_stream import detection_hub, parse_detections
+from src.vision import (
+    DetectionCache,
+    DetectionPrefilter,
+    Detector,
+    FrameGate,
+    ObjectAnnouncer,
+    ObjectTracker,
+    create_detector,
+    perceptual_hash,
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -25,8 +42,13 @@ Identify and announce ONLY physical objects you can clearly see in the video.
 5. DO NOT announce abstract concepts, backgrounds, or environments
 
 ## Response Format:
-- Keep it SHORT: "I see a laptop, a coffee mug, and a smartphone"
-- Use articles: "a" for singular, "some" for plural
+- Whenever the scene changes, call `report_objects` BEFORE saying anything, with
+  `detections` set to JSON like
+  {"objects": [{"name": "laptop", "confidence": "high"},
+               {"name": "coffee mug", "confidence": "medium"}]}
+  (confidence is "high", "medium" or "low")
+- Then say ONLY the sentence returned by `report_objects`, word for word
+- If it returns "SILENT", say nothing at all
 - Pronounce clearly and naturally
 
 ## What to Announce:
@@ -49,13 +71,144 @@ Identify and announce ONLY physical objects you can clearly see in the video.
 """
 
 
+class GatedRealtime(gemini.Realtime):
+    """gemini.Realtime that only forwards frames when the scene changed
+
+    Frames that look like a recently detected frame are not sent at all;
+    the cached result is diffed against what was already announced instead.
+    Detection results go through an ObjectTracker, whose smoothed states are
+    published to the overlay on every frame between LLM results.
+    """
+
+    def __init__(
+        self,
+        frame_gate: FrameGate,
+        detection_cache: DetectionCache,
+        announcer: ObjectAnnouncer,
+        tracker: ObjectTracker,
+        prefilter: Optional[DetectionPrefilter] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.frame_gate = frame_gate
+        self.detection_cache = detection_cache
+        self.announcer = announcer
+        self.tracker = tracker
+        self.prefilter = prefilter
+        # 通話参加時に設定され、検出結果をオーバーレイ配信へ渡す
+        self.detection_listener: Optional[Callable[[list[DetectedObject]], object]] = None
+        self._pending_hash: int | None = None
+        self._published: Optional[list[DetectedObject]] = None
+
+    async def _send_video_frame(self, frame) -> None:
+        try:
+            await self._gate_video_frame(frame)
+        finally:
+            # LLM の結果を待つ間も、追跡中の物体の状態をフレームごとに反映する
+            self._publish()
+
+    async def _gate_video_frame(self, frame) -> None:
+        # WebRTCのフレームはyuv420pのため、先頭のY平面だけを変換なしで使う
+        luma = frame.to_ndarray(format="yuv420p")[: frame.height]
+        if not self.frame_gate.should_send(luma):
+            return
+        frame_hash = perceptual_hash(luma)
+        cached = self.detection_cache.lookup(frame_hash)
+        if cached is not None:
+            # 見たことのある光景はLLMに送らず、キャッシュ結果との差分だけを話す
+            sentence = self._apply(list(cached))
+            if sentence:
+                await self._say(sentence)
+            return
+        if self.prefilter is not None:
+            # ローカル検出器の推論はイベントループの外で行う
+            rgb = frame.to_ndarray(format="rgb24")
+            send = await asyncio.to_thread(self.prefilter.should_send, rgb)
+            self.tracker.observe(self.prefilter.last_detections)
+            if not send:
+                return
+        self._pending_hash = frame_hash
+        await super()._send_video_frame(frame)
+
+    async def _say(self, sentence: str) -> None:
+        async for _ in self.simple_response(f'Say exactly: "{sentence}"'):
+            pass
+
+    def _publish(self) -> None:
+        """Send the tracked objects to the overlay when they changed"""
+        states = self.tracker.states()
+        if states == self._published or self.detection_listener is None:
+            return
+        self._published = states
+        self.detection_listener(states)
+
+    def _apply(self, objects: list[DetectedObject]) -> Optional[str]:
+        """Publish a detection result and return the sentence announcing changes"""
+        self.tracker.keyframe(objects)
+        self._publish()
+        return self.announcer.phrase(self.announcer.update(o.name for o in objects))
+
+    def report_objects(self, detections: str) -> str:
+        """Cache the detection for the last sent frame and return what to say"""
+        objects = parse_detections(detections)
+        if objects is None:
+            return 'Invalid format. Call report_objects again with {"objects": [...]}.'
+        if self._pending_hash is not None:
+            self.detection_cache.store(self._pending_hash, tuple(objects))
+        return self._apply(objects) or "SILENT"
+
+
+@lru_cache(maxsize=1)
+def get_detector() -> Optional[Detector]:
+    """Local detector shared by every agent in this process (model loaded once)"""
+    return create_detector(
+        settings.detector_model_path,
+        score_threshold=settings.detector_score_threshold,
+        threads=settings.detector_threads,
+    )
+
+
 def create_agent() -> Agent:
     """物体検出エージェントを作成"""
+    detector = get_detector()
+    frame_gate = FrameGate(
+        threshold=settings.frame_gate_threshold,
+        max_staleness=settings.frame_gate_max_staleness,
+    )
+    llm = GatedRealtime(
+        frame_gate=frame_gate,
+        detection_cache=DetectionCache(
+            max_entries=settings.detection_cache_size,
+            ttl=settings.detection_cache_ttl,
+            max_distance=settings.detection_hash_distance,
+        ),
+        announcer=ObjectAnnouncer(),
+        tracker=ObjectTracker(
+            iou_threshold=settings.tracker_iou_threshold,
+            half_life=settings.tracker_half_life,
+            # 静止した光景では最大経過時間ごとにしか結果が来ないため、その間は減衰させない
+            grace=settings.frame_gate_max_staleness,
+        ),
+        prefilter=DetectionPrefilter(
+            detector,
+            min_confidence=settings.detector_min_confidence,
+        ) if detector else None,
+        # シーン変化時のみ送信するため、応答性を上げつつ送信量は抑えられる
+        fps=settings.agent_video_fps,
+    )
+
+    @llm.register_function(
+        description="Report the objects visible in the current frame. "
+        "Returns the exact sentence to say, or SILENT if nothing changed."
+    )
+    async def report_objects(detections: str) -> str:
+        return llm.report_objects(detections)
+
     agent = Agent(
         edge=getstream.Edge(),
         agent_user=User(name="Object Detector", id="object-detector-agent"),
         instructions=INSTRUCTIONS,
-        llm=gemini.Realtime(fps=1),  # 1FPSに下げてメモリ使用量削減
+        llm=llm,
     )
 
     return agent
@@ -76,11 +229,15 @@ class ObjectDetectorLauncher:
             call_id=call_id,
         )
 
-        async with agent.join(call):
-            await agent.simple_response(
-                "I can see the video now. Let me tell you what objects I see."
-            )
-            await agent.finish()
+        agent.llm.detection_listener = partial(detection_hub.publish, call_id)
+        try:
+            async with agent.join(call):
+                await agent.simple_response(
+                    "I can see the video now. Let me tell you what objects I see."
+                )
+                await agent.finish()
+        finally:
+            detection_hub.close_call(call_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+"""
+Agent Worker
+
+Worker mode for the object detector: one process serves many concurrent
+calls from a warm pool of pre-built agents (see services/agent_pool.py).
+Unlike `python -m src.agent`, which runs one agent per process, this app
+only exposes the call endpoints and drains running calls on SIGTERM.
+
+Run with:
+    uv run --extra agent uvicorn src.agent_worker:app --port 8001
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from src.config import settings
+from src.routers import call_router
+from src.services.agent_pool import agent_pool
+from src.services.metrics import MetricsMiddleware, registry
+from src.services.stream_client import stream_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """エージェントを事前構築し、終了時は通話の完了を待ってから停止"""
+    await stream_client.start()
+    await agent_pool.start()
+    yield
+    await agent_pool.drain(settings.agent_drain_timeout)
+    await stream_client.close()
+
+
+app = FastAPI(title=f"{settings.app_name} (agent worker)", version="0.0.1", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/health")
+async def health_check():
+    """ヘルスチェックエンドポイント"""
+    return {"status": "healthy", **agent_pool.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus形式のメトリクス"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+app.include_router(call_router)
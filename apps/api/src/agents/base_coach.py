@@ -7,7 +7,9 @@ Generates system prompts for Deepgram Voice Agent.
 
 import logging
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Literal, Optional
+
+from ..services.prompt_compiler import CompiledPromptText, PromptBlock, compile_prompt
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +28,14 @@ class BaseCoach(ABC):
         """Return mode-specific instructions"""
         pass
 
+    def get_mode_blocks(self) -> list[PromptBlock]:
+        """Split the mode instructions into shared (mode) and per-session blocks
+
+        Subclasses should override this so that the rules shared by every
+        session of the mode come before the session-specific content.
+        """
+        return [PromptBlock("mode", self.get_mode_instructions(), scope="session")]
+
     def get_level_instructions(self) -> str:
         """Return level-specific instructions"""
         if self.level == "beginner":
@@ -74,6 +84,11 @@ You are an AI English conversation coach helping Japanese learners practice thei
 4. Provide feedback when appropriate
 5. Adapt to the learner's responses
 
+"""
+
+    def get_voice_style_instructions(self) -> str:
+        """Return delivery hints (the first block dropped to fit the token budget)"""
+        return """
 ## Voice Style
 - Speak clearly and naturally
 - Use appropriate intonation
@@ -81,15 +96,24 @@ You are an AI English conversation coach helping Japanese learners practice thei
 - Be expressive but not over-the-top
 """
 
+    def get_prompt_blocks(self) -> list[PromptBlock]:
+        """Return all instruction blocks with their sharing scope"""
+        return [
+            PromptBlock("base", self.get_base_instructions(), scope="global"),
+            PromptBlock(
+                "voice_style", self.get_voice_style_instructions(), scope="global", required=False
+            ),
+            PromptBlock("level", self.get_level_instructions(), scope="level"),
+            *self.get_mode_blocks(),
+        ]
+
+    def compile_instructions(self, budget: Optional[int] = None) -> CompiledPromptText:
+        """Compile the blocks into a prompt, optionally within a token budget"""
+        return compile_prompt(self.get_prompt_blocks(), budget)
+
     def get_full_instructions(self) -> str:
         """Combine all instruction components"""
-        return f"""
-{self.get_base_instructions()}
-
-{self.get_level_instructions()}
-
-{self.get_mode_instructions()}
-"""
+        return self.compile_instructions().text
 
     def get_greeting(self) -> str:
         """Return the initial greeting for the agent to speak first.
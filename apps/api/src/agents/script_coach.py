@@ -5,19 +5,17 @@ Guides users through predefined conversation scripts.
 The AI plays the partner role while the user practices their lines.
 """
 
-import json
 import logging
-from pathlib import Path
 from typing import Optional
 
 from .base_coach import BaseCoach, Level
+from ..services.prompt_compiler import PromptBlock
 from ..models.script import Script, ScriptInfo
+from ..services.script_catalog import script_catalog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SCRIPTS_DIR = Path(__file__).parent.parent / "data" / "scripts"
-
 
 class ScriptCoach(BaseCoach):
     """Coach for script-based conversation practice"""
@@ -32,39 +30,15 @@ class ScriptCoach(BaseCoach):
     @staticmethod
     def list_scripts() -> list[ScriptInfo]:
         """List all available scripts"""
-        scripts = []
-        for script_file in SCRIPTS_DIR.glob("*.json"):
-            try:
-                with open(script_file, encoding="utf-8") as f:
-                    data = json.load(f)
-                    scripts.append(ScriptInfo(
-                        id=data["id"],
-                        title=data["title"],
-                        title_ja=data["title_ja"],
-                        description=data["description"],
-                        difficulty=data["difficulty"],
-                        category=data["category"],
-                        estimated_minutes=data["estimated_minutes"],
-                        line_count=len(data["lines"])
-                    ))
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning(f"Failed to load script {script_file}: {e}")
-        return sorted(scripts, key=lambda s: (s.category, s.difficulty, s.title))
+        return script_catalog.list()
 
     @staticmethod
     def load_script(script_id: str) -> Optional[Script]:
         """Load a specific script by ID"""
-        script_file = SCRIPTS_DIR / f"{script_id}.json"
-        if not script_file.exists():
+        script = script_catalog.get(script_id)
+        if not script:
             logger.warning(f"Script not found: {script_id}")
-            return None
-        try:
-            with open(script_file, encoding="utf-8") as f:
-                data = json.load(f)
-                return Script(**data)
-        except (json.JSONDecodeError, KeyError) as e:
-            logger.error(f"Failed to load script {script_id}: {e}")
-            return None
+        return script
 
     def get_script_content_for_prompt(self) -> str:
         """Format script content for the AI prompt"""
@@ -78,26 +52,17 @@ class ScriptCoach(BaseCoach):
 
         return "\n".join(lines)
 
-    def get_mode_instructions(self) -> str:
-        """Return script mode specific instructions"""
+    def get_mode_blocks(self) -> list[PromptBlock]:
+        """Script rules (same for every script) first, the script itself last"""
         if not self.script:
-            return "Error: No script loaded."
-
-        script_content = self.get_script_content_for_prompt()
+            return [PromptBlock("script", "Error: No script loaded.")]
 
-        return f"""
+        rules = """
 ## Mode: Script Practice
 
 You are helping the user practice a specific conversation script.
 You play the "partner" role, and the user practices the "user" lines.
-
-### Script Information
-- **Title**: {self.script.title}
-- **Description**: {self.script.description}
-- **Difficulty**: {self.script.difficulty}
-
-### The Script
-{script_content}
+The script is given at the end of these instructions.
 
 ### Important Rules
 1. **Follow the script in order** - Say your lines (PARTNER) when it's your turn
@@ -110,14 +75,34 @@ You play the "partner" role, and the user practices the "user" lines.
    - Never break character to correct them mid-conversation
 6. **Provide feedback at the end** - After completing the script, you can offer brief feedback on pronunciation or phrasing
 
-### Difficulty Adjustments ({self.level})
+### Starting the Conversation
+Begin by saying Line 1 (your first partner line). The conversation has started!
+"""
+        # 学習者のレベルは Speaking Level ブロックで指定されるため、ここには埋め込まない
+        adjustments = """
+### Difficulty Adjustments (by Speaking Level)
 - **Beginner**: Accept approximate responses, speak slowly, be extra patient
 - **Intermediate**: Expect closer matches to the script, normal speaking pace
 - **Advanced**: Expect precise pronunciation and natural delivery
+"""
+        script = f"""
+### Script Information
+- **Title**: {self.script.title}
+- **Description**: {self.script.description}
+- **Difficulty**: {self.script.difficulty}
 
-### Starting the Conversation
-Begin by saying Line 1 (your first partner line). The conversation has started!
+### The Script
+{self.get_script_content_for_prompt()}
 """
+        return [
+            PromptBlock("script_rules", rules, scope="mode"),
+            PromptBlock("script_adjustments", adjustments, scope="mode", required=False),
+            PromptBlock("script", script, scope="session"),
+        ]
+
+    def get_mode_instructions(self) -> str:
+        """Return script mode specific instructions"""
+        return "\n".join(block.text for block in self.get_mode_blocks())
 
     def get_greeting(self) -> str:
         """Return the first partner line as the greeting"""
@@ -2,6 +2,8 @@ import logging
 from pathlib import Path
 from typing import Literal, Optional
 
+from ..services.metrics import stage_timer
+from ..services.prompt_compiler import PromptBlock
 from .base_coach import BaseCoach, Level
 
 logging.basicConfig(level=logging.INFO)
@@ -22,8 +24,9 @@ class SituationCoach(BaseCoach):
     def get_scenario_prompt(self) -> str:
         """Load scenario-specific prompt from file"""
         prompt_file = PROMPTS_DIR / f"{self.scenario}.md"
-        if prompt_file.exists():
-            return prompt_file.read_text()
+        with stage_timer("scenario_file_read"):
+            if prompt_file.exists():
+                return prompt_file.read_text()
         return self._get_default_scenario_prompt()
 
     def _get_default_scenario_prompt(self) -> str:
@@ -112,15 +115,14 @@ You are a helpful store assistant in a clothing shop.
         }
         return defaults.get(self.scenario, defaults["restaurant"])
 
-    def get_mode_instructions(self) -> str:
-        """Return situation mode specific instructions"""
-        scenario_prompt = self.get_scenario_prompt()
-
-        return f"""
+    def get_mode_blocks(self) -> list[PromptBlock]:
+        """Role-play rules (same for every scenario) first, the scenario last"""
+        rules = """
 ## Mode: Situation Practice (Role-Play)
 
 You are role-playing a specific real-world scenario with the learner.
 Stay in character throughout the conversation.
+The scenario is given at the end of these instructions.
 
 ### Important Rules
 1. STAY IN CHARACTER - You are the person in the scenario, not a teacher
@@ -133,9 +135,15 @@ Stay in character throughout the conversation.
 ### Starting the Conversation
 Begin by setting the scene briefly, then start the role-play naturally.
 For example: "Welcome to [place]! [Opening line appropriate to scenario]"
-
-{scenario_prompt}
 """
+        return [
+            PromptBlock("situation_rules", rules, scope="mode"),
+            PromptBlock("scenario", self.get_scenario_prompt(), scope="session"),
+        ]
+
+    def get_mode_instructions(self) -> str:
+        """Return situation mode specific instructions"""
+        return "\n".join(block.text for block in self.get_mode_blocks())
 
     def get_greeting(self) -> str:
         """Return scenario-specific initial greeting"""
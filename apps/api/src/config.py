@@ -18,16 +18,110 @@ class Settings(BaseSettings):
     app_name: str = "English Conversation Training API"
     debug: bool = False
 
+    # Pre-fork server (python -m src.server)
+    host: str = "0.0.0.0"
+    port: int = 8080  # Cloud Run は PORT を設定する
+    web_concurrency: int = 0  # ワーカー数 (0 = 利用可能なCPU数)
+    worker_max_requests: int = 0  # この件数を処理したワーカーを入れ替える (0 = 無効)
+    worker_max_requests_jitter: int = 0  # 全ワーカーが同時に入れ替わらないようにずらす
+    worker_graceful_timeout: float = 30.0
+    worker_state_interval: float = 2.0  # 各ワーカーがメトリクスと受付状況を共有する間隔 (秒)
+
     # GetStream
     stream_api_key: str = ""
     stream_api_secret: str = ""
+    stream_api_base_url: str = "https://video.stream-io-api.com/api/v2"
+    stream_token_ttl: int = 3600
+
+    # Object detector agent worker pool
+    agent_warm_pool_size: int = 2  # 事前構築しておくエージェント数 (0 = 無効)
+    agent_max_concurrent_calls: int = 8
+    agent_max_rss_mb: int = 0  # この値を超えたら新規通話を受け付けない (0 = 無制限)
+    agent_drain_timeout: float = 30.0
+    # 映像フレームのゲート (シーン変化 or 最大経過時間で送信)
+    agent_video_fps: int = 3
+    frame_gate_threshold: float = 0.04
+    frame_gate_max_staleness: float = 5.0
+    # 知覚ハッシュによる検出結果キャッシュ
+    detection_cache_size: int = 256
+    detection_cache_ttl: float = 30.0
+    detection_hash_distance: int = 6  # 64bit中この距離以内なら同じ光景とみなす
+    # ローカル物体検出 (YOLOv8 ONNX) による事前フィルタ (空 = 無効)
+    detector_model_path: str = ""
+    detector_score_threshold: float = 0.25
+    detector_min_confidence: float = 0.5  # これ未満の検出があればLLMに確認させる
+    detector_threads: int = 1
+    # キーフレーム (LLM の検出結果) 間の物体追跡
+    tracker_iou_threshold: float = 0.3
+    tracker_half_life: float = 4.0  # 見えなくなってからの確信度の半減期 (秒)
 
     # Deepgram Voice Agent
     deepgram_api_key: str = ""
+    # ブラウザにはAPIキーではなく短命トークンを渡す (プールで事前発行)
+    deepgram_token_broker: bool = True
+    deepgram_token_url: str = "https://api.deepgram.com/v1/auth/grant"
+    deepgram_token_ttl: int = 60
+    deepgram_token_pool_size: int = 8
+    deepgram_token_min_remaining: float = 20.0
+    deepgram_token_idle_after: float = 120.0  # この間リクエストがなければプールを補充しない
+
+    # 音声エージェントのサーバー側リレー (ブラウザ -> API -> Deepgram)
+    # プロンプトごとに設定済みの上流接続を温めておき、接続と Settings の往復を省く
+    voice_relay_enabled: bool = False
+    deepgram_agent_url: str = "wss://agent.deepgram.com/v1/agent/converse"
+    voice_relay_pool_size: int = 1  # プロンプトごとの待機接続数 (0 = 事前接続しない)
+    voice_relay_pool_keys: int = 16  # 待機接続を保つプロンプト数
+    voice_relay_idle_ttl: float = 60.0  # 待機接続を入れ替えるまでの秒数
+    voice_relay_key_ttl: float = 300.0  # この間要求のないプロンプトは温めない
+    voice_relay_max_frame_bytes: int = 65536
+    voice_relay_write_limit: int = 262144
+    voice_relay_send_timeout: float = 5.0
+    # 中継時の無音間引き (numpy が必要: `uv sync --extra relay`)
+    voice_gate_enabled: bool = True
+    voice_gate_min_db: float = -50.0  # これより小さい音は常に無音とみなす
+    voice_gate_hangover: float = 1.5  # 発話後も送り続ける秒数 (エージェントの発話終了検出用)
+    voice_gate_pre_roll: float = 0.3  # 発話開始前に遡って送る秒数
+
+    # 挨拶音声の事前合成 (シナリオ/スクリプトごとに一度だけ TTS を呼び、ディスクとメモリに保持)
+    greeting_audio_enabled: bool = True
+    greeting_tts_provider: str = "deepgram"  # "deepgram" | "fake" (ローカル開発用の疑似音声)
+    greeting_audio_encoding: str = "mp3"  # "mp3" | "opus" | "wav"
+    greeting_audio_dir: str = "data/greeting_audio"
+    greeting_audio_memory_mb: int = 16
+    deepgram_speak_url: str = "https://api.deepgram.com/v1/speak"
+
+    # 新規音声セッションの受付制御 (/voice-agent/config, /session/bootstrap)
+    # プロセス単位の値なので、src.server ではワーカー数で割った値を設定する
+    admission_enabled: bool = True
+    admission_rate: float = 5.0  # 全体の新規セッション数/秒
+    admission_burst: int = 20
+    admission_client_rate: float = 0.2  # クライアント (IP) ごとの新規セッション数/秒
+    admission_client_burst: int = 5
+    admission_max_inflight: int = 32  # 同時に処理する要求数 (中継はセッション終了まで数える)
+    admission_max_queue: int = 64
+    admission_queue_timeout: float = 2.0  # これ以上待たせる場合は 503 で返す
+    admission_trusted_hops: int = 1  # X-Forwarded-For を追加する前段のプロキシ数 (0 = 接続元を使う)
 
     # Gemini (LLM provider for Deepgram Voice Agent)
     google_api_key: str = ""
 
+    # Content - スクリプト/プロンプト変更時のホットリロード
+    content_hot_reload: bool = True
+    prompt_cache_size: int = 512
+    # システムプロンプトの上限トークン数 (超える場合は任意ブロックを削る, 0 = 無制限)
+    # 必須ブロックだけで超える場合 (長いスクリプト等) は警告を出してそのまま使う
+    prompt_token_budget: int = 2000
+
+    # Session statistics (SQLite, 書き込みはキュー経由でまとめて行う)
+    session_store_enabled: bool = True
+    session_store_path: str = "data/sessions.db"
+    session_store_batch_size: int = 500
+    session_store_flush_interval: float = 1.0
+    session_store_queue_size: int = 10000
+
+    # カタログ系エンドポイントのCache-Control (ブラウザ/CDNでの再利用)
+    catalog_cache_control: str = "public, max-age=60, s-maxage=300, stale-while-revalidate=86400"
+
     # CORS - 環境変数 CORS_ORIGINS をカンマ区切りで指定可能
     # 例: CORS_ORIGINS=https://app.vercel.app,http://localhost:3000
     cors_origins: Union[str, list[str]] = "http://localhost:3000"
@@ -8,15 +8,94 @@ warnings.filterwarnings(
     module="dataclasses_json"
 )
 
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from src.config import settings
-from src.routers import coach_router
+from src.routers import call_router, coach_router
+from src.routers.coach import warm_catalog_bodies
+from src.services.admission import admission_controller
+from src.services.agent_pool import agent_pool
+from src.services.deepgram_tokens import deepgram_token_broker, token_broker_enabled
+from src.services.fast_json import ORJSONResponse
+from src.services.greeting_audio import greeting_audio, greeting_audio_enabled, situation_greetings
+from src.services.metrics import (
+    MetricsMiddleware,
+    merge_worker_families,
+    registry,
+    render_families,
+)
+from src.services.prompt_cache import prompt_cache
+from src.services.script_catalog import script_catalog
+from src.services.script_matcher import script_matcher
+from src.services.session_store import session_store
+from src.services.stream_client import stream_client
+from src.services.voice_relay import relay_enabled, upstream_pool
+from src.services.workers import worker_context
+
+
+def preload_content() -> None:
+    """Load scripts and build prompts and indexes (src.server calls this before forking)"""
+    script_catalog.load()
+    prompt_cache.warm()
+    script_matcher.warm()
+    warm_catalog_bodies()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時にコンテンツを読み込み、ファイル監視を開始"""
+    # プリフォーク時は親プロセスで読み込み済み (コピーオンライトで共有)
+    if not script_catalog.loaded:
+        preload_content()
+    watchers = []
+    if worker_context.forked:
+        # サーバー全体の上限をワーカー数で分け合う (services/workers.py)
+        admission_controller.divide(worker_context.count)
+        deepgram_token_broker.pool_size = worker_context.share(settings.deepgram_token_pool_size)
+        watchers.append(asyncio.create_task(worker_context.publish()))
+    if settings.content_hot_reload:
+        watchers.append(asyncio.create_task(script_catalog.watch()))
+        watchers.append(asyncio.create_task(prompt_cache.watch()))
+    if token_broker_enabled():
+        await deepgram_token_broker.start()
+    if greeting_audio_enabled():
+        await greeting_audio.start()
+        # シナリオの挨拶はバックグラウンドで合成 (スクリプトは初回リクエスト時)。
+        # 合成結果はディスクで共有されるため、事前合成は1つのワーカーだけが行う
+        if worker_context.primary:
+            watchers.append(asyncio.create_task(greeting_audio.warm(situation_greetings())))
+    if relay_enabled():
+        await upstream_pool.start()
+    if stream_client.configured:
+        await stream_client.start()
+    # 検出結果はプロセス内で配信するため、複数ワーカー時はエージェントを動かさない
+    if settings.agent_warm_pool_size > 0 and agent_pool.available() and not worker_context.forked:
+        await agent_pool.start()
+    if settings.session_store_enabled:
+        await session_store.start()
+    yield
+    await agent_pool.drain(settings.agent_drain_timeout)
+    await session_store.close()
+    await stream_client.close()
+    await deepgram_token_broker.close()
+    await upstream_pool.close()
+    for task in watchers:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await greeting_audio.close()
+
 
 app = FastAPI(
     title=settings.app_name,
     version="0.0.1",
+    lifespan=lifespan,
 )
 
 # CORS設定
@@ -27,19 +106,48 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
-@app.get("/health")
+@app.get("/health", response_class=ORJSONResponse)
 async def health_check():
     """ヘルスチェックエンドポイント"""
     return {"status": "healthy", "app": settings.app_name}
 
 
-@app.get("/")
+@app.get("/ready", response_class=ORJSONResponse)
+async def readiness_check():
+    """レディネスチェック (受付制御の待ち行列が満杯なら 503)"""
+    stats = admission_controller.stats()
+    if worker_context.forked:
+        saturated = [s["admission"]["saturated"] for s in (await worker_context.states()).values()]
+        # 接続はどのワーカーにも届くため、全ワーカーが満杯の時だけ受け付けない
+        stats.update(
+            saturated=all(saturated), workers=len(saturated), saturated_workers=sum(saturated)
+        )
+    status = 503 if stats["saturated"] else 200
+    return ORJSONResponse(
+        {"status": "overloaded" if status == 503 else "ready", **stats}, status_code=status
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus形式のメトリクス (複数ワーカー時は worker ラベル付きで全ワーカー分)"""
+    if worker_context.forked:
+        states = await worker_context.states()
+        body = render_families(merge_worker_families({i: s["metrics"] for i, s in states.items()}))
+    else:
+        body = registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/", response_class=ORJSONResponse)
 async def root():
     """ルートエンドポイント"""
     return {"message": "Welcome to English Conversation Training API"}
 
 
-# Include coach router
+# Include routers
 app.include_router(coach_router)
+app.include_router(call_router)
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+class TokenResponse(BaseModel):
+    token: str
+    user_id: str
+    api_key: str
+
+
+class CreateCallRequest(BaseModel):
+    call_type: str = "default"
+
+
+class CreateCallResponse(BaseModel):
+    call_id: str
+    call_type: str
+    created: bool
+
+
+class JoinCallRequest(BaseModel):
+    call_id: str
@@ -1,6 +1,8 @@
 from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .script import Script
 
 Level = Literal["beginner", "intermediate", "advanced"]
 Mode = Literal["freetalk", "pronunciation", "situation", "script"]
@@ -27,8 +29,14 @@ class JoinSessionResponse(BaseModel):
 
 
 class EndSessionRequest(BaseModel):
-    duration: int
-    messages_exchanged: int
+    session_id: str = Field(min_length=1, max_length=64)
+    mode: Mode
+    level: Level = "beginner"
+    scenario: Optional[Scenario] = None
+    script_id: Optional[str] = None
+    duration: int = Field(ge=0)
+    messages_exchanged: int = Field(ge=0)
+    lines_completed: Optional[int] = Field(default=None, ge=0)
 
 
 class EndSessionResponse(BaseModel):
@@ -36,6 +44,39 @@ class EndSessionResponse(BaseModel):
     message: str
 
 
+EventType = Literal["user_turn", "agent_turn", "line_scored", "error"]
+
+
+class SessionEvent(BaseModel):
+    """A single turn or event within a session"""
+    type: EventType
+    text: Optional[str] = Field(default=None, max_length=2000)
+    score: Optional[float] = None
+    latency_ms: Optional[int] = None
+    timestamp: Optional[float] = None  # 省略時は受信時刻
+
+
+class SessionEventsRequest(BaseModel):
+    session_id: str = Field(min_length=1, max_length=64)
+    events: list[SessionEvent] = Field(min_length=1, max_length=200)
+
+
+StatsDimension = Literal["scenario", "script", "level", "mode"]
+
+
+class SessionStatsGroup(BaseModel):
+    key: str
+    sessions: int
+    avg_duration: float
+    avg_messages: float
+    avg_lines_completed: Optional[float] = None
+
+
+class SessionStatsResponse(BaseModel):
+    dimension: StatsDimension
+    groups: list[SessionStatsGroup]
+
+
 class ScenarioInfo(BaseModel):
     id: str
     title: str
@@ -56,12 +97,62 @@ class VoiceAgentConfigRequest(BaseModel):
     script_id: Optional[str] = None
 
 
-class VoiceAgentConfigResponse(BaseModel):
-    """Voice Agent configuration for frontend direct connection"""
-    api_key: str
+class VoiceAgentSessionConfig(BaseModel):
+    """Credential-free part of the Voice Agent configuration (cached per prompt)"""
     prompt: str
     greeting: str
     voice: str = "aura-2-odysseus-en"
     listen_model: str = "nova-3"
     think_provider: str = "open_ai"
     think_model: str = "gpt-4o-mini"
+    prompt_tokens: Optional[int] = None
+
+
+class VoiceAgentConfigResponse(VoiceAgentSessionConfig):
+    """Voice Agent configuration for frontend direct connection"""
+    api_key: str
+    # "bearer" = 短命トークン (expires_in 秒で失効), "token" = APIキー
+    auth_scheme: str = "token"
+    expires_in: Optional[int] = None
+    # 残りがこの秒数を切ったトークンは接続に使わない (取得し直す)
+    min_remaining: Optional[int] = None
+
+
+class PromptSize(BaseModel):
+    """Token counts of one compiled system prompt"""
+    mode: str
+    level: Level
+    scenario: Optional[str] = None
+    script_id: Optional[str] = None
+    tokens: int
+    prefix_tokens: int  # セッション間で共通の先頭部分 (プロバイダ側でキャッシュされうる)
+    blocks: dict[str, int]
+    dropped: list[str] = []
+
+
+class PromptsReportResponse(BaseModel):
+    budget: int
+    prompts: list[PromptSize]
+
+
+class SessionBootstrapResponse(BaseModel):
+    """Everything the client needs to start a session in one response"""
+    script: Optional[Script] = None
+    config: VoiceAgentConfigResponse
+
+
+class SessionPrefetchResponse(BaseModel):
+    """Credential-free session data prefetched from the picker pages"""
+    script: Optional[Script] = None
+    # 認証情報はセッション開始時の要求で発行する (先読みしたトークンは失効しうる)
+    config: VoiceAgentSessionConfig
+
+
+class SessionBootstrapBatchRequest(BaseModel):
+    """Request for prefetching several sessions at once"""
+    sessions: list[VoiceAgentConfigRequest] = Field(min_length=1, max_length=10)
+
+
+class SessionBootstrapBatchResponse(BaseModel):
+    """Prefetch results in request order (null for unknown scripts)"""
+    sessions: list[Optional[SessionPrefetchResponse]]
@@ -0,0 +1,21 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+Confidence = Literal["high", "medium", "low"]
+
+
+class DetectedObject(BaseModel):
+    """An object reported by the detector agent (see object_detector.md)"""
+    name: str
+    confidence: Confidence = "high"
+    id: Optional[int] = None  # トラッカーが振る識別子 (更新をまたいで同じ物体を指す)
+    box: Optional[tuple[float, float, float, float]] = None  # x1, y1, x2, y2 (0-1 に正規化)
+
+
+class DetectionUpdate(BaseModel):
+    """Latest detection state of a call, pushed to overlay subscribers"""
+    call_id: str
+    seq: int
+    objects: list[DetectedObject]
+    timestamp: float
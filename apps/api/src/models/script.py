@@ -1,10 +1,11 @@
 from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 Difficulty = Literal["beginner", "intermediate", "advanced"]
 Category = Literal["daily", "travel", "business"]
 Speaker = Literal["user", "partner"]
+Verdict = Literal["match", "close", "miss"]
 
 
 class ScriptLine(BaseModel):
@@ -42,6 +43,8 @@ class ScriptInfo(BaseModel):
 class ScriptsResponse(BaseModel):
     """Response for script listing endpoint"""
     scripts: list[ScriptInfo]
+    total: Optional[int] = None  # 絞り込み後の件数 (ページ分割前)
+    next_cursor: Optional[str] = None  # 次ページがある場合のみ
 
 
 class ScriptResponse(BaseModel):
@@ -53,3 +56,33 @@ class ScriptVoiceAgentConfigRequest(BaseModel):
     """Request for Script Voice Agent configuration"""
     script_id: str
     level: Difficulty = "beginner"
+
+
+class LineScoreRequest(BaseModel):
+    """Transcript (final or interim) to score against a script line"""
+    transcript: str = Field(max_length=1000)
+    line_id: Optional[int] = None  # 省略時は最も近いユーザー行を探す
+
+
+class LineScore(BaseModel):
+    """How close a transcript is to an expected user line"""
+    line_id: int
+    expected: str
+    score: float
+    verdict: Verdict
+    missing_words: list[str]
+    utterance_index: Optional[int] = None
+
+
+class SessionScoreRequest(BaseModel):
+    """Every user utterance of a session, in order"""
+    utterances: list[str] = Field(max_length=500)
+
+
+class SessionScoreResponse(BaseModel):
+    """Per-line scores for a whole session transcript"""
+    script_id: str
+    lines: list[LineScore]
+    matched: int
+    total: int
+    overall: float
@@ -1,3 +1,4 @@
+from .call import router as call_router
 from .coach import router as coach_router
 
-__all__ = ["coach_router"]
+__all__ = ["call_router", "coach_router"]
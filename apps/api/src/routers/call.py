@@ -0,0 +1,125 @@
+import logging
+import re
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.models.call import (
+    CreateCallRequest,
+    CreateCallResponse,
+    JoinCallRequest,
+    TokenResponse,
+)
+from src.models.coach import JoinSessionResponse
+from src.services.agent_pool import PoolDrainingError, PoolFullError, agent_pool
+from src.services.detection_stream import detection_hub
+from src.services.fast_json import ORJSONResponse
+from src.services.stream_client import StreamAPIError, stream_client
+from src.services.workers import worker_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/call", tags=["call"])
+
+AGENT_USER = {"id": "object-detector-agent", "name": "Object Detector"}
+
+# GetStreamのユーザーID/通話IDで使える文字
+ID_PATTERN = re.compile(r"^[A-Za-z0-9@_\-]{1,64}$")
+
+
+def _require_stream() -> None:
+    if not stream_client.configured:
+        raise HTTPException(status_code=503, detail="GetStream is not configured")
+
+
+def _require_agent_process() -> None:
+    # 参加と検出結果の購読が別ワーカーに届くと結果が届かない
+    if worker_context.forked:
+        raise HTTPException(
+            status_code=503,
+            detail="Object detector calls are served by the agent worker, not the pre-fork API",
+        )
+
+
+def _validate_id(value: str, name: str) -> None:
+    if not ID_PATTERN.match(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}")
+
+
+@router.get("/token", response_model=TokenResponse)
+async def get_call_token(user_id: Optional[str] = None):
+    """Issue a GetStream user token (signed locally, cached until near expiry)"""
+    _require_stream()
+    user_id = user_id or f"user-{uuid.uuid4().hex[:8]}"
+    _validate_id(user_id, "user_id")
+    return TokenResponse(
+        token=stream_client.tokens.user_token(user_id),
+        user_id=user_id,
+        api_key=stream_client.api_key,
+    )
+
+
+@router.post("/create", response_model=CreateCallResponse)
+async def create_call(request: CreateCallRequest):
+    """Create a new call"""
+    _require_stream()
+    _validate_id(request.call_type, "call_type")
+    call_id = uuid.uuid4().hex
+    try:
+        created = await stream_client.get_or_create_call(request.call_type, call_id, AGENT_USER)
+    except StreamAPIError as e:
+        logger.error(f"Failed to create call: {e}")
+        raise HTTPException(status_code=502, detail="Failed to create call")
+    logger.info(f"Call created: {request.call_type}/{call_id}")
+    return CreateCallResponse(call_id=call_id, call_type=request.call_type, created=created)
+
+
+@router.post("/join", response_model=JoinSessionResponse)
+async def join_call(request: JoinCallRequest):
+    """Dispatch the object detector agent to a call without waiting for it to join"""
+    _validate_id(request.call_id, "call_id")
+    _require_agent_process()
+    if not agent_pool.available():
+        raise HTTPException(status_code=503, detail="Object detector agent is not installed")
+    try:
+        dispatched = await agent_pool.dispatch(request.call_id)
+    except (PoolFullError, PoolDrainingError) as e:
+        logger.warning(f"Agent dispatch rejected for {request.call_id}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="No agent capacity available",
+            headers={"Retry-After": "5"},
+        )
+    if not dispatched:
+        return JoinSessionResponse(
+            status="already_joined",
+            call_id=request.call_id,
+            message="Agent is already in this call",
+        )
+    return JoinSessionResponse(
+        status="joining",
+        call_id=request.call_id,
+        message="Agent is joining the call",
+    )
+
+
+@router.get("/agents", response_class=ORJSONResponse)
+async def get_agent_stats():
+    """Active calls, warm agents and process memory growth during each call"""
+    return agent_pool.stats()
+
+
+@router.get("/{call_id}/detections")
+async def stream_detections(call_id: str):
+    """Server-sent events with the latest detected objects of a call"""
+    _validate_id(call_id, "call_id")
+    _require_agent_process()
+    return StreamingResponse(
+        detection_hub.stream(call_id),
+        media_type="text/event-stream",
+        # プロキシのバッファリングを無効化して即座に届ける
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
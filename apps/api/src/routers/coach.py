@@ -1,23 +1,81 @@
+import asyncio
 import logging
+import time
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket
+from fastapi.requests import HTTPConnection
 
-from src.agents import SituationCoach
-from src.agents.script_coach import ScriptCoach
 from src.config import settings
 from src.models.coach import (
+    EndSessionRequest,
+    Level,
+    Mode,
+    EndSessionResponse,
+    PromptsReportResponse,
     ScenarioInfo,
+    Scenario,
     ScenariosResponse,
+    SessionBootstrapBatchRequest,
+    SessionBootstrapBatchResponse,
+    SessionBootstrapResponse,
+    SessionEventsRequest,
+    SessionStatsResponse,
+    StatsDimension,
     VoiceAgentConfigRequest,
     VoiceAgentConfigResponse,
 )
-from src.models.script import ScriptsResponse, ScriptResponse
+from src.models.script import (
+    Category,
+    Difficulty,
+    LineScore,
+    LineScoreRequest,
+    ScriptsResponse,
+    ScriptResponse,
+    SessionScoreRequest,
+    SessionScoreResponse,
+)
+from src.services.admission import AdmissionRejected, admission_controller, client_key
+from src.services.http_cache import BodyCache, CachedBody, cached_response, etag_response
+from src.services.deepgram_tokens import TokenUnavailableError, get_deepgram_credentials
+from src.services.fast_json import PrebuiltJSONResponse, merge_json, model_bytes
+from src.services.greeting_audio import DEFAULT_VOICE, greeting_audio, greeting_audio_enabled
+from src.services.prompt_cache import CompiledPrompt, prompt_cache
+from src.services.script_catalog import script_catalog
+from src.services.script_matcher import ScriptIndex, script_matcher
+from src.services.script_search import InvalidCursorError, script_search
+from src.services.session_store import session_store
+from src.services.tts import TTSError
+from src.services.voice_relay import (
+    RELAY_CONNECT_SECONDS,
+    RelayError,
+    agent_settings,
+    create_voice_gate,
+    relay,
+    relay_enabled,
+    upstream_pool,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/coach", tags=["coach"])
 
+# シナリオはデプロイ時にのみ変わるため、プロセス起動時刻を更新日時とする
+STARTED_AT = time.time()
+
+body_cache: BodyCache[CachedBody] = BodyCache()
+script_json_cache: BodyCache[bytes] = BodyCache()
+
+
+def _discard_script_bodies(script_ids: set[str]) -> None:
+    for script_id in script_ids:
+        body_cache.discard(("script", script_id))
+        script_json_cache.discard(script_id)
+
+
+script_catalog.add_listener(_discard_script_bodies)
+
 SCENARIOS = [
     ScenarioInfo(
         id="restaurant",
@@ -50,8 +108,97 @@ SCENARIOS = [
 ]
 
 
+async def _compiled_prompt(request: VoiceAgentConfigRequest) -> CompiledPrompt:
+    """Compiled prompt and greeting for a session, raising HTTPException on invalid requests"""
+    if request.mode == "script" and not request.script_id:
+        raise HTTPException(status_code=400, detail="script_id is required for script mode")
+
+    compiled = await prompt_cache.aget(
+        request.mode, request.level, request.scenario, request.script_id
+    )
+    if compiled is None:
+        raise HTTPException(status_code=404, detail=f"Script not found: {request.script_id}")
+    return compiled
+
+
+async def build_voice_agent_config(request: VoiceAgentConfigRequest) -> bytes:
+    """Build the Voice Agent configuration as JSON, raising HTTPException on invalid requests"""
+    compiled = await _compiled_prompt(request)
+
+    try:
+        credentials = await get_deepgram_credentials()
+    except TokenUnavailableError as e:
+        logger.error(f"Deepgram token unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Voice agent is temporarily unavailable")
+
+    # プロンプト等はコンパイル時にJSON化済みなので、認証情報だけを先頭に足す
+    return merge_json(
+        {
+            "api_key": credentials.api_key,
+            "auth_scheme": credentials.auth_scheme,
+            "expires_in": credentials.expires_in,
+            "min_remaining": credentials.min_remaining,
+        },
+        compiled.config_json,
+    )
+
+
+def _script_json(script_id: str) -> Optional[bytes]:
+    """Serialized script, built once per catalog version"""
+    snapshot = script_catalog.snapshot
+    script = snapshot.scripts.get(script_id)
+    if script is None:
+        return None
+    return script_json_cache.get(script_id, snapshot.version, lambda: model_bytes(script))
+
+
+async def _lookup_script(request: VoiceAgentConfigRequest) -> Optional[bytes]:
+    if request.mode != "script" or not request.script_id:
+        return None
+    return _script_json(request.script_id)
+
+
+async def build_session_bootstrap(request: VoiceAgentConfigRequest) -> bytes:
+    """Build script and config concurrently for a single session (as JSON)"""
+    config, script = await asyncio.gather(
+        build_voice_agent_config(request),
+        _lookup_script(request),
+    )
+    return b'{"script":' + (script or b"null") + b',"config":' + config + b"}"
+
+
+async def build_session_prefetch(request: VoiceAgentConfigRequest) -> bytes:
+    """Script and credential-free config of a session (as JSON)"""
+    compiled = await _compiled_prompt(request)
+    script = await _lookup_script(request)
+    return b'{"script":' + (script or b"null") + b',"config":' + compiled.config_json + b"}"
+
+
+async def _admit(connection: HTTPConnection) -> None:
+    """Wait for a voice session slot; sheds load with 429/503 and Retry-After
+
+    The config endpoints release the slot once the response is built, so for
+    them admission only limits the session start rate (the browser then talks
+    to Deepgram directly). The relay holds its slot for the whole session.
+    """
+    client = client_key(
+        connection.headers.get("x-forwarded-for"),
+        connection.client.host if connection.client else None,
+        settings.admission_trusted_hops,
+    )
+    try:
+        await admission_controller.acquire(client)
+    except AdmissionRejected as e:
+        logger.warning(f"Session request rejected ({e.status_code}): {e.reason}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
 @router.post("/voice-agent/config", response_model=VoiceAgentConfigResponse)
-async def get_voice_agent_config(request: VoiceAgentConfigRequest):
+async def get_voice_agent_config(request: VoiceAgentConfigRequest, http_request: Request):
     """
     Get Voice Agent configuration for frontend direct connection.
 
@@ -62,46 +209,306 @@ async def get_voice_agent_config(request: VoiceAgentConfigRequest):
         f"Voice Agent config requested: mode={request.mode}, "
         f"level={request.level}, scenario={request.scenario}, script_id={request.script_id}"
     )
+    await _admit(http_request)
+    try:
+        return PrebuiltJSONResponse(await build_voice_agent_config(request))
+    finally:
+        admission_controller.release()
+
+
+@router.post("/session/bootstrap", response_model=SessionBootstrapResponse)
+async def bootstrap_session(request: VoiceAgentConfigRequest, http_request: Request):
+    """
+    Get the script (script mode only) and Voice Agent configuration in one round trip.
+    """
+    logger.info(
+        f"Session bootstrap requested: mode={request.mode}, "
+        f"level={request.level}, scenario={request.scenario}, script_id={request.script_id}"
+    )
+    await _admit(http_request)
+    try:
+        return PrebuiltJSONResponse(await build_session_bootstrap(request))
+    finally:
+        admission_controller.release()
+
 
-    if request.mode == "script":
-        if not request.script_id:
-            raise HTTPException(status_code=400, detail="script_id is required for script mode")
-        coach = ScriptCoach(level=request.level, script_id=request.script_id)
-        if not coach.script:
-            raise HTTPException(status_code=404, detail=f"Script not found: {request.script_id}")
-    elif request.mode == "situation":
-        coach = SituationCoach(level=request.level, scenario=request.scenario)
-    else:
-        coach = SituationCoach(level=request.level, scenario="restaurant")
-
-    return VoiceAgentConfigResponse(
-        api_key=settings.deepgram_api_key,
-        prompt=coach.get_full_instructions(),
-        greeting=coach.get_greeting(),
-        voice="aura-2-odysseus-en",
-        listen_model="nova-3",
-        think_provider="open_ai",
-        think_model="gpt-4o-mini",
+@router.post("/session/bootstrap/batch", response_model=SessionBootstrapBatchResponse)
+async def bootstrap_sessions(request: SessionBootstrapBatchRequest):
+    """
+    Prefetch the script, prompt and greeting of several sessions (e.g. from the picker pages).
+
+    Results keep the request order; sessions that cannot be built are null.
+    No credentials are included: the Deepgram token is issued by the request
+    that starts the session (/voice-agent/config or /session/bootstrap).
+    Not subject to admission: the picker fires it on hover, and only session
+    starts may use up a client's session rate.
+    """
+    results = await asyncio.gather(
+        *(build_session_prefetch(session) for session in request.sessions),
+        return_exceptions=True,
     )
+    sessions = []
+    for result in results:
+        if isinstance(result, HTTPException):
+            sessions.append(b"null")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            sessions.append(result)
+    return PrebuiltJSONResponse(b'{"sessions":[' + b",".join(sessions) + b"]}")
+
+
+@router.websocket("/voice-agent/relay")
+async def voice_agent_relay(
+    websocket: WebSocket,
+    mode: Mode,
+    level: Level = "beginner",
+    scenario: Optional[Scenario] = None,
+    script_id: Optional[str] = None,
+    greeting: Literal["played", "agent"] = "agent",
+):
+    """
+    Relay a Voice Agent session through the API.
+
+    Takes the same parameters as the voice agent config. The socket is attached
+    to an agent connection that is already configured for the session's prompt,
+    pre-opened when the client has played the cached greeting itself
+    (greeting=played). The client then exchanges audio and control messages as
+    it would with Deepgram, without sending Settings.
+    """
+    await websocket.accept()
+    if not relay_enabled():
+        await websocket.close(code=1008, reason="Voice relay is disabled")
+        return
+    started = time.monotonic()
+    try:
+        await _admit(websocket)
+    except HTTPException as e:
+        # 1013 = Try Again Later
+        await websocket.close(code=1013, reason=str(e.detail))
+        return
+    # 中継は上流接続を占有するため、セッションが終わるまで枠を保持する
+    try:
+        try:
+            compiled = await _compiled_prompt(VoiceAgentConfigRequest(
+                mode=mode, level=level, scenario=scenario, script_id=script_id
+            ))
+            key, settings_message = agent_settings(compiled.config_json, greeting == "agent")
+            # 挨拶を話す上流は接続した瞬間に話し始めるため、事前接続しない
+            upstream = await upstream_pool.acquire(
+                key, settings_message, pooled=greeting == "played"
+            )
+        except HTTPException as e:
+            await websocket.close(code=1008, reason=str(e.detail))
+            return
+        except RelayError as e:
+            logger.error(str(e))
+            await websocket.close(code=1013, reason="Voice agent is temporarily unavailable")
+            return
+
+        pool = "warm" if upstream.warm else "cold"
+        RELAY_CONNECT_SECONDS.labels(pool).observe(time.monotonic() - started)
+        stats = await relay(websocket, upstream, upstream_pool.limits, create_voice_gate())
+    finally:
+        admission_controller.release()
+
+    gated = ""
+    if stats.gate is not None:
+        gated = (
+            f", gate saved {stats.gate.bytes_saved} bytes ({stats.gate.saved_ratio:.0%}) "
+            f"adding {stats.gate.mean_latency_ms:.3f}ms/chunk "
+            f"(max {stats.gate.max_processing_seconds * 1000:.3f}ms)"
+        )
+    logger.info(
+        f"Voice relay closed ({pool}): {stats.client_bytes} bytes up, "
+        f"{stats.agent_bytes} bytes down, first audio {stats.first_audio_seconds}{gated}"
+    )
+
+
+@router.get(
+    "/greeting-audio",
+    response_class=Response,
+    responses={200: {"content": {"audio/mpeg": {}, "audio/wav": {}}}},
+)
+async def get_greeting_audio(
+    request: Request,
+    mode: Mode,
+    level: Level = "beginner",
+    scenario: Optional[Scenario] = None,
+    script_id: Optional[str] = None,
+    voice: str = Query(DEFAULT_VOICE, pattern=r"^aura-[a-z0-9-]+$", max_length=64),
+):
+    """
+    Pre-synthesized audio of the session greeting.
+
+    Takes the same parameters as the voice agent config. The client plays it
+    while the live agent connects; on 404/503 the agent speaks the greeting.
+    """
+    if not greeting_audio_enabled():
+        raise HTTPException(status_code=404, detail="Greeting audio is disabled")
+    compiled = await _compiled_prompt(VoiceAgentConfigRequest(
+        mode=mode, level=level, scenario=scenario, script_id=script_id
+    ))
+    try:
+        audio = await greeting_audio.get(compiled.greeting, voice)
+    except TTSError as e:
+        logger.error(f"Greeting audio unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Greeting audio is temporarily unavailable")
+    # 内容のハッシュがETagなので、挨拶文が変わればクライアントのキャッシュも更新される
+    return etag_response(
+        request, audio.etag, settings.catalog_cache_control, lambda: audio.data, audio.media_type
+    )
+
+
+@router.get("/prompts", response_model=PromptsReportResponse)
+async def get_prompts_report():
+    """Token counts of the compiled system prompts currently cached"""
+    return PromptsReportResponse(
+        budget=settings.prompt_token_budget, prompts=prompt_cache.report()
+    )
+
+
+def _scenarios_body() -> CachedBody:
+    return body_cache.get(
+        "scenarios",
+        STARTED_AT,
+        lambda: CachedBody.from_model(ScenariosResponse(scenarios=SCENARIOS), STARTED_AT),
+    )
+
+
+def _scripts_body() -> CachedBody:
+    snapshot = script_catalog.snapshot
+    return body_cache.get(
+        "scripts",
+        snapshot.version,
+        lambda: CachedBody.from_model(
+            ScriptsResponse(scripts=list(snapshot.infos), total=len(snapshot.infos)),
+            snapshot.loaded_at,
+        ),
+    )
+
+
+def warm_catalog_bodies() -> None:
+    """Serialize and compress the scenario and script listings ahead of the first request"""
+    _scenarios_body()
+    _scripts_body()
 
 
 @router.get("/scenarios", response_model=ScenariosResponse)
-async def get_scenarios():
+async def get_scenarios(request: Request):
     """Get list of available scenarios"""
-    return ScenariosResponse(scenarios=SCENARIOS)
+    return cached_response(request, _scenarios_body(), settings.catalog_cache_control)
 
 
 @router.get("/scripts", response_model=ScriptsResponse)
-async def get_scripts():
-    """Get list of available practice scripts"""
-    scripts = ScriptCoach.list_scripts()
-    return ScriptsResponse(scripts=scripts)
+async def get_scripts(
+    request: Request,
+    category: Optional[list[Category]] = Query(None),
+    difficulty: Optional[list[Difficulty]] = Query(None),
+    min_minutes: Optional[int] = Query(None, ge=0),
+    max_minutes: Optional[int] = Query(None, ge=0),
+    q: Optional[str] = Query(None, max_length=200),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None, max_length=512),
+):
+    """
+    Get available practice scripts.
+
+    Without parameters the full catalog is returned. category and difficulty may
+    be repeated (any of the values matches), q searches titles, descriptions and
+    line text (every word must match), and limit/cursor paginate the result.
+    """
+    filtered = any(
+        value is not None
+        for value in (category, difficulty, min_minutes, max_minutes, q, limit, cursor)
+    )
+    if not filtered:
+        return cached_response(request, _scripts_body(), settings.catalog_cache_control)
+
+    index = script_search.index
+    try:
+        page = index.search(
+            categories=category or (),
+            difficulties=difficulty or (),
+            min_minutes=min_minutes,
+            max_minutes=max_minutes,
+            query=q or "",
+            limit=limit,
+            cursor=cursor,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 応答はURLとカタログ内容だけで決まるため、カタログのETagをそのまま使える
+    return etag_response(
+        request,
+        index.etag,
+        settings.catalog_cache_control,
+        lambda: ScriptsResponse(
+            scripts=page.scripts, total=page.total, next_cursor=page.next_cursor
+        ).model_dump_json().encode(),
+    )
 
 
 @router.get("/scripts/{script_id}", response_model=ScriptResponse)
-async def get_script(script_id: str):
+async def get_script(script_id: str, request: Request):
     """Get a specific practice script by ID"""
-    script = ScriptCoach.load_script(script_id)
+    snapshot = script_catalog.snapshot
+    script = snapshot.scripts.get(script_id)
     if not script:
+        logger.warning(f"Script not found: {script_id}")
+        raise HTTPException(status_code=404, detail=f"Script not found: {script_id}")
+    body = body_cache.get(
+        ("script", script_id),
+        snapshot.version,
+        lambda: CachedBody.from_bytes(
+            b'{"script":' + _script_json(script_id) + b"}", snapshot.loaded_at
+        ),
+    )
+    return cached_response(request, body, settings.catalog_cache_control)
+
+
+def _script_index(script_id: str) -> ScriptIndex:
+    index = script_matcher.index(script_id)
+    if index is None:
         raise HTTPException(status_code=404, detail=f"Script not found: {script_id}")
-    return ScriptResponse(script=script)
+    return index
+
+
+@router.post("/scripts/{script_id}/score", response_model=LineScore)
+async def score_script_line(script_id: str, request: LineScoreRequest):
+    """Score a (final or interim) transcript against a user line of the script"""
+    index = _script_index(script_id)
+    if not index.lines:
+        raise HTTPException(status_code=422, detail=f"Script has no user lines: {script_id}")
+    result = script_matcher.score(index, request.transcript, request.line_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"User line not found: {request.line_id}")
+    return result
+
+
+@router.post("/scripts/{script_id}/score/session", response_model=SessionScoreResponse)
+async def score_script_session(script_id: str, request: SessionScoreRequest):
+    """Score a whole session transcript against the script in one call"""
+    return script_matcher.score_session(_script_index(script_id), request.utterances)
+
+
+@router.post("/session/end", response_model=EndSessionResponse, status_code=202)
+async def end_session(request: EndSessionRequest):
+    """Record a finished session (written in the background)"""
+    if not session_store.record_end(request):
+        return EndSessionResponse(status="dropped", message="Session stats were not recorded")
+    return EndSessionResponse(status="accepted", message="Session stats recorded")
+
+
+@router.post("/session/events", response_model=EndSessionResponse, status_code=202)
+async def record_session_events(request: SessionEventsRequest):
+    """Record per-turn events of a session (written in the background)"""
+    if not session_store.record_events(request.session_id, request.events):
+        return EndSessionResponse(status="dropped", message="Events were not recorded")
+    return EndSessionResponse(status="accepted", message=f"{len(request.events)} events recorded")
+
+
+@router.get("/stats/{dimension}", response_model=SessionStatsResponse)
+async def get_session_stats(dimension: StatsDimension):
+    """Session aggregates per scenario, script, level or mode"""
+    return SessionStatsResponse(dimension=dimension, groups=await session_store.stats(dimension))
@@ -0,0 +1,263 @@
+"""
+Pre-fork Server
+
+Runs the coach API in several worker processes sharing one listening socket.
+Scripts, compiled prompts, search indexes and the catalog response bodies are
+loaded once in the parent, then `gc.freeze()` moves them out of the collector's
+reach so forked workers keep sharing those pages copy-on-write instead of each
+holding a private copy. The parent only supervises: it replaces workers that
+exit (e.g. after WORKER_MAX_REQUESTS requests) and forwards shutdown.
+
+Each worker runs the app lifespan. Workers are numbered (a replacement keeps
+the number of the worker it replaces) so shared limits are divided, one-off
+background work runs in worker 0 only, and /metrics and /ready cover every
+worker; services/workers.py lists what runs per worker.
+
+Run with:
+    python -m src.server   # WEB_CONCURRENCY workers (default: available CPUs)
+
+Signals: SIGTERM/SIGINT drain and stop every worker, SIGHUP replaces them one
+at a time without closing the socket.
+"""
+
+import contextlib
+import gc
+import logging
+import math
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+from src.config import settings
+from src.main import app, preload_content
+from src.services.workers import worker_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 起動直後に落ちるワーカーを再起動し続けないための待ち時間
+CRASH_WINDOW = 5.0
+CRASH_BACKOFF = 1.0
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """CPU limit from the cgroup (v2 cpu.max or v1 CFS quota), None if unlimited"""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, capped by the container's CPU limit"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def worker_config(limit: Optional[int], graceful_timeout: float) -> uvicorn.Config:
+    """uvicorn settings of one worker"""
+    return uvicorn.Config(
+        app,
+        lifespan="on",
+        limit_max_requests=limit,
+        timeout_graceful_shutdown=graceful_timeout,
+        # X-Forwarded-For は受付制御 (client_key) が信頼するホップ数だけ解釈する。
+        # uvicorn に書き換えさせると偽装された値が接続元として扱われる
+        proxy_headers=False,
+    )
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Forks workers serving `app` on a shared socket and keeps them running"""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        workers: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+        state_dir: Optional[Path] = None,
+    ):
+        self.sock = sock
+        self.workers = workers
+        self.state_dir = state_dir
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.children: dict[int, float] = {}  # pid -> 起動時刻
+        self.indexes: dict[int, int] = {}  # pid -> ワーカー番号
+        self.retiring: set[int] = set()  # 入れ替え済みで、終了しても再起動しないワーカー
+        self.stopping = False
+        self.reload_requested = False
+
+    def _serve(self, index: int) -> None:
+        """Worker body: run uvicorn on the inherited socket, then exit"""
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        worker_context.index = index
+        worker_context.count = self.workers
+        worker_context.state_dir = self.state_dir
+        worker_context.started_at = time.time()
+        limit = None
+        if self.max_requests > 0:
+            limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+        code = 0
+        try:
+            uvicorn.Server(worker_config(limit, self.graceful_timeout)).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+            code = 1
+        finally:
+            # 親から引き継いだ atexit 処理やバッファを二重に実行しない
+            logging.shutdown()
+            os._exit(code)
+
+    def spawn(self, index: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            self._serve(index)
+        self.children[pid] = time.monotonic()
+        self.indexes[pid] = index
+        logger.info(f"Worker {pid} started (worker {index})")
+        return pid
+
+    @staticmethod
+    def _signal(pid: int, sig: signal.Signals) -> None:
+        # 既に終了したワーカーへの送信は無視する
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, sig)
+
+    def _on_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _on_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+
+    def _reap(self) -> None:
+        """Collect exited workers and start replacements"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            index = self.indexes.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info(f"Worker {pid} exited with {code}")
+            if self.stopping or pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if code != 0 and time.monotonic() - started < CRASH_WINDOW:
+                time.sleep(CRASH_BACKOFF)
+            self.spawn(index)
+
+    def _rolling_restart(self) -> None:
+        """Replace workers one by one, starting each replacement before stopping the old one"""
+        for pid in list(self.children):
+            if self.stopping:
+                return
+            # 入れ替え先は同じ番号を引き継ぐ (旧ワーカーの終了待ちの間だけ重複する)
+            self.spawn(self.indexes[pid])
+            self.retiring.add(pid)
+            self._signal(pid, signal.SIGTERM)
+            deadline = time.monotonic() + self.graceful_timeout
+            while pid in self.children and time.monotonic() < deadline:
+                time.sleep(0.1)
+                self._reap()
+
+    def _shutdown(self) -> None:
+        for pid in self.children:
+            self._signal(pid, signal.SIGTERM)
+        # uvicorn 側の graceful shutdown (実行中のリクエストとlifespan終了処理) を待つ
+        deadline = time.monotonic() + self.graceful_timeout + 5.0
+        while self.children and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self._reap()
+        for pid in self.children:
+            logger.warning(f"Worker {pid} did not stop in time; killing")
+            self._signal(pid, signal.SIGKILL)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        for index in range(self.workers):
+            self.spawn(index)
+        while not self.stopping:
+            self._reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self._rolling_restart()
+            time.sleep(0.5)
+        self._shutdown()
+        self.sock.close()
+
+
+def main() -> int:
+    workers = settings.web_concurrency or available_cpus()
+    preload_content()
+    # フォーク前に不要なオブジェクトを回収し、残りを GC の対象外にする。
+    # 子プロセスの GC が共有ページを書き換えず、コピーオンライトのまま保たれる
+    gc.collect()
+    gc.freeze()
+    sock = bind_socket(settings.host, settings.port)
+    logger.info(
+        f"Serving on {settings.host}:{settings.port} with {workers} workers "
+        f"({gc.get_freeze_count()} objects frozen)"
+    )
+    # ワーカー間でメトリクスと受付状況を共有するディレクトリ
+    state_dir = Path(tempfile.mkdtemp(prefix="coach-workers-")) if workers > 1 else None
+    try:
+        Supervisor(
+            sock,
+            workers,
+            max_requests=settings.worker_max_requests,
+            max_requests_jitter=settings.worker_max_requests_jitter,
+            graceful_timeout=settings.worker_graceful_timeout,
+            state_dir=state_dir,
+        ).run()
+    finally:
+        if state_dir is not None:
+            shutil.rmtree(state_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Admission Control
+
+Limits how fast new voice sessions are handed out, so a traffic spike is
+shed at the door instead of exhausting the upstream (Deepgram/LLM) quota and
+degrading every session at once. A global and a per-client token bucket cap
+the session start rate, and at most `max_inflight` requests are processed at
+a time: a relayed session counts until it ends, a config request only until
+its response is built. Requests over the global limits wait in a bounded
+FIFO queue until a deadline; everything else is rejected immediately with a
+retry hint.
+Limits are per process; under src.server each worker takes an even share
+(see services/workers.py).
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional
+
+from ..config import settings
+from .metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Retry-After の上限 (レートが 0 の場合は補充されないため待ち時間が無限になる)
+MAX_RETRY_AFTER = 3600
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted"""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code  # 429 = クライアント単位の制限, 503 = 全体の過負荷
+        self.retry_after = max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER)))
+        self.reason = reason
+
+
+def _share(total: float, workers: int) -> int:
+    return max(math.ceil(total / workers), 1)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens/s up to `burst`"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 if they are now)"""
+        self._refill(now)
+        missing = tokens - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+    def take(self, now: float, tokens: float = 1.0) -> None:
+        self._refill(now)
+        self.tokens -= tokens
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    deadline: float
+
+
+class AdmissionController:
+    """Token-bucket rate limits plus an in-flight cap with a bounded wait queue"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        client_rate: float,
+        client_burst: int,
+        max_inflight: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_clients: int = 10000,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.bucket = TokenBucket(rate, burst)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self._clients: dict[str, TokenBucket] = {}
+        self._queue: deque[_Waiter] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected_client = 0
+        self.rejected_overload = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def divide(self, workers: int) -> None:
+        """Keep an even share of the limits for one of `workers` processes (call before use)"""
+        if workers <= 1:
+            return
+        # 接続はワーカーにほぼ均等に振り分けられるため、レートは割り、上限は切り上げる
+        self.bucket = TokenBucket(self.bucket.rate / workers, _share(self.bucket.burst, workers))
+        self.client_rate /= workers
+        self.client_burst = _share(self.client_burst, workers)
+        self.max_inflight = _share(self.max_inflight, workers)
+        self.max_queue = _share(self.max_queue, workers)
+        self._clients.clear()
+
+    @property
+    def saturated(self) -> bool:
+        """True when new requests would be shed (the wait queue is full)"""
+        return len(self._queue) >= self.max_queue
+
+    def _client_bucket(self, client: str, now: float) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            if len(self._clients) >= self.max_clients:
+                # 満タンのバケツは新規作成と同じ状態なので捨ててよい
+                self._clients = {k: b for k, b in self._clients.items() if not b.full(now)}
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+        return bucket
+
+    def _can_start(self, now: float) -> bool:
+        return self.inflight < self.max_inflight and self.bucket.wait_time(now) == 0
+
+    def _start(self, now: float) -> None:
+        self.inflight += 1
+        self.bucket.take(now)
+        self.admitted += 1
+
+    def _retry_after(self, now: float) -> float:
+        # 待ち行列がはけるまでにトークンが補充される時間を目安として返す
+        return self.bucket.wait_time(now, len(self._queue) + 1)
+
+    def _drain(self) -> None:
+        """Admit queued requests in order while capacity and tokens allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            waiter = self._queue[0]
+            if waiter.future.done():
+                self._queue.popleft()
+                continue
+            if not self._can_start(now):
+                break
+            self._queue.popleft()
+            self._start(now)
+            waiter.future.set_result(None)
+        if self._queue and self._timer is None and self.inflight < self.max_inflight:
+            # トークン待ちのみの場合は補充される時刻に起こす
+            delay = self.bucket.wait_time(now)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._drain)
+
+    def _release(self) -> None:
+        self.inflight -= 1
+        if self._queue:
+            self._drain()
+
+    def release(self) -> None:
+        """Return a slot taken by acquire()"""
+        if self.enabled:
+            self._release()
+
+    async def acquire(self, client: str) -> None:
+        """Wait for admission or raise AdmissionRejected (call release() when done)"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        client_bucket = self._client_bucket(client, now)
+        client_wait = client_bucket.wait_time(now)
+        if client_wait > 0:
+            self.rejected_client += 1
+            raise AdmissionRejected(429, client_wait, "Too many sessions from this client")
+
+        if not self._queue and self._can_start(now):
+            self._start(now)
+            client_bucket.take(now)
+            return
+
+        if len(self._queue) >= self.max_queue:
+            self.rejected_overload += 1
+            raise AdmissionRejected(503, self._retry_after(now), "Server is at capacity")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), now + self.queue_timeout)
+        self._queue.append(waiter)
+        self._drain()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), waiter.deadline - now)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 期限と同時に枠が割り当てられていた場合は返却する
+                self._release()
+            else:
+                waiter.future.cancel()
+                try:
+                    self._queue.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected_overload += 1
+            raise AdmissionRejected(
+                503, self._retry_after(time.monotonic()), "Server is at capacity"
+            ) from None
+        client_bucket.take(time.monotonic())
+
+    @asynccontextmanager
+    async def admit(self, client: str) -> AsyncIterator[None]:
+        """Hold an admission slot for the duration of the block"""
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queued": len(self._queue),
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "tokens": round(self.bucket.tokens, 2),
+            "saturated": self.saturated,
+        }
+
+
+def client_key(forwarded_for: Optional[str], peer: Optional[str], trusted_hops: int = 1) -> str:
+    """Client identity for the per-client bucket
+
+    Uses the X-Forwarded-For entry appended by the outermost of `trusted_hops`
+    proxies in front of the app (else the peer). Entries to its left come
+    from the client and can be forged.
+    """
+    if forwarded_for and trusted_hops > 0:
+        # 各プロキシは末尾に接続元を追加するため、右から数える
+        hops = [hop.strip() for hop in forwarded_for.split(",")]
+        return hops[max(len(hops) - trusted_hops, 0)] or peer or "unknown"
+    return peer or "unknown"
+
+
+admission_controller = AdmissionController(
+    rate=settings.admission_rate,
+    burst=settings.admission_burst,
+    client_rate=settings.admission_client_rate,
+    client_burst=settings.admission_client_burst,
+    max_inflight=settings.admission_max_inflight,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    enabled=settings.admission_enabled,
+)
+
+registry.gauge("admission_inflight", "Session requests being processed",
+               lambda: admission_controller.inflight)
+registry.gauge("admission_queued", "Session requests waiting for admission",
+               lambda: admission_controller.queued)
+registry.counter("admission_admitted_total", "Session requests admitted",
+                 lambda: admission_controller.admitted)
+registry.counter("admission_rejected_client_total",
+                 "Session requests rejected by the per-client rate limit (429)",
+                 lambda: admission_controller.rejected_client)
+registry.counter("admission_rejected_overload_total",
+                 "Session requests shed because the server was at capacity (503)",
+                 lambda: admission_controller.rejected_overload)
@@ -0,0 +1,237 @@
+"""
+Agent Worker Pool
+
+Serves many concurrent calls from one process. Agents are constructed ahead
+of time into a warm pool so a join does not pay for building Agent, Edge and
+Realtime clients; agents are built in a worker thread so construction does
+not block the event loop. Concurrency is capped per process, process memory
+growth is recorded over each call's lifetime, and shutdown drains running
+calls before cancelling them.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ..config import settings
+from .metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class PoolFullError(Exception):
+    """Raised when the process is at its concurrency or memory cap"""
+
+
+class PoolDrainingError(Exception):
+    """Raised when the pool is shutting down and accepts no new calls"""
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+@dataclass
+class CallStats:
+    """Lifetime of a call and the process memory growth observed during it"""
+    call_id: str
+    started_at: float = field(default_factory=time.monotonic)
+    rss_at_start: int = field(default_factory=current_rss)
+    rss_peak: int = 0
+
+    @property
+    def process_rss_growth(self) -> int:
+        """Growth of the whole process RSS since the call started
+
+        Calls share one process, so this includes memory allocated by every
+        call running at the same time; it is an upper bound, not this call's
+        own footprint.
+        """
+        return max(self.rss_peak - self.rss_at_start, 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "call_id": self.call_id,
+            "duration_seconds": round(time.monotonic() - self.started_at, 1),
+            "process_rss_growth_mb": round(self.process_rss_growth / 1024 / 1024, 1),
+        }
+
+
+class AgentWorkerPool:
+    """Warm pool of pre-built object detector agents"""
+
+    def __init__(
+        self,
+        warm_size: int = 2,
+        max_concurrent_calls: int = 8,
+        max_rss_mb: int = 0,
+        sample_interval: float = 5.0,
+    ):
+        self.warm_size = warm_size
+        self.max_concurrent_calls = max_concurrent_calls
+        self.max_rss_mb = max_rss_mb
+        self.sample_interval = sample_interval
+        self._launcher = None
+        self._warm: list[Any] = []
+        self._calls: dict[str, tuple[asyncio.Task, CallStats]] = {}
+        self._starting: set[str] = set()  # エージェントを構築中の通話
+        self._refill_task: Optional[asyncio.Task] = None
+        self._sampler_task: Optional[asyncio.Task] = None
+        self._draining = False
+        self.completed_calls = 0
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the agent SDK is installed in this image"""
+        return importlib.util.find_spec("vision_agents") is not None
+
+    @property
+    def active_calls(self) -> int:
+        return len(self._calls)
+
+    @property
+    def warm_agents(self) -> int:
+        return len(self._warm)
+
+    def _get_launcher(self):
+        if self._launcher is None:
+            from src.agent import ObjectDetectorLauncher  # SDKは初回利用時に読み込む
+
+            self._launcher = ObjectDetectorLauncher()
+        return self._launcher
+
+    async def start(self) -> None:
+        """Pre-build agents and start memory sampling"""
+        self._draining = False
+        self._schedule_refill()
+        self._sampler_task = asyncio.create_task(self._sample_memory())
+
+    def _schedule_refill(self) -> None:
+        if self._draining or (self._refill_task and not self._refill_task.done()):
+            return
+        self._refill_task = asyncio.create_task(self._refill())
+
+    async def _build_agent(self) -> Any:
+        """Construct an agent in a worker thread (SDK constructors block)"""
+        launcher = self._get_launcher()
+        return await asyncio.to_thread(launcher.create_agent)
+
+    async def _refill(self) -> None:
+        while not self._draining and len(self._warm) < self.warm_size:
+            try:
+                agent = await self._build_agent()
+            except Exception:
+                logger.exception("Failed to pre-build agent")
+                return
+            self._warm.append(agent)
+
+    def _check_capacity(self) -> None:
+        if self._draining:
+            raise PoolDrainingError("agent pool is draining")
+        running = len(self._calls) + len(self._starting)
+        if running >= self.max_concurrent_calls:
+            raise PoolFullError(f"{running} calls already running")
+        if self.max_rss_mb and current_rss() > self.max_rss_mb * 1024 * 1024:
+            raise PoolFullError(f"process memory above {self.max_rss_mb} MB")
+
+    async def dispatch(self, call_id: str) -> bool:
+        """Start an agent for the call; returns False if one is already running"""
+        if call_id in self._calls or call_id in self._starting:
+            return False
+        self._check_capacity()
+        if self._warm:
+            agent = self._warm.pop()
+        else:
+            # 構築中も同じ通話への重複参加と同時実行数の超過を防ぐ
+            self._starting.add(call_id)
+            try:
+                agent = await self._build_agent()
+            finally:
+                self._starting.discard(call_id)
+            if self._draining:
+                raise PoolDrainingError("agent pool is draining")
+        stats = CallStats(call_id=call_id)
+        stats.rss_peak = stats.rss_at_start
+        task = asyncio.create_task(self._run(agent, stats), name=f"agent:{call_id}")
+        self._calls[call_id] = (task, stats)
+        self._schedule_refill()
+        return True
+
+    async def _run(self, agent: Any, stats: CallStats) -> None:
+        try:
+            await self._get_launcher().join_call(agent, stats.call_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Agent failed for call: {stats.call_id}")
+        finally:
+            stats.rss_peak = max(stats.rss_peak, current_rss())
+            self._calls.pop(stats.call_id, None)
+            self.completed_calls += 1
+            logger.info(f"Agent finished call: {stats.to_dict()}")
+
+    async def _sample_memory(self) -> None:
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            rss = current_rss()
+            for _, stats in self._calls.values():
+                stats.rss_peak = max(stats.rss_peak, rss)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active_calls": len(self._calls),
+            "warm_agents": len(self._warm),
+            "max_concurrent_calls": self.max_concurrent_calls,
+            "rss_mb": round(current_rss() / 1024 / 1024, 1),
+            "draining": self._draining,
+            "calls": [stats.to_dict() for _, stats in self._calls.values()],
+        }
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Stop accepting calls, wait for running ones, then cancel the rest"""
+        self._draining = True
+        for task in (self._refill_task, self._sampler_task):
+            if task:
+                task.cancel()
+        tasks = [task for task, _ in self._calls.values()]
+        if tasks:
+            logger.info(f"Draining {len(tasks)} agent calls (timeout {timeout}s)")
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for agent in self._warm:
+            close = getattr(agent, "close", None)
+            if close:
+                try:
+                    await close()
+                except Exception:
+                    logger.exception("Failed to close warm agent")
+        self._warm.clear()
+
+
+agent_pool = AgentWorkerPool(
+    warm_size=settings.agent_warm_pool_size,
+    max_concurrent_calls=settings.agent_max_concurrent_calls,
+    max_rss_mb=settings.agent_max_rss_mb,
+)
+
+registry.gauge("agent_active_calls", "Calls served by agents in this process",
+               lambda: agent_pool.active_calls)
+registry.gauge("agent_warm_agents", "Pre-built agents waiting for a call",
+               lambda: agent_pool.warm_agents)
+registry.counter("agent_completed_calls_total", "Agent calls finished",
+                 lambda: agent_pool.completed_calls)
+registry.gauge("process_resident_memory_bytes", "Resident memory of this process", current_rss)
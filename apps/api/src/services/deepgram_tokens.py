@@ -0,0 +1,221 @@
+"""
+Deepgram Token Broker
+
+Hands short-lived Deepgram access tokens to browsers instead of the API key.
+A pool of pre-minted tokens is refilled in the background over a pooled
+async HTTP client, so /voice-agent/config only pops a token from a deque.
+The pool is only kept full while tokens are being requested: after
+`idle_after` seconds without a request, expiring tokens are not replaced, and
+the next request (minted inline) starts refilling again.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from ..config import settings
+from .metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenUnavailableError(Exception):
+    """Raised when no token could be minted"""
+
+
+@dataclass(frozen=True)
+class DeepgramToken:
+    access_token: str
+    expires_at: float  # time.monotonic() 基準
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        return self.expires_at - (time.monotonic() if now is None else now)
+
+
+@dataclass(frozen=True)
+class DeepgramCredentials:
+    """Credential sent to the browser for the Voice Agent WebSocket"""
+    api_key: str
+    auth_scheme: str  # WebSocketのサブプロトコル ("token" = APIキー, "bearer" = 一時トークン)
+    expires_in: Optional[int] = None
+    min_remaining: Optional[int] = None  # 残りがこの秒数を切ったトークンでは接続しない
+
+
+class DeepgramTokenBroker:
+    """Pool of pre-minted Deepgram access tokens"""
+
+    def __init__(
+        self,
+        api_key: str,
+        grant_url: str = "https://api.deepgram.com/v1/auth/grant",
+        ttl_seconds: int = 60,
+        pool_size: int = 8,
+        min_remaining: float = 20.0,
+        idle_after: float = 120.0,
+    ):
+        self.api_key = api_key
+        self.grant_url = grant_url
+        self.ttl_seconds = ttl_seconds
+        self.pool_size = pool_size
+        self.min_remaining = min_remaining
+        self.idle_after = idle_after
+        self._last_demand = time.monotonic()
+        self._pool: deque[DeepgramToken] = deque()
+        self._client = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.minted = 0
+        self.inline_mints = 0
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    async def start(self, transport=None) -> None:
+        """Open the HTTP client and start filling the pool in the background
+
+        `transport` lets a local stand-in for the token service be plugged in.
+        """
+        import httpx  # 起動時間短縮のため遅延インポート
+
+        # 起動直後のセッションに備えて一度は満たしておく
+        self._last_demand = time.monotonic()
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            headers={"Authorization": f"Token {self.api_key}"},
+        )
+        self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def close(self) -> None:
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        self._pool.clear()
+
+    async def _mint(self) -> DeepgramToken:
+        if self._client is None:
+            raise TokenUnavailableError("token broker is not started")
+        requested_at = time.monotonic()
+        response = await self._client.post(self.grant_url, json={"ttl_seconds": self.ttl_seconds})
+        response.raise_for_status()
+        data = response.json()
+        self.minted += 1
+        return DeepgramToken(
+            access_token=data["access_token"],
+            expires_at=requested_at + float(data.get("expires_in", self.ttl_seconds)),
+        )
+
+    def _prune(self, now: float) -> None:
+        """Drop tokens that no longer leave enough time to connect"""
+        while self._pool and self._pool[0].remaining(now) < self.min_remaining:
+            self._pool.popleft()
+
+    @property
+    def idle(self) -> bool:
+        """No token was requested for `idle_after` seconds (the pool is not refilled)"""
+        return time.monotonic() - self._last_demand >= self.idle_after
+
+    async def acquire(self) -> DeepgramToken:
+        """Take a fresh token from the pool, minting inline only if it is empty"""
+        now = time.monotonic()
+        self._last_demand = now
+        self._prune(now)
+        # 取り出した分と期限切れで捨てた分を補充させる
+        self._wakeup.set()
+        if self._pool:
+            # 新しいトークンほど右側にあるため、最も有効期限の長いものを渡す
+            return self._pool.pop()
+        self.inline_mints += 1
+        try:
+            return await self._mint()
+        except Exception as e:
+            raise TokenUnavailableError(f"failed to mint Deepgram token: {e}") from e
+
+    async def _refill_loop(self) -> None:
+        backoff = 1.0
+        while True:
+            self._prune(time.monotonic())
+            # 利用のない間は補充しない (期限切れのトークンを作り続けない)
+            missing = 0 if self.idle else self.pool_size - len(self._pool)
+            if missing > 0:
+                results = await asyncio.gather(
+                    *(self._mint() for _ in range(missing)), return_exceptions=True
+                )
+                tokens = [r for r in results if isinstance(r, DeepgramToken)]
+                # 古い順に並べておき、期限切れは左から捨てる
+                for token in sorted(tokens, key=lambda t: t.expires_at):
+                    self._pool.append(token)
+                errors = [r for r in results if not isinstance(r, DeepgramToken)]
+                if errors:
+                    logger.warning(f"Failed to mint {len(errors)} Deepgram tokens: {errors[0]}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+                backoff = 1.0
+
+            # 最も古いトークンが使えなくなるか、利用が途絶えるか、取得で空きができるまで待つ
+            # (利用のない間は次の取得まで待つ)
+            wait: Optional[float] = None
+            if not self.idle:
+                wait = self._last_demand + self.idle_after - time.monotonic()
+                if self._pool:
+                    wait = min(wait, self._pool[0].remaining() - self.min_remaining)
+                wait = max(wait, 0.1)
+            self._wakeup.clear()
+            try:
+                # wait_for は起床と同時のキャンセルを握りつぶすことがあるため timeout を使う
+                async with asyncio.timeout(wait):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def credentials(self) -> DeepgramCredentials:
+        token = await self.acquire()
+        return DeepgramCredentials(
+            api_key=token.access_token,
+            auth_scheme="bearer",
+            expires_in=int(token.remaining()),
+            min_remaining=int(self.min_remaining),
+        )
+
+
+deepgram_token_broker = DeepgramTokenBroker(
+    api_key=settings.deepgram_api_key,
+    grant_url=settings.deepgram_token_url,
+    ttl_seconds=settings.deepgram_token_ttl,
+    pool_size=settings.deepgram_token_pool_size,
+    min_remaining=settings.deepgram_token_min_remaining,
+    idle_after=settings.deepgram_token_idle_after,
+)
+
+
+def token_broker_enabled() -> bool:
+    return settings.deepgram_token_broker and bool(settings.deepgram_api_key)
+
+
+async def get_deepgram_credentials() -> DeepgramCredentials:
+    """Short-lived token when the broker is enabled, otherwise the raw API key"""
+    if not token_broker_enabled():
+        return DeepgramCredentials(api_key=settings.deepgram_api_key, auth_scheme="token")
+    return await deepgram_token_broker.credentials()
+
+
+registry.gauge("deepgram_token_pool_size", "Pre-minted Deepgram tokens in the pool",
+               lambda: len(deepgram_token_broker))
+registry.counter("deepgram_tokens_minted_total", "Deepgram tokens minted",
+                 lambda: deepgram_token_broker.minted)
+registry.counter("deepgram_token_inline_mints_total",
+                 "Deepgram tokens minted on the request path because the pool was empty",
+                 lambda: deepgram_token_broker.inline_mints)
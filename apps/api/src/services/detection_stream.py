@@ -0,0 +1,218 @@
+"""
+Detection Stream
+
+Delivers structured detection results from the agent to web overlays.
+Each update is parsed and encoded as an SSE frame once, then fanned out to
+every viewer of the call. Viewers have small bounded queues; when a slow
+viewer falls behind, older updates are dropped so it only receives the
+newest state (every update carries the full object list). When the agent
+leaves the call, viewers receive the remaining updates and a final `end`
+event, and their streams close. An ended call is remembered for
+`ended_ttl` seconds so a viewer that connects late gets the last state and
+`end` right away instead of waiting on a call that will never update.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+
+from ..models.detection import DetectedObject, DetectionUpdate
+from .metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# モデル出力の ```json ... ``` ブロック、または最初の {...} を取り出す
+JSON_BLOCK = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```|(\{.*\})", re.DOTALL)
+
+
+def parse_detections(text: str) -> Optional[list[DetectedObject]]:
+    """Parse the `{"objects": [...]}` format from object_detector.md, or None"""
+    match = JSON_BLOCK.search(text)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1) or match.group(2))
+        items = data["objects"]
+        return [
+            DetectedObject(name=item) if isinstance(item, str) else DetectedObject(**item)
+            for item in items
+        ]
+    except (json.JSONDecodeError, KeyError, TypeError, ValidationError):
+        return None
+
+
+def encode_event(update: DetectionUpdate) -> bytes:
+    """Encode an update as a server-sent event frame"""
+    return f"id: {update.seq}\nevent: detections\ndata: {update.model_dump_json()}\n\n".encode()
+
+
+def encode_end(call_id: str) -> bytes:
+    """Final event telling the viewer the call ended (it should not reconnect)"""
+    return f"event: end\ndata: {json.dumps({'call_id': call_id})}\n\n".encode()
+
+
+class Subscriber:
+    """Bounded, coalescing queue of encoded events for one viewer"""
+
+    def __init__(self, maxsize: int = 2):
+        self._queue: deque[bytes] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+
+    def push(self, event: bytes) -> bool:
+        """Queue an event; returns True if an older one was dropped to make room"""
+        # 追いつけていない視聴者には古い状態を捨てて最新だけを残す
+        dropped = len(self._queue) == self._queue.maxlen
+        self._queue.append(event)
+        self._ready.set()
+        return dropped
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def wake(self) -> None:
+        """Wake a pending `get` without an event (it returns None)"""
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Next event, or None on timeout or wake-up"""
+        if not self._queue:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._queue.popleft() if self._queue else None
+
+
+class CallChannel:
+    """Latest state and viewers of a single call"""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.seq = 0
+        self.latest: Optional[bytes] = None
+        self.subscribers: set[Subscriber] = set()
+        self.ended = False
+        self.ended_at = 0.0
+
+
+class DetectionHub:
+    """Per-call fan-out of detection updates"""
+
+    def __init__(self, queue_size: int = 2, keepalive: float = 15.0, ended_ttl: float = 300.0):
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.ended_ttl = ended_ttl
+        self._channels: dict[str, CallChannel] = {}
+        # 終了した通話 (終了順)。期限までは後から来た視聴者にも終了を伝える
+        self._ended: OrderedDict[str, CallChannel] = OrderedDict()
+        self.published = 0
+        self.coalesced = 0
+
+    def _channel(self, call_id: str) -> CallChannel:
+        channel = self._channels.get(call_id)
+        if channel is None:
+            channel = self._channels[call_id] = CallChannel(call_id)
+        return channel
+
+    def _prune(self, now: float) -> None:
+        """Forget calls that ended more than `ended_ttl` seconds ago"""
+        while self._ended:
+            call_id, channel = next(iter(self._ended.items()))
+            if now - channel.ended_at < self.ended_ttl:
+                break
+            del self._ended[call_id]
+            if not channel.subscribers and self._channels.get(call_id) is channel:
+                del self._channels[call_id]
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(c.subscribers) for c in self._channels.values())
+
+    def publish(self, call_id: str, objects: list[DetectedObject]) -> DetectionUpdate:
+        """Encode the update once and push it to every viewer of the call"""
+        channel = self._channel(call_id)
+        if channel.ended:
+            # 同じ通話にエージェントが参加し直した
+            self._ended.pop(call_id, None)
+            channel = self._channels[call_id] = CallChannel(call_id)
+        channel.seq += 1
+        update = DetectionUpdate(
+            call_id=call_id, seq=channel.seq, objects=objects, timestamp=time.time()
+        )
+        event = encode_event(update)
+        channel.latest = event
+        for subscriber in channel.subscribers:
+            self.coalesced += subscriber.push(event)
+        self.published += 1
+        return update
+
+    def publish_text(self, call_id: str, text: str) -> Optional[DetectionUpdate]:
+        """Parse raw model output and publish it if it contains detections"""
+        objects = parse_detections(text)
+        if objects is None:
+            return None
+        return self.publish(call_id, objects)
+
+    def close_call(self, call_id: str) -> None:
+        """Mark a call ended once the agent left; its viewers get `end`"""
+        now = time.monotonic()
+        self._prune(now)
+        channel = self._channel(call_id)
+        if channel.ended:
+            return
+        channel.ended = True
+        channel.ended_at = now
+        self._ended[call_id] = channel
+        # 待機中の視聴者を起こして終了イベントを送らせる
+        for subscriber in channel.subscribers:
+            subscriber.wake()
+
+    async def stream(self, call_id: str) -> AsyncIterator[bytes]:
+        """SSE byte stream for one viewer (runs until the call ends or the client disconnects)"""
+        self._prune(time.monotonic())
+        channel = self._channel(call_id)
+        subscriber = Subscriber(self.queue_size)
+        channel.subscribers.add(subscriber)
+        try:
+            # 途中から視聴しても現在の状態をすぐ描画できるように最新を先に送る
+            if channel.latest is not None:
+                subscriber.push(channel.latest)
+            while True:
+                # 残りの更新を送り切ってから終了を伝える
+                if channel.ended and not subscriber:
+                    yield encode_end(call_id)
+                    return
+                event = await subscriber.get(timeout=self.keepalive)
+                if event is not None:
+                    yield event
+                elif not channel.ended:
+                    # 中継プロキシに切断されないようコメント行を送る
+                    yield b": keepalive\n\n"
+        finally:
+            channel.subscribers.discard(subscriber)
+            # 終了した通話は期限まで残す (期限後は _prune か最後の視聴者が消す)
+            if channel.ended:
+                unused = self._ended.get(call_id) is not channel
+            else:
+                unused = channel.latest is None
+            if unused and not channel.subscribers and self._channels.get(call_id) is channel:
+                del self._channels[call_id]
+
+
+detection_hub = DetectionHub()
+
+registry.gauge("detection_stream_subscribers", "Overlay viewers subscribed to detection streams",
+               lambda: detection_hub.subscriber_count)
+registry.counter("detection_stream_published_total", "Detection updates published",
+                 lambda: detection_hub.published)
+registry.counter("detection_stream_coalesced_total",
+                 "Stale detection updates dropped for viewers that fell behind",
+                 lambda: detection_hub.coalesced)
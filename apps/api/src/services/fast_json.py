@@ -0,0 +1,61 @@
+"""
+Fast JSON
+
+orjson-backed response serialization. `ORJSONResponse` encodes plain dict/list
+payloads; `model_bytes` serializes a pydantic model once so that immutable
+payloads (catalog entries, compiled prompts) can be kept as bytes and sent
+with `PrebuiltJSONResponse`, skipping response-model validation and encoding
+on every request. `merge_json` adds per-request fields to such bytes.
+Per-request encoding is recorded as the `json_serialization` stage.
+"""
+
+import json
+from typing import Any, Mapping
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .metrics import stage_timer
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準の json にフォールバック
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize plain JSON data (dict/list/str/number) to compact bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def model_bytes(model: BaseModel) -> bytes:
+    """Serialize a model straight to JSON bytes (no intermediate str)"""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def merge_json(fields: Mapping[str, Any], obj: bytes) -> bytes:
+    """Prepend `fields` to a serialized JSON object without re-encoding it"""
+    with stage_timer("json_serialization"):
+        head = dumps(fields)
+        if obj == b"{}":
+            return head
+        if head == b"{}":
+            return obj
+        return head[:-1] + b"," + obj[1:]
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        with stage_timer("json_serialization"):
+            return dumps(content)
+
+
+class PrebuiltJSONResponse(Response):
+    """Response whose content is already-serialized JSON bytes"""
+
+    media_type = "application/json"
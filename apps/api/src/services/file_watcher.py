@@ -0,0 +1,74 @@
+"""
+File Watcher
+
+Watches content directories (scripts, prompts) and reports changed files.
+Uses watchfiles when available and falls back to mtime polling.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ChangeHandler = Callable[[set[Path]], Awaitable[None]]
+
+
+def _snapshot(directory: Path, suffix: str) -> dict[Path, float]:
+    """Return mtime for every matching file in the directory"""
+    mtimes = {}
+    for path in directory.glob(f"*{suffix}"):
+        try:
+            mtimes[path] = path.stat().st_mtime
+        except OSError:
+            continue
+    return mtimes
+
+
+async def _dispatch(directory: Path, on_change: ChangeHandler, changed: set[Path]) -> None:
+    """Run the change handler without letting errors stop the watcher"""
+    try:
+        await on_change(changed)
+    except Exception:
+        logger.exception(f"Failed to handle changes in {directory}")
+
+
+async def _poll_directory(
+    directory: Path, suffix: str, on_change: ChangeHandler, interval: float
+) -> None:
+    """Fallback watcher comparing mtime snapshots"""
+    previous = await asyncio.to_thread(_snapshot, directory, suffix)
+    while True:
+        await asyncio.sleep(interval)
+        current = await asyncio.to_thread(_snapshot, directory, suffix)
+        changed = {
+            path
+            for path in previous.keys() | current.keys()
+            if previous.get(path) != current.get(path)
+        }
+        previous = current
+        if changed:
+            await _dispatch(directory, on_change, changed)
+
+
+async def watch_directory(
+    directory: Path,
+    on_change: ChangeHandler,
+    suffix: str = ".json",
+    poll_interval: float = 1.0,
+) -> None:
+    """Call on_change with the set of changed files until cancelled"""
+    try:
+        from watchfiles import awatch
+    except ImportError:
+        logger.info(f"watchfiles not installed, polling {directory} every {poll_interval}s")
+        await _poll_directory(directory, suffix, on_change, poll_interval)
+        return
+
+    logger.info(f"Watching {directory} for changes")
+    async for changes in awatch(directory, recursive=False):
+        changed = {Path(path) for _, path in changes if path.endswith(suffix)}
+        if changed:
+            await _dispatch(directory, on_change, changed)
@@ -0,0 +1,203 @@
+"""
+Greeting Audio Cache
+
+Pre-synthesized audio for session greetings. Greetings are fixed per scenario
+or script, so each (text, voice) pair is rendered once through a TextToSpeech
+backend and stored content-addressed: the key is a hash of the backend, audio
+format, voice and text, so an edited greeting simply gets a new key and stale
+audio is never served. Audio is kept on disk (shared by workers and restarts)
+and in a size-bounded in-memory LRU; concurrent misses for the same key share
+one synthesis. The client plays the cached greeting while the live Voice Agent
+connects instead of waiting for the agent to speak it.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, get_args
+
+from ..config import settings
+from ..models.coach import Scenario, VoiceAgentSessionConfig
+from .metrics import registry, stage_timer
+from .prompt_cache import prompt_cache
+from .tts import TextToSpeech, TTSError, create_tts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOICE: str = VoiceAgentSessionConfig.model_fields["voice"].default
+
+# 起動時の事前合成で TTS API に同時に送るリクエスト数
+WARM_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class GreetingAudio:
+    digest: str
+    data: bytes
+    media_type: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:32]}"'
+
+
+class GreetingAudioCache:
+    """Content-addressed greeting audio on disk and in memory"""
+
+    def __init__(self, tts: TextToSpeech, directory: Path, max_memory_bytes: int = 16 << 20):
+        self.tts = tts
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: OrderedDict[str, GreetingAudio] = OrderedDict()
+        self._memory_bytes = 0
+        self._pending: dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.synthesized = 0
+        self.failures = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def key(self, text: str, voice: str = DEFAULT_VOICE) -> str:
+        """Content address of the audio for `text` spoken by `voice`"""
+        material = "\0".join((self.tts.name, self.tts.media_type, voice, text))
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}{self.tts.extension}"
+
+    def _remember(self, audio: GreetingAudio) -> None:
+        if audio.digest in self._memory or len(audio.data) > self.max_memory_bytes:
+            return
+        self._memory[audio.digest] = audio
+        self._memory_bytes += len(audio.data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.data)
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 別ワーカーが読み途中のファイルを見ないよう、一時ファイルから置き換える
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    async def _load(self, digest: str, text: str, voice: str) -> GreetingAudio:
+        data = await asyncio.to_thread(self._read, digest)
+        if data is not None:
+            self.disk_hits += 1
+        else:
+            with stage_timer("greeting_tts"):
+                try:
+                    data = await self.tts.synthesize(text, voice)
+                except TTSError:
+                    self.failures += 1
+                    raise
+            self.synthesized += 1
+            try:
+                await asyncio.to_thread(self._write, digest, data)
+            except OSError as e:
+                # ディスクに書けなくてもメモリからは返せる
+                logger.warning(f"Greeting audio not persisted: {e}")
+        audio = GreetingAudio(digest=digest, data=data, media_type=self.tts.media_type)
+        self._remember(audio)
+        return audio
+
+    async def get(self, text: str, voice: str = DEFAULT_VOICE) -> GreetingAudio:
+        """Audio for `text`, synthesizing it on the first request (raises TTSError)"""
+        digest = self.key(text, voice)
+        audio = self._memory.get(digest)
+        if audio is not None:
+            self._memory.move_to_end(digest)
+            self.memory_hits += 1
+            return audio
+
+        pending = self._pending.get(digest)
+        if pending is None:
+            # 同じ挨拶の同時リクエストは1回の合成を共有する
+            pending = asyncio.ensure_future(self._load(digest, text, voice))
+            self._pending[digest] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(digest, None))
+        # 待っていた1件がキャンセルされても、合成自体は他の待ち手のために続ける
+        return await asyncio.shield(pending)
+
+    async def warm(self, texts: Iterable[str], voice: str = DEFAULT_VOICE) -> int:
+        """Synthesize the given greetings ahead of the first session; returns the count ready"""
+        semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+        async def one(text: str) -> bool:
+            async with semaphore:
+                try:
+                    await self.get(text, voice)
+                    return True
+                except TTSError as e:
+                    logger.warning(f"Greeting audio not warmed: {e}")
+                    return False
+
+        results = await asyncio.gather(*(one(text) for text in dict.fromkeys(texts)))
+        logger.info(f"Greeting audio warmed: {sum(results)}/{len(results)} greetings")
+        return sum(results)
+
+    async def start(self) -> None:
+        await self.tts.start()
+
+    async def close(self) -> None:
+        for pending in list(self._pending.values()):
+            pending.cancel()
+        await self.tts.close()
+
+
+def situation_greetings() -> list[str]:
+    """Greetings of every situation scenario (levels share the same greeting)"""
+    greetings = []
+    for scenario in get_args(Scenario):
+        compiled = prompt_cache.get("situation", "beginner", scenario)
+        if compiled is not None:
+            greetings.append(compiled.greeting)
+    return greetings
+
+
+def greeting_audio_enabled() -> bool:
+    if not settings.greeting_audio_enabled:
+        return False
+    return settings.greeting_tts_provider == "fake" or bool(settings.deepgram_api_key)
+
+
+greeting_audio = GreetingAudioCache(
+    tts=create_tts(),
+    directory=Path(settings.greeting_audio_dir),
+    max_memory_bytes=settings.greeting_audio_memory_mb << 20,
+)
+
+registry.counter("greeting_audio_memory_hits_total", "Greeting audio served from memory",
+                 lambda: greeting_audio.memory_hits)
+registry.counter("greeting_audio_disk_hits_total", "Greeting audio loaded from disk",
+                 lambda: greeting_audio.disk_hits)
+registry.counter("greeting_audio_synthesized_total", "Greetings synthesized through TTS",
+                 lambda: greeting_audio.synthesized)
+registry.counter("greeting_audio_failures_total", "Greeting syntheses that failed",
+                 lambda: greeting_audio.failures)
+registry.gauge("greeting_audio_memory_bytes", "Greeting audio held in memory",
+               lambda: greeting_audio.memory_bytes)
@@ -0,0 +1,155 @@
+"""
+HTTP Cache
+
+Conditional caching for catalog endpoints whose content only changes on deploy
+(or on a script hot reload). Each content version is serialized and compressed
+once; requests are answered with the stored bytes or a 304. Each encoding is
+a separate representation with its own strong ETag (`"<hash>-gzip"`,
+`"<hash>-br"`), as strong validators must differ per representation.
+"""
+
+import gzip
+import hashlib
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from .fast_json import model_bytes
+from .metrics import stage_timer
+
+try:
+    import brotli
+except ImportError:  # brotli は任意依存
+    brotli = None
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """Serialized JSON body with pre-compressed variants"""
+    raw: bytes
+    gzip: bytes
+    br: Optional[bytes]
+    etag: str
+    last_modified: float
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, last_modified: float) -> "CachedBody":
+        # コンテンツの版ごとに1回だけ (リクエストごとではない)
+        with stage_timer("cached_body_build"):
+            return cls(
+                raw=raw,
+                gzip=gzip.compress(raw, compresslevel=9, mtime=0),
+                br=brotli.compress(raw, quality=11) if brotli else None,
+                etag=f'"{hashlib.sha256(raw).hexdigest()[:32]}"',
+                last_modified=last_modified,
+            )
+
+    @classmethod
+    def from_model(cls, model: BaseModel, last_modified: float) -> "CachedBody":
+        return cls.from_bytes(model_bytes(model), last_modified)
+
+
+T = TypeVar("T")
+
+
+class BodyCache(Generic[T]):
+    """Keeps one body per key, rebuilt when the content version changes"""
+
+    def __init__(self):
+        self._entries: dict[Hashable, tuple[Hashable, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], T]) -> T:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        body = build()
+        with self._lock:
+            self._entries[key] = (version, body)
+        return body
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    """Check Accept-Encoding for an encoding not explicitly disabled with q=0"""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        params = params.replace(" ", "")
+        return params not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match は弱い比較 (W/ の有無を無視する)
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def representation_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETag of one encoding of a body (identity keeps the plain tag)"""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def _not_modified(request: Request, body: CachedBody, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(body.last_modified) <= since
+    return False
+
+
+def cached_response(request: Request, body: CachedBody, cache_control: str) -> Response:
+    """Build a 200/304 response from a CachedBody honoring conditional headers"""
+    content, encoding = body.raw, None
+    if body.br is not None and _accepts(request, "br"):
+        content, encoding = body.br, "br"
+    elif _accepts(request, "gzip"):
+        content, encoding = body.gzip, "gzip"
+    etag = representation_etag(body.etag, encoding)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(body.last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, body, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def etag_response(
+    request: Request,
+    etag: str,
+    cache_control: str,
+    render: Callable[[], bytes],
+    media_type: str = "application/json",
+) -> Response:
+    """Build a 200/304 response for content identified by a precomputed ETag
+
+    For per-query responses that are too many to keep pre-serialized: the body
+    is only rendered when the client does not already hold it.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    with stage_timer("json_serialization"):
+        content = render()
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -0,0 +1,191 @@
+"""
+Metrics
+
+Lightweight latency histograms exposed in Prometheus text format.
+Recording is a bisect plus a few integer updates so it can stay enabled in
+production; there is no dependency on prometheus_client. Families can be
+collected as plain data, so the pre-fork server can merge the samples of
+every worker into one exposition.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 秒単位 (100µs 〜 10s)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# (サンプル名, 波括弧なしのラベル文字列, 値)
+Sample = tuple[str, str, float]
+# (名前, 説明, 種類, サンプル)
+Family = tuple[str, str, str, list[Sample]]
+
+
+class Histogram:
+    """Cumulative-on-render histogram of observed values"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """Histograms sharing a name, keyed by label values"""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...],
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: dict[tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def collect(self) -> Family:
+        samples: list[Sample] = []
+        for values, child in sorted(self._children.items()):
+            labels = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)
+            )
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", f'{prefix}le="{bound}"', cumulative))
+            samples.append((f"{self.name}_bucket", f'{prefix}le="+Inf"', child.count))
+            samples.append((f"{self.name}_sum", labels, child.sum))
+            samples.append((f"{self.name}_count", labels, child.count))
+        return (self.name, self.help, "histogram", samples)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_families(families: Iterable[Family]) -> str:
+    """Prometheus text exposition of collected families"""
+    lines = []
+    for name, help, kind, samples in families:
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+        for sample, labels, value in samples:
+            lines.append(f"{sample}{{{labels}}} {value}" if labels else f"{sample} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_worker_families(per_worker: dict[int, list[Family]]) -> list[Family]:
+    """Combine the families of several processes, labelling each sample with its worker"""
+    merged: dict[str, Family] = {}
+    for worker, families in sorted(per_worker.items()):
+        worker_label = f'worker="{worker}"'
+        for name, help, kind, samples in families:
+            _, _, _, merged_samples = merged.setdefault(name, (name, help, kind, []))
+            merged_samples.extend(
+                (sample, f"{worker_label},{labels}" if labels else worker_label, value)
+                for sample, labels, value in samples
+            )
+    return list(merged.values())
+
+
+class MetricsRegistry:
+    """Holds histogram families and callback gauges/counters"""
+
+    def __init__(self):
+        self._histograms: list[HistogramFamily] = []
+        self._callbacks: list[tuple[str, str, str, Callable[[], float]]] = []
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> HistogramFamily:
+        family = HistogramFamily(name, help, labelnames, buckets)
+        self._histograms.append(family)
+        return family
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float]) -> None:
+        """Register a value read at scrape time"""
+        self._callbacks.append((name, help, "gauge", fn))
+
+    def counter(self, name: str, help: str, fn: Callable[[], float]) -> None:
+        """Register a monotonically increasing value read at scrape time"""
+        self._callbacks.append((name, help, "counter", fn))
+
+    def collect(self) -> list[Family]:
+        families = [family.collect() for family in self._histograms]
+        for name, help, kind, fn in self._callbacks:
+            families.append((name, help, kind, [(name, "", fn())]))
+        return families
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ("route", "method", "status"),
+)
+STAGE_LATENCY = registry.histogram(
+    "stage_duration_seconds",
+    "Internal stage latency (prompt assembly, script loading, file reads, serialization)",
+    ("stage",),
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block as an internal stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template and status"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # パスパラメータでカーディナリティが増えないようルートのテンプレートを使う
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                getattr(route, "path", "unmatched"), scope["method"], str(status)
+            ).observe(time.perf_counter() - started)
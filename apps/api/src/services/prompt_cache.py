@@ -0,0 +1,243 @@
+"""
+Prompt Cache
+
+Bounded LRU cache of compiled system prompts and greetings.
+The compiled output is a pure function of (mode, level, scenario, script_id),
+so entries are only dropped when the prompt or script sources change.
+Invalidation bumps a version, and a compile that started before it is not
+stored, so a slow compile cannot put a stale entry back into the cache.
+Each entry records its token count, and compilation enforces the
+configured token budget (see prompt_compiler).
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, get_args
+
+from ..agents.base_coach import BaseCoach
+from ..agents.script_coach import ScriptCoach
+from ..agents.situation_coach import PROMPTS_DIR, SituationCoach
+from ..config import settings
+from ..models.coach import Level, PromptSize, Scenario, VoiceAgentSessionConfig
+from .fast_json import model_bytes
+from .file_watcher import watch_directory
+from .metrics import registry, stage_timer
+from .script_catalog import script_catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PromptKey = tuple[str, str, Optional[str], Optional[str]]
+
+DEFAULT_SCENARIO = "restaurant"
+
+PROMPT_TOKENS = registry.histogram(
+    "prompt_tokens",
+    "Compiled system prompt size in tokens by mode",
+    ("mode",),
+    buckets=(250, 500, 750, 1000, 1250, 1500, 2000, 3000, 4000),
+)
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """System prompt and greeting for a Voice Agent session"""
+    prompt: str
+    greeting: str
+    tokens: int = 0
+    prefix_tokens: int = 0  # セッション間で共通の先頭部分
+    block_tokens: dict[str, int] = field(default_factory=dict)
+    dropped: tuple[str, ...] = ()
+    # 認証情報以外の Voice Agent 設定 (JSON)。リクエストごとにエンコードし直さない
+    config_json: bytes = b"{}"
+
+
+def make_key(
+    mode: str,
+    level: str,
+    scenario: Optional[str] = None,
+    script_id: Optional[str] = None,
+) -> PromptKey:
+    """Normalize a request into a cache key"""
+    if mode == "script":
+        return ("script", level, None, script_id)
+    if mode == "situation":
+        return ("situation", level, scenario or DEFAULT_SCENARIO, None)
+    # freetalk / pronunciation は現状レストランのシチュエーションと同じ内容
+    return ("situation", level, DEFAULT_SCENARIO, None)
+
+
+class PromptCache:
+    """LRU cache of compiled prompts"""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[PromptKey, CompiledPrompt] = OrderedDict()
+        self._lock = threading.Lock()
+        # 無効化のたびに増える。コンパイル開始時と異なれば結果を保存しない
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_discarded = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _compile(key: PromptKey) -> Optional[CompiledPrompt]:
+        mode, level, scenario, script_id = key
+        coach: BaseCoach
+        if mode == "script":
+            coach = ScriptCoach(level=level, script_id=script_id)
+            if not coach.script:
+                return None
+        else:
+            coach = SituationCoach(level=level, scenario=scenario)
+        with stage_timer("prompt_assembly"):
+            instructions = coach.compile_instructions(settings.prompt_token_budget or None)
+            greeting = coach.get_greeting()
+            compiled = CompiledPrompt(
+                prompt=instructions.text,
+                greeting=greeting,
+                tokens=instructions.tokens,
+                prefix_tokens=instructions.prefix_tokens,
+                block_tokens=instructions.block_tokens,
+                dropped=instructions.dropped,
+                config_json=model_bytes(VoiceAgentSessionConfig(
+                    prompt=instructions.text, greeting=greeting, prompt_tokens=instructions.tokens
+                )),
+            )
+        PROMPT_TOKENS.labels(mode).observe(compiled.tokens)
+        if compiled.dropped:
+            logger.warning(f"Prompt {key} over token budget, dropped: {list(compiled.dropped)}")
+        if instructions.over_budget:
+            # 長いスクリプトでもセッションは止めない (予算は目安として扱う)
+            logger.warning(
+                f"Prompt {key} needs {compiled.tokens} tokens with required blocks only, "
+                f"over the budget of {settings.prompt_token_budget}; serving it anyway"
+            )
+        return compiled
+
+    def get(
+        self,
+        mode: str,
+        level: str,
+        scenario: Optional[str] = None,
+        script_id: Optional[str] = None,
+    ) -> Optional[CompiledPrompt]:
+        """Return the compiled prompt, or None if the script does not exist"""
+        key = make_key(mode, level, scenario, script_id)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            version = self._version
+
+        compiled = self._compile(key)
+        if compiled is None:
+            return None
+        self._store(key, compiled, version)
+        return compiled
+
+    async def aget(
+        self,
+        mode: str,
+        level: str,
+        scenario: Optional[str] = None,
+        script_id: Optional[str] = None,
+    ) -> Optional[CompiledPrompt]:
+        """Like get(), but compiles cache misses in a worker thread"""
+        if make_key(mode, level, scenario, script_id) in self._entries:
+            return self.get(mode, level, scenario, script_id)
+        return await asyncio.to_thread(self.get, mode, level, scenario, script_id)
+
+    def _store(self, key: PromptKey, compiled: CompiledPrompt, version: int) -> None:
+        with self._lock:
+            if version != self._version:
+                # コンパイル中にソースが変わった (再コンパイルは次のリクエストで行う)
+                self.stale_discarded += 1
+                return
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def warm(self, scenarios: Optional[set[str]] = None) -> None:
+        """Pre-compile every scenario x level combination"""
+        if scenarios is None:
+            scenarios = set(get_args(Scenario))
+        for scenario in scenarios:
+            for level in get_args(Level):
+                key = make_key("situation", level, scenario)
+                version = self._version
+                compiled = self._compile(key)
+                if compiled is not None:
+                    self._store(key, compiled, version)
+        logger.info(f"Prompt cache warmed: {len(self._entries)} entries")
+
+    def report(self) -> list[PromptSize]:
+        """Token counts of every cached prompt, largest first"""
+        with self._lock:
+            entries = list(self._entries.items())
+        sizes = [
+            PromptSize(
+                mode=mode,
+                level=level,
+                scenario=scenario,
+                script_id=script_id,
+                tokens=compiled.tokens,
+                prefix_tokens=compiled.prefix_tokens,
+                blocks=compiled.block_tokens,
+                dropped=list(compiled.dropped),
+            )
+            for (mode, level, scenario, script_id), compiled in entries
+        ]
+        return sorted(sizes, key=lambda size: size.tokens, reverse=True)
+
+    def invalidate_scripts(self, script_ids: set[str]) -> None:
+        """Drop entries compiled from the given scripts"""
+        with self._lock:
+            self._version += 1
+            for key in [k for k in self._entries if k[0] == "script" and k[3] in script_ids]:
+                del self._entries[key]
+
+    def invalidate_scenarios(self, scenarios: set[str]) -> None:
+        """Drop entries compiled from the given scenario prompts"""
+        with self._lock:
+            self._version += 1
+            for key in [k for k in self._entries if k[0] != "script" and k[2] in scenarios]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    async def _on_prompts_changed(self, changed_files: set[Path]) -> None:
+        scenarios = {path.stem for path in changed_files}
+        logger.info(f"Scenario prompts changed: {sorted(scenarios)}")
+        self.invalidate_scenarios(scenarios)
+        await asyncio.to_thread(self.warm, scenarios & set(get_args(Scenario)))
+
+    async def watch(self) -> None:
+        """Recompile scenario prompts when their files change (runs until cancelled)"""
+        await watch_directory(PROMPTS_DIR, self._on_prompts_changed, suffix=".md")
+
+
+prompt_cache = PromptCache(maxsize=settings.prompt_cache_size)
+script_catalog.add_listener(prompt_cache.invalidate_scripts)
+
+registry.counter("prompt_cache_hits_total", "Prompt cache hits", lambda: prompt_cache.hits)
+registry.counter("prompt_cache_misses_total", "Prompt cache misses", lambda: prompt_cache.misses)
+registry.counter("prompt_cache_stale_discarded_total",
+                 "Compiled prompts not cached because their sources changed meanwhile",
+                 lambda: prompt_cache.stale_discarded)
+registry.gauge("prompt_cache_entries", "Compiled prompts held in the cache",
+               lambda: len(prompt_cache))
@@ -0,0 +1,137 @@
+"""
+Prompt Compiler
+
+Assembles coach prompt blocks into the final system prompt.
+Blocks are ordered from most shared to least shared (global -> mode ->
+level -> session) so every session of a mode starts with a byte-identical
+prefix that provider-side prompt caching can reuse. Whitespace is
+normalized, list items repeated across blocks are dropped, every block is
+measured in tokens and the result is checked against a token budget:
+optional blocks are dropped to fit it, required blocks are always kept.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Literal, Optional, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+except Exception:  # tiktoken は任意依存 (エンコーディングの取得失敗も含む)
+    _encoding = None
+
+Scope = Literal["global", "mode", "level", "session"]
+
+# 共有範囲の広い順 (前にあるほど多くのセッションで同一になる)
+SCOPE_ORDER: dict[str, int] = {"global": 0, "mode": 1, "level": 2, "session": 3}
+
+APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+(.*)$")
+BLANK_LINES = re.compile(r"\n{3,}")
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class PromptBlock:
+    """A named part of a system prompt"""
+    name: str
+    text: str
+    scope: Scope = "session"
+    required: bool = True  # False のブロックは予算超過時に削られる
+
+
+@dataclass(frozen=True)
+class CompiledPromptText:
+    text: str
+    tokens: int
+    prefix_tokens: int  # global/mode スコープ (セッション間で共通) のトークン数
+    block_tokens: dict[str, int]
+    dropped: tuple[str, ...] = ()
+    over_budget: bool = False  # 必須ブロックだけで予算を超えている
+
+
+def count_tokens(text: str) -> int:
+    """Token count (exact with tiktoken installed, otherwise a word/punctuation estimate)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(APPROX_TOKEN.findall(text))
+
+
+def normalize_whitespace(text: str) -> str:
+    """Strip trailing spaces and collapse runs of blank lines"""
+    lines = [line.rstrip() for line in text.strip("\n").splitlines()]
+    return BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _rule_key(item: str) -> str:
+    return NON_ALNUM.sub(" ", item.lower()).strip()
+
+
+def dedupe_rules(text: str, seen: set[str]) -> str:
+    """Drop list items already stated earlier in the prompt (updates `seen`)"""
+    kept = []
+    for line in text.splitlines():
+        match = LIST_ITEM.match(line)
+        if match:
+            key = _rule_key(match.group(1))
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def _clean(blocks: Sequence[PromptBlock]) -> list[tuple[PromptBlock, str, int]]:
+    """Deduplicated, normalized non-empty blocks with their token counts"""
+    seen: set[str] = set()
+    cleaned = []
+    for block in blocks:
+        text = normalize_whitespace(dedupe_rules(block.text, seen))
+        if text:
+            cleaned.append((block, text, count_tokens(text)))
+    return cleaned
+
+
+def compile_prompt(
+    blocks: Sequence[PromptBlock], budget: Optional[int] = None
+) -> CompiledPromptText:
+    """Order, clean and measure blocks; drop optional ones to fit the budget
+
+    Required blocks are never dropped, so the result can still be over the
+    budget (see `over_budget`).
+    """
+    # sorted は安定なので、同じスコープ内の順序は呼び出し側の指定どおり
+    ordered = sorted(blocks, key=lambda b: SCOPE_ORDER[b.scope])
+    cleaned = _clean(ordered)
+
+    dropped = []
+    # 区切りの空行分も含めて数える
+    total = count_tokens("\n\n".join(text for _, text, _ in cleaned))
+    if budget is not None and total > budget:
+        # 共有範囲の狭いブロックから削り、共通プレフィックスはできるだけ残す
+        for block in sorted((b for b, _, _ in cleaned), key=lambda b: -SCOPE_ORDER[b.scope]):
+            if total <= budget:
+                break
+            if block.required:
+                continue
+            ordered.remove(block)
+            dropped.append(block.name)
+            # 削ったブロックが先に述べていた項目は、後のブロックに戻す
+            cleaned = _clean(ordered)
+            total = count_tokens("\n\n".join(text for _, text, _ in cleaned))
+
+    text = "\n\n".join(text for _, text, _ in cleaned) + "\n"
+    prefix = [t for block, t, _ in cleaned if SCOPE_ORDER[block.scope] <= SCOPE_ORDER["mode"]]
+    return CompiledPromptText(
+        text=text,
+        tokens=total,
+        prefix_tokens=count_tokens("\n\n".join(prefix)) if prefix else 0,
+        block_tokens={block.name: tokens for block, _, tokens in cleaned},
+        dropped=tuple(dropped),
+        over_budget=budget is not None and total > budget,
+    )
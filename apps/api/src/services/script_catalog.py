@@ -0,0 +1,165 @@
+"""
+Script Catalog
+
+Validates every practice script once and serves lookups from memory.
+Changed files are re-parsed off the event loop and swapped in atomically.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+
+from ..models.script import Script, ScriptInfo
+from .file_watcher import watch_directory
+from .metrics import registry, stage_timer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "data" / "scripts"
+
+ChangeListener = Callable[[set[str]], None]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of all loaded scripts"""
+    scripts: dict[str, Script] = field(default_factory=dict)
+    infos: tuple[ScriptInfo, ...] = ()
+    # infos と同じ順の、カタログ上のID (ファイル名。Script.id と異なることがある)
+    script_ids: tuple[str, ...] = ()
+    version: int = 0
+    loaded_at: float = 0.0
+
+
+def _parse_script(script_file: Path) -> Script:
+    """Read and validate a single script file"""
+    with stage_timer("script_load"), open(script_file, encoding="utf-8") as f:
+        return Script(**json.load(f))
+
+
+def info_sort_key(info: ScriptInfo) -> tuple[str, str, str, str]:
+    """Listing order: category, difficulty, title (ID breaks ties)"""
+    return (info.category, info.difficulty, info.title, info.id)
+
+
+def _to_info(script: Script) -> ScriptInfo:
+    return ScriptInfo(
+        id=script.id,
+        title=script.title,
+        title_ja=script.title_ja,
+        description=script.description,
+        difficulty=script.difficulty,
+        category=script.category,
+        estimated_minutes=script.estimated_minutes,
+        line_count=len(script.lines),
+    )
+
+
+class ScriptCatalog:
+    """In-memory catalog of practice scripts keyed by file name"""
+
+    def __init__(self, scripts_dir: Path = SCRIPTS_DIR):
+        self.scripts_dir = scripts_dir
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._listeners: list[ChangeListener] = []
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot, loading from disk on first access"""
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Register a callback receiving the IDs of changed scripts"""
+        self._listeners.append(listener)
+
+    def load(self) -> None:
+        """Load every script from disk (blocking, call at startup)"""
+        scripts = {}
+        for script_file in self.scripts_dir.glob("*.json"):
+            try:
+                scripts[script_file.stem] = _parse_script(script_file)
+            except (OSError, json.JSONDecodeError, ValidationError) as e:
+                logger.warning(f"Failed to load script {script_file}: {e}")
+        self._publish(scripts, set(scripts))
+        logger.info(f"Loaded {len(scripts)} scripts from {self.scripts_dir}")
+
+    def _reload_files(self, changed_files: set[Path]) -> None:
+        """Re-parse changed files and publish a new snapshot"""
+        scripts = dict(self.snapshot.scripts)
+        changed_ids = set()
+        for script_file in changed_files:
+            script_id = script_file.stem
+            if not script_file.exists():
+                if scripts.pop(script_id, None) is not None:
+                    changed_ids.add(script_id)
+                    logger.info(f"Script removed: {script_id}")
+                continue
+            try:
+                scripts[script_id] = _parse_script(script_file)
+            except (OSError, json.JSONDecodeError, ValidationError) as e:
+                # 編集途中のファイルなどは直前の正常な内容を保持する
+                logger.warning(f"Failed to reload script {script_file}, keeping previous: {e}")
+                continue
+            changed_ids.add(script_id)
+            logger.info(f"Script reloaded: {script_id}")
+        if changed_ids:
+            self._publish(scripts, changed_ids)
+
+    async def reload(self, changed_files: set[Path]) -> None:
+        """Reload changed files without blocking the event loop"""
+        await asyncio.to_thread(self._reload_files, changed_files)
+
+    def _publish(self, scripts: dict[str, Script], changed_ids: set[str]) -> None:
+        entries = sorted(
+            ((_to_info(script), script_id) for script_id, script in scripts.items()),
+            key=lambda entry: info_sort_key(entry[0]),
+        )
+        previous = self._snapshot.version if self._snapshot else 0
+        # 参照の差し替えのみで公開するため、読み手は常に一貫したスナップショットを見る
+        self._snapshot = CatalogSnapshot(
+            scripts=scripts,
+            infos=tuple(info for info, _ in entries),
+            script_ids=tuple(script_id for _, script_id in entries),
+            version=previous + 1,
+            loaded_at=time.time(),
+        )
+        for listener in self._listeners:
+            try:
+                listener(changed_ids)
+            except Exception:
+                logger.exception("Script catalog listener failed")
+
+    def get(self, script_id: str) -> Optional[Script]:
+        """Look up a script by ID"""
+        return self.snapshot.scripts.get(script_id)
+
+    def list(self) -> list[ScriptInfo]:
+        """List script summaries in listing order (see info_sort_key)"""
+        return list(self.snapshot.infos)
+
+    async def watch(self) -> None:
+        """Hot-reload scripts when files change (runs until cancelled)"""
+        await watch_directory(self.scripts_dir, self.reload, suffix=".json")
+
+
+script_catalog = ScriptCatalog()
+
+registry.gauge("script_catalog_scripts", "Scripts loaded in the catalog",
+               lambda: len(script_catalog.snapshot.scripts))
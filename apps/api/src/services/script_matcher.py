@@ -0,0 +1,295 @@
+"""
+Script Matcher
+
+Scores what the learner said against the `user` lines of a script without
+asking the LLM. Every line is normalized and indexed once per catalog
+version (tokens, character trigrams and a trigram -> line inverted index),
+so scoring one transcript against one line is a set intersection plus a
+word-level edit distance over a dozen tokens: a few microseconds.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from ..models.script import LineScore, Script, SessionScoreResponse, Verdict
+from .script_catalog import script_catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 音声認識は短縮形を展開したりしなかったりするため、両側で展開してから比較する
+CONTRACTIONS = {
+    "i'm": "i am", "i'd": "i would", "i'll": "i will", "i've": "i have",
+    "you're": "you are", "you'd": "you would", "you'll": "you will",
+    "we're": "we are", "they're": "they are", "it's": "it is", "that's": "that is",
+    "there's": "there is", "what's": "what is", "where's": "where is",
+    "let's": "let us", "can't": "can not", "cannot": "can not", "won't": "will not",
+    "don't": "do not", "doesn't": "does not", "didn't": "did not", "isn't": "is not",
+    "aren't": "are not", "wasn't": "was not", "couldn't": "could not",
+    "wouldn't": "would not", "shouldn't": "should not",
+}
+NON_WORD = re.compile(r"[^a-z0-9' ]+")
+APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+
+MATCH_THRESHOLD = 0.8
+CLOSE_THRESHOLD = 0.55
+
+
+def normalize(text: str) -> tuple[str, ...]:
+    """Lower-case, strip punctuation and expand contractions into tokens"""
+    text = NON_WORD.sub(" ", text.translate(APOSTROPHES).lower())
+    tokens = []
+    for word in text.split():
+        expanded = CONTRACTIONS.get(word)
+        if expanded:
+            tokens.extend(expanded.split())
+        else:
+            tokens.append(word.strip("'"))
+    return tuple(t for t in tokens if t)
+
+
+def trigrams(tokens: Sequence[str]) -> frozenset[str]:
+    """Character trigrams of the space-joined tokens (padded at both ends)"""
+    text = f" {' '.join(tokens)} "
+    return frozenset(text[i : i + 3] for i in range(len(text) - 2))
+
+
+def match_masks(pattern: Sequence[str]) -> dict[str, int]:
+    """Bit mask of the positions of each token in the pattern"""
+    masks: dict[str, int] = {}
+    for position, token in enumerate(pattern):
+        masks[token] = masks.get(token, 0) | (1 << position)
+    return masks
+
+
+def bit_parallel_distance(masks: dict[str, int], length: int, text: Sequence[str]) -> int:
+    """Word-level Levenshtein distance (Myers/Hyyrö bit-parallel algorithm)
+
+    `masks` and `length` describe the pattern (see match_masks); the whole DP
+    column is updated with a handful of integer operations per text token.
+    """
+    if length == 0:
+        return len(text)
+    full = (1 << length) - 1
+    high = 1 << (length - 1)
+    pv, mv, distance = full, 0, length
+    for token in text:
+        eq = masks.get(token, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            distance += 1
+        elif mh & high:
+            distance -= 1
+        # 全体一致の距離なので、先頭行は毎列 +1 (ph に 1 を入れる)
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv & full
+    return distance
+
+
+def word_edit_distance(a: Sequence[str], b: Sequence[str]) -> int:
+    """Levenshtein distance counted in words"""
+    return bit_parallel_distance(match_masks(a), len(a), b)
+
+
+@dataclass(frozen=True)
+class IndexedLine:
+    """A `user` line with its precomputed features"""
+    line_id: int
+    text: str
+    tokens: tuple[str, ...]
+    grams: frozenset[str]
+    masks: dict[str, int]
+
+
+@dataclass
+class ScriptIndex:
+    """Indexed user lines of one script"""
+    script_id: str
+    lines: list[IndexedLine]
+    by_id: dict[int, IndexedLine] = field(default_factory=dict)
+    postings: dict[str, list[int]] = field(default_factory=dict)  # トライグラム -> lines の位置
+
+    @classmethod
+    def build(cls, script: Script) -> "ScriptIndex":
+        lines = []
+        for line in script.lines:
+            if line.speaker != "user":
+                continue
+            tokens = normalize(line.text)
+            lines.append(IndexedLine(
+                line_id=line.id,
+                text=line.text,
+                tokens=tokens,
+                grams=trigrams(tokens),
+                masks=match_masks(tokens),
+            ))
+        index = cls(script_id=script.id, lines=lines)
+        for position, line in enumerate(lines):
+            index.by_id[line.line_id] = line
+            for gram in line.grams:
+                index.postings.setdefault(gram, []).append(position)
+        return index
+
+    def candidates(self, grams: frozenset[str], limit: int = 3) -> list[IndexedLine]:
+        """Lines sharing the most trigrams with the transcript"""
+        counts: dict[int, int] = {}
+        for gram in grams:
+            for position in self.postings.get(gram, ()):
+                counts[position] = counts.get(position, 0) + 1
+        best = sorted(counts, key=counts.__getitem__, reverse=True)[:limit]
+        return [self.lines[position] for position in best]
+
+
+def _verdict(score: float) -> Verdict:
+    if score >= MATCH_THRESHOLD:
+        return "match"
+    if score >= CLOSE_THRESHOLD:
+        return "close"
+    return "miss"
+
+
+def line_similarity(tokens: tuple[str, ...], grams: frozenset[str], line: IndexedLine) -> float:
+    """Similarity in [0, 1] between normalized transcript features and a line"""
+    if not tokens or not line.tokens:
+        return 1.0 if tokens == line.tokens else 0.0
+    distance = bit_parallel_distance(line.masks, len(line.tokens), tokens)
+    word_similarity = 1.0 - distance / max(len(tokens), len(line.tokens))
+    # 綴りの揺れ (認識ミス) は文字トライグラムの Dice 係数で拾う
+    char_similarity = 2 * len(grams & line.grams) / (len(grams) + len(line.grams))
+    return round(0.6 * word_similarity + 0.4 * char_similarity, 3)
+
+
+def _line_score(
+    line: IndexedLine,
+    score: float,
+    tokens: tuple[str, ...] = (),
+    utterance_index: Optional[int] = None,
+) -> LineScore:
+    return LineScore(
+        line_id=line.line_id,
+        expected=line.text,
+        score=score,
+        verdict=_verdict(score),
+        missing_words=[t for t in line.tokens if t not in tokens],
+        utterance_index=utterance_index,
+    )
+
+
+class ScriptMatcher:
+    """Per-script line indexes, rebuilt when the catalog changes a script"""
+
+    def __init__(self):
+        self._indexes: dict[str, ScriptIndex] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, script_ids: set[str]) -> None:
+        with self._lock:
+            for script_id in script_ids:
+                self._indexes.pop(script_id, None)
+
+    def index(self, script_id: str) -> Optional[ScriptIndex]:
+        index = self._indexes.get(script_id)
+        if index is not None:
+            return index
+        script = script_catalog.get(script_id)
+        if script is None:
+            return None
+        index = ScriptIndex.build(script)
+        with self._lock:
+            self._indexes[script_id] = index
+        return index
+
+    def warm(self) -> None:
+        """Index every script in the catalog (call at startup)"""
+        for script_id in script_catalog.snapshot.scripts:
+            self.index(script_id)
+
+    def score(
+        self, index: ScriptIndex, transcript: str, line_id: Optional[int] = None
+    ) -> Optional[LineScore]:
+        """Score a transcript against a given line, or against the best candidate line
+
+        Returns None if `line_id` is not a user line, or if the script has no
+        user lines to pick from.
+        """
+        tokens = normalize(transcript)
+        grams = trigrams(tokens)
+        if line_id is not None:
+            line = index.by_id.get(line_id)
+            if line is None:
+                return None
+            return _line_score(line, line_similarity(tokens, grams, line), tokens)
+        # 共通のトライグラムがない (空の発話など) 場合は全行と比べて miss を返す
+        candidates = index.candidates(grams) or index.lines
+        scored = [(line_similarity(tokens, grams, line), line) for line in candidates]
+        if not scored:
+            return None
+        score, line = max(scored, key=lambda pair: pair[0])
+        return _line_score(line, score, tokens)
+
+    def score_session(self, index: ScriptIndex, utterances: Sequence[str]) -> SessionScoreResponse:
+        """Align utterances to user lines in script order and score each line
+
+        Uses a monotonic alignment (utterances and lines may both be skipped)
+        maximizing the total score of matched pairs.
+        """
+        features = [(tokens, trigrams(tokens)) for tokens in map(normalize, utterances)]
+        lines = index.lines
+        # miss 判定のペアは対応付けに使わない
+        gains = [
+            [score if score >= CLOSE_THRESHOLD else 0.0
+             for score in (line_similarity(t, g, line) for line in lines)]
+            for t, g in features
+        ]
+
+        rows, cols = len(features), len(lines)
+        best = [[0.0] * (cols + 1) for _ in range(rows + 1)]
+        for i in range(1, rows + 1):
+            for j in range(1, cols + 1):
+                best[i][j] = max(
+                    best[i - 1][j], best[i][j - 1], best[i - 1][j - 1] + gains[i - 1][j - 1]
+                )
+
+        # 経路を逆にたどって各行に対応する発話を決める
+        aligned: dict[int, int] = {}
+        i, j = rows, cols
+        while i and j:
+            gain = gains[i - 1][j - 1]
+            if gain and best[i][j] == best[i - 1][j - 1] + gain:
+                aligned[j - 1] = i - 1
+                i, j = i - 1, j - 1
+            elif best[i][j] == best[i - 1][j]:
+                i -= 1
+            else:
+                j -= 1
+
+        results = []
+        for position, line in enumerate(lines):
+            utterance = aligned.get(position)
+            if utterance is None:
+                results.append(_line_score(line, 0.0))
+            else:
+                results.append(_line_score(
+                    line, gains[utterance][position], features[utterance][0], utterance
+                ))
+        matched = sum(r.verdict == "match" for r in results)
+        overall = sum(r.score for r in results) / len(results) if results else 0.0
+        return SessionScoreResponse(
+            script_id=index.script_id,
+            lines=results,
+            matched=matched,
+            total=len(results),
+            overall=round(overall, 3),
+        )
+
+
+script_matcher = ScriptMatcher()
+script_catalog.add_listener(script_matcher.invalidate)
@@ -0,0 +1,222 @@
+"""
+Script Search
+
+Filtered, paginated queries over the script catalog from prebuilt indexes.
+Each catalog snapshot is indexed once: facet postings (category, difficulty,
+estimated minutes) and an inverted index from the tokens of titles,
+descriptions and line text to scripts. Postings are bitmaps (Python ints, bit
+i = i-th script in listing order), so a query is a few AND/OR operations and
+a page is read by walking set bits from the cursor position.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from ..models.script import Script, ScriptInfo
+from .metrics import stage_timer
+from .script_catalog import CatalogSnapshot, info_sort_key, script_catalog
+from .script_matcher import normalize
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 入力途中の最後の語は前方一致で検索する (短すぎる接頭辞は語彙の大半に当たるため除外)
+MIN_PREFIX_LENGTH = 3
+
+SortKey = tuple[str, str, str, str]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    scripts: list[ScriptInfo]
+    total: int
+    next_cursor: Optional[str]
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Opaque cursor pointing just after the script with this sort key"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list) or len(key) != 4 or not all(isinstance(k, str) for k in key):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def _script_tokens(script: Script) -> frozenset[str]:
+    parts = [script.title, script.description, *(line.text for line in script.lines)]
+    return frozenset(token for part in parts for token in normalize(part))
+
+
+@dataclass
+class SearchIndex:
+    """Bitmap postings over one catalog snapshot (bit i = infos[i])"""
+    version: int
+    infos: tuple[ScriptInfo, ...]
+    keys: list[SortKey]
+    etag: str
+    everything: int = 0
+    categories: dict[str, int] = field(default_factory=dict)
+    difficulties: dict[str, int] = field(default_factory=dict)
+    minute_values: list[int] = field(default_factory=list)  # 昇順
+    minute_postings: list[int] = field(default_factory=list)
+    terms: dict[str, int] = field(default_factory=dict)
+    vocabulary: list[str] = field(default_factory=list)  # 前方一致用に整列済み
+
+    @classmethod
+    def build(cls, snapshot: CatalogSnapshot, tokens: dict[str, frozenset[str]]) -> "SearchIndex":
+        """Index a snapshot (`tokens` are keyed by catalog ID, like `snapshot.scripts`)"""
+        digest = hashlib.sha256()
+        minutes: dict[int, int] = {}
+        index = cls(
+            version=snapshot.version,
+            infos=snapshot.infos,
+            keys=[info_sort_key(info) for info in snapshot.infos],
+            etag="",
+        )
+        for position, (info, script_id) in enumerate(zip(snapshot.infos, snapshot.script_ids)):
+            bit = 1 << position
+            index.everything |= bit
+            index.categories[info.category] = index.categories.get(info.category, 0) | bit
+            index.difficulties[info.difficulty] = index.difficulties.get(info.difficulty, 0) | bit
+            minutes[info.estimated_minutes] = minutes.get(info.estimated_minutes, 0) | bit
+            for token in tokens[script_id]:
+                index.terms[token] = index.terms.get(token, 0) | bit
+            digest.update(snapshot.scripts[script_id].model_dump_json().encode())
+        index.minute_values = sorted(minutes)
+        index.minute_postings = [minutes[value] for value in index.minute_values]
+        index.vocabulary = sorted(index.terms)
+        # 再起動でバージョンが戻っても誤って 304 を返さないよう、内容のハッシュを使う
+        index.etag = f'W/"scripts-{digest.hexdigest()[:32]}"'
+        return index
+
+    def _minutes(self, low: Optional[int], high: Optional[int]) -> int:
+        start = 0 if low is None else bisect_left(self.minute_values, low)
+        end = len(self.minute_values) if high is None else bisect_right(self.minute_values, high)
+        bitmap = 0
+        for posting in self.minute_postings[start:end]:
+            bitmap |= posting
+        return bitmap
+
+    def _prefix(self, prefix: str) -> int:
+        bitmap = 0
+        for position in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            term = self.vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            bitmap |= self.terms[term]
+        return bitmap
+
+    def _text(self, query: str) -> int:
+        tokens = normalize(query)
+        bitmap = self.everything
+        for position, token in enumerate(tokens):
+            last = position == len(tokens) - 1 and not query[-1:].isspace()
+            if last and len(token) >= MIN_PREFIX_LENGTH:
+                bitmap &= self._prefix(token)
+            else:
+                bitmap &= self.terms.get(token, 0)
+            if not bitmap:
+                break
+        return bitmap
+
+    def search(
+        self,
+        categories: Sequence[str] = (),
+        difficulties: Sequence[str] = (),
+        min_minutes: Optional[int] = None,
+        max_minutes: Optional[int] = None,
+        query: str = "",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """Scripts matching every given filter, in listing order"""
+        bitmap = self.everything
+        if categories:
+            bitmap &= _union(self.categories, categories)
+        if difficulties:
+            bitmap &= _union(self.difficulties, difficulties)
+        if min_minutes is not None or max_minutes is not None:
+            bitmap &= self._minutes(min_minutes, max_minutes)
+        if query.strip():
+            bitmap &= self._text(query)
+        total = bitmap.bit_count()
+
+        if cursor:
+            # カタログが更新されてもソートキーで位置を決めるので、ページがずれない
+            start = bisect_right(self.keys, decode_cursor(cursor))
+            bitmap = bitmap >> start << start
+        page = []
+        while bitmap and (limit is None or len(page) < limit):
+            low = bitmap & -bitmap
+            page.append(self.infos[low.bit_length() - 1])
+            bitmap ^= low
+        next_cursor = encode_cursor(info_sort_key(page[-1])) if bitmap and page else None
+        return SearchPage(scripts=page, total=total, next_cursor=next_cursor)
+
+
+def _union(postings: dict[str, int], values: Sequence[str]) -> int:
+    bitmap = 0
+    for value in values:
+        bitmap |= postings.get(value, 0)
+    return bitmap
+
+
+class ScriptSearch:
+    """Keeps a SearchIndex in step with the script catalog"""
+
+    def __init__(self):
+        self._index: Optional[SearchIndex] = None
+        self._tokens: dict[str, frozenset[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> SearchIndex:
+        index = self._index
+        if index is None or index.version != script_catalog.version:
+            self.rebuild(set(script_catalog.snapshot.scripts))
+            index = self._index
+        return index
+
+    def rebuild(self, changed_ids: set[str]) -> None:
+        """Re-tokenize changed scripts and rebuild the postings (catalog listener)"""
+        with self._lock, stage_timer("script_search_index"):
+            snapshot = script_catalog.snapshot
+            if self._index is not None and self._index.version == snapshot.version:
+                return
+            # 変更のないスクリプトはトークン化済みの結果を使い回す
+            tokens = {
+                script_id: self._tokens[script_id]
+                for script_id in snapshot.scripts
+                if script_id in self._tokens and script_id not in changed_ids
+            }
+            for script_id, script in snapshot.scripts.items():
+                if script_id not in tokens:
+                    tokens[script_id] = _script_tokens(script)
+            self._tokens = tokens
+            self._index = SearchIndex.build(snapshot, tokens)
+        logger.info(
+            f"Script search index built: {len(snapshot.infos)} scripts, "
+            f"{len(self._index.terms)} terms"
+        )
+
+
+script_search = ScriptSearch()
+script_catalog.add_listener(script_search.rebuild)
@@ -0,0 +1,296 @@
+"""
+Session Store
+
+Write-behind persistence of practice session statistics in SQLite (WAL).
+Request handlers only enqueue records; a background task drains the queue
+and writes whole batches in one transaction off the event loop. Per-scenario,
+per-script, per-level and per-mode rollups are updated in the same
+transaction, so aggregate queries read a handful of precomputed rows.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional, Union
+
+from ..config import settings
+from ..models.coach import (
+    EndSessionRequest,
+    SessionEvent,
+    SessionStatsGroup,
+    StatsDimension,
+)
+from .metrics import registry, stage_timer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    level TEXT NOT NULL,
+    scenario TEXT,
+    script_id TEXT,
+    duration INTEGER NOT NULL,
+    messages_exchanged INTEGER NOT NULL,
+    lines_completed INTEGER,
+    ended_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT,
+    score REAL,
+    latency_ms INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_events_session ON session_events (session_id);
+CREATE TABLE IF NOT EXISTS session_rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    duration_sum INTEGER NOT NULL,
+    messages_sum INTEGER NOT NULL,
+    lines_sum INTEGER NOT NULL,
+    lines_sessions INTEGER NOT NULL,
+    PRIMARY KEY (dimension, key)
+);
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO session_rollups VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (dimension, key) DO UPDATE SET
+    sessions = sessions + excluded.sessions,
+    duration_sum = duration_sum + excluded.duration_sum,
+    messages_sum = messages_sum + excluded.messages_sum,
+    lines_sum = lines_sum + excluded.lines_sum,
+    lines_sessions = lines_sessions + excluded.lines_sessions
+"""
+
+EndRecord = tuple[EndSessionRequest, float]
+EventsRecord = tuple[str, list[SessionEvent], float]
+
+
+def _dimensions(session: EndSessionRequest) -> list[tuple[str, str]]:
+    keys = [("mode", session.mode), ("level", session.level)]
+    if session.scenario:
+        keys.append(("scenario", session.scenario))
+    if session.script_id:
+        keys.append(("script", session.script_id))
+    return keys
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WALでは NORMAL でもクラッシュ時に壊れない (直近のコミットが失われる可能性のみ)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class SessionStore:
+    """Buffered SQLite writer for session ends and per-turn events"""
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch: list[Union[EndRecord, EventsRecord]] = []
+        self._inflight: Optional[asyncio.Future] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """Open the database and start the background flusher"""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._writer = await asyncio.to_thread(_connect, self.path)
+        await asyncio.to_thread(self._writer.executescript, SCHEMA)
+        self._reader = await asyncio.to_thread(_connect, self.path)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Session store opened: {self.path}")
+
+    async def close(self) -> None:
+        """Flush what is queued and close the database"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._inflight:
+            # 書き込み中のバッチはスレッド側で完了させてから残りを書く
+            await self._inflight
+            self._inflight = None
+        batch, self._batch = self._batch, []
+        if self._queue:
+            batch.extend(self._queue.get_nowait() for _ in range(self._queue.qsize()))
+        if batch:
+            await asyncio.to_thread(self._write, batch)
+        for conn in (self._writer, self._reader):
+            if conn:
+                conn.close()
+        self._writer = self._reader = None
+        self._queue = None
+
+    def _enqueue(self, record: Union[EndRecord, EventsRecord]) -> bool:
+        if self._queue is None:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # リクエストを待たせないため、溢れた分は捨てて記録だけ残す
+            self.dropped += 1
+            return False
+        return True
+
+    def record_end(self, session: EndSessionRequest) -> bool:
+        """Queue a finished session (never blocks); False if it was dropped"""
+        return self._enqueue((session, time.time()))
+
+    def record_events(self, session_id: str, events: list[SessionEvent]) -> bool:
+        """Queue per-turn events (never blocks); False if they were dropped"""
+        return self._enqueue((session_id, events, time.time()))
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            # 最初の1件から flush_interval の間、batch_size まで溜めて一括で書く
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                if not self._queue.empty():
+                    self._batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            self._inflight = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    def _write(self, batch: list[Union[EndRecord, EventsRecord]]) -> None:
+        """Write a batch and update rollups in a single transaction"""
+        rollups: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+        event_rows = []
+        try:
+            with stage_timer("session_store_flush"):
+                self._writer.execute("BEGIN IMMEDIATE")
+                for record in batch:
+                    if not isinstance(record[0], EndSessionRequest):
+                        session_id, events, received_at = record
+                        event_rows.extend(
+                            (session_id, e.type, e.text, e.score, e.latency_ms,
+                             e.timestamp or received_at)
+                            for e in events
+                        )
+                        continue
+                    session, ended_at = record
+                    inserted = self._writer.execute(
+                        "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (session.session_id, session.mode, session.level, session.scenario,
+                         session.script_id, session.duration, session.messages_exchanged,
+                         session.lines_completed, ended_at),
+                    ).rowcount
+                    # 再送された同じセッションは集計に含めない
+                    if not inserted:
+                        continue
+                    for key in _dimensions(session):
+                        totals = rollups[key]
+                        totals[0] += 1
+                        totals[1] += session.duration
+                        totals[2] += session.messages_exchanged
+                        if session.lines_completed is not None:
+                            totals[3] += session.lines_completed
+                            totals[4] += 1
+                if event_rows:
+                    self._writer.executemany(
+                        "INSERT INTO session_events (session_id, type, text, score, latency_ms,"
+                        " created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        event_rows,
+                    )
+                self._writer.executemany(
+                    UPSERT_ROLLUP, [(*key, *totals) for key, totals in rollups.items()]
+                )
+                self._writer.execute("COMMIT")
+            self.written += len(batch)
+        except sqlite3.Error:
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            self.failed += len(batch)
+            logger.exception(f"Failed to write {len(batch)} session records")
+
+    def _query_stats(self, dimension: StatsDimension) -> list[SessionStatsGroup]:
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT key, sessions, duration_sum, messages_sum, lines_sum, lines_sessions"
+                " FROM session_rollups WHERE dimension = ? ORDER BY sessions DESC, key",
+                (dimension,),
+            ).fetchall()
+        return [
+            SessionStatsGroup(
+                key=key,
+                sessions=sessions,
+                avg_duration=round(duration_sum / sessions, 1),
+                avg_messages=round(messages_sum / sessions, 1),
+                avg_lines_completed=(
+                    round(lines_sum / lines_sessions, 1) if lines_sessions else None
+                ),
+            )
+            for key, sessions, duration_sum, messages_sum, lines_sum, lines_sessions in rows
+        ]
+
+    async def stats(self, dimension: StatsDimension) -> list[SessionStatsGroup]:
+        """Aggregates per key of a dimension, read from the rollup table"""
+        if self._reader is None:
+            return []
+        return await asyncio.to_thread(self._query_stats, dimension)
+
+
+session_store = SessionStore(
+    path=settings.session_store_path,
+    batch_size=settings.session_store_batch_size,
+    flush_interval=settings.session_store_flush_interval,
+    queue_size=settings.session_store_queue_size,
+)
+
+registry.gauge("session_store_pending", "Session records waiting to be written",
+               lambda: session_store.pending)
+registry.counter("session_store_written_total", "Session records written to SQLite",
+                 lambda: session_store.written)
+registry.counter("session_store_dropped_total",
+                 "Session records dropped because the write queue was full",
+                 lambda: session_store.dropped)
+registry.counter("session_store_failed_total", "Session records lost to write errors",
+                 lambda: session_store.failed)
@@ -0,0 +1,86 @@
+"""
+GetStream Client
+
+Thin async client for the GetStream Video REST API.
+One keep-alive connection pool is shared by all requests instead of
+constructing an SDK client per request; tokens are signed locally.
+"""
+
+import logging
+from typing import Any, Optional
+
+from ..config import settings
+from .stream_tokens import StreamTokenCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StreamAPIError(Exception):
+    """Raised when the GetStream API returns an error"""
+
+
+class StreamClient:
+    """Pooled async client for GetStream Video"""
+
+    def __init__(self, api_key: str, api_secret: str, base_url: str, token_ttl: int = 3600):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.tokens = StreamTokenCache(api_secret, ttl_seconds=token_ttl)
+        self._client = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.tokens.secret)
+
+    async def start(self, transport=None) -> None:
+        """Open the shared HTTP client"""
+        import httpx  # 起動時間短縮のため遅延インポート
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            params={"api_key": self.api_key},
+        )
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, json: Optional[dict] = None) -> dict:
+        if self._client is None:
+            await self.start()
+        response = await self._client.request(
+            method,
+            path,
+            json=json,
+            headers={
+                "Authorization": self.tokens.server_token(),
+                "stream-auth-type": "jwt",
+            },
+        )
+        if response.status_code >= 400:
+            raise StreamAPIError(f"{method} {path} failed: {response.status_code} {response.text}")
+        return response.json()
+
+    async def get_or_create_call(
+        self, call_type: str, call_id: str, created_by: dict[str, Any]
+    ) -> bool:
+        """Create the call if needed; returns True when it was newly created"""
+        data = await self._request(
+            "POST",
+            f"/video/call/{call_type}/{call_id}",
+            json={"data": {"created_by": created_by}},
+        )
+        return bool(data.get("created", False))
+
+
+stream_client = StreamClient(
+    api_key=settings.stream_api_key,
+    api_secret=settings.stream_api_secret,
+    base_url=settings.stream_api_base_url,
+    token_ttl=settings.stream_token_ttl,
+)
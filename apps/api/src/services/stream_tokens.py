@@ -0,0 +1,63 @@
+"""
+Stream Tokens
+
+Signs GetStream user and server tokens locally (HS256 with stream_api_secret)
+and caches them until shortly before they expire.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Any, Optional
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+_HEADER = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+
+def sign_jwt(payload: dict[str, Any], secret: str) -> str:
+    """Encode and sign a JWT with HS256"""
+    body = _b64url(json.dumps(payload, separators=(",", ":")).encode())
+    signing_input = _HEADER + b"." + body
+    signature = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64url(signature)).decode()
+
+
+class StreamTokenCache:
+    """Expiry-aware cache of locally signed Stream tokens"""
+
+    def __init__(self, secret: str, ttl_seconds: int = 3600, refresh_margin: int = 300):
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_sign(self, key: str, claims: dict[str, Any], now: Optional[float]) -> str:
+        now = time.time() if now is None else now
+        cached = self._tokens.get(key)
+        if cached is not None and cached[1] - now > self.refresh_margin:
+            return cached[0]
+        issued_at = int(now)
+        expires_at = issued_at + self.ttl_seconds
+        token = sign_jwt({**claims, "iat": issued_at, "exp": expires_at}, self.secret)
+        with self._lock:
+            # 期限切れのトークンが溜まらないよう、書き込み時に掃除する
+            if len(self._tokens) > 10_000:
+                self._tokens = {k: v for k, v in self._tokens.items() if v[1] > now}
+            self._tokens[key] = (token, expires_at)
+        return token
+
+    def user_token(self, user_id: str, now: Optional[float] = None) -> str:
+        """Token for a client-side user connection"""
+        return self._get_or_sign(f"user:{user_id}", {"user_id": user_id}, now)
+
+    def server_token(self, now: Optional[float] = None) -> str:
+        """Token for server-side REST calls"""
+        return self._get_or_sign("server", {"server": True}, now)
@@ -0,0 +1,158 @@
+"""
+Text-to-Speech
+
+Backends that render short texts to encoded audio. `TextToSpeech` is the
+interface; `DeepgramTTS` calls the Deepgram speak API (the same Aura voices
+the Voice Agent uses) over a pooled async HTTP client, and `FakeTTS` renders a
+deterministic tone locally for development without a Deepgram key.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import math
+import struct
+import wave
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from ..config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# encoding 設定 -> (Content-Type, 拡張子, speak API のクエリ)
+DEEPGRAM_ENCODINGS: dict[str, tuple[str, str, dict[str, str]]] = {
+    "mp3": ("audio/mpeg", ".mp3", {"encoding": "mp3", "bit_rate": "48000"}),
+    "opus": ("audio/ogg", ".ogg", {"encoding": "opus", "container": "ogg"}),
+    "wav": ("audio/wav", ".wav",
+            {"encoding": "linear16", "container": "wav", "sample_rate": "16000"}),
+}
+
+
+class TTSError(Exception):
+    """Raised when a text cannot be synthesized"""
+
+
+class TextToSpeech(ABC):
+    """Text-to-speech backend producing one encoded audio file per call"""
+
+    name = "tts"
+    media_type = "application/octet-stream"
+    extension = ".bin"
+
+    async def start(self) -> None:
+        """Open connections (called from the app lifespan)"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+    @abstractmethod
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """Render `text` with `voice`, raising TTSError on failure"""
+
+
+class DeepgramTTS(TextToSpeech):
+    """Deepgram speak API (POST /v1/speak)"""
+
+    name = "deepgram"
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = "https://api.deepgram.com/v1/speak",
+        encoding: str = "mp3",
+        timeout: float = 10.0,
+    ):
+        if encoding not in DEEPGRAM_ENCODINGS:
+            raise ValueError(f"Unsupported TTS encoding: {encoding}")
+        self.api_key = api_key
+        self.url = url
+        self.media_type, self.extension, self.params = DEEPGRAM_ENCODINGS[encoding]
+        self.timeout = timeout
+        self._client = None
+
+    async def start(self, transport=None) -> None:
+        """Open the HTTP client (`transport` lets a local stand-in be plugged in)"""
+        import httpx  # 起動時間短縮のため遅延インポート
+
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            headers={"Authorization": f"Token {self.api_key}"},
+        )
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        if self._client is None:
+            raise TTSError("TTS client is not started")
+        try:
+            response = await self._client.post(
+                self.url, params={"model": voice, **self.params}, json={"text": text}
+            )
+            response.raise_for_status()
+        except Exception as e:
+            raise TTSError(f"Deepgram speak request failed: {e}") from e
+        if not response.content:
+            raise TTSError("Deepgram speak returned no audio")
+        return response.content
+
+
+@lru_cache(maxsize=64)
+def _tone_period(pitch: int, sample_rate: int) -> bytes:
+    """One full period of a quiet sine tone as 16-bit little-endian PCM"""
+    # 整数の周波数なら sample_rate / gcd サンプルで波形が一巡する
+    length = sample_rate // math.gcd(pitch, sample_rate)
+    return struct.pack(
+        f"<{length}h",
+        *(int(3000 * math.sin(2 * math.pi * pitch * i / sample_rate)) for i in range(length)),
+    )
+
+
+class FakeTTS(TextToSpeech):
+    """Local stand-in: a quiet tone as 16 kHz WAV, longer for longer texts"""
+
+    name = "fake"
+    media_type = "audio/wav"
+    extension = ".wav"
+
+    def __init__(self, sample_rate: int = 16000, seconds_per_word: float = 0.3, delay: float = 0.0):
+        self.sample_rate = sample_rate
+        self.seconds_per_word = seconds_per_word
+        self.delay = delay  # 実際の合成待ちを模す
+        self.calls = 0
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        # 声ごとに音程を変え、同じ入力からは同じバイト列を返す
+        pitch = 220 + int(hashlib.sha256(voice.encode()).hexdigest()[:4], 16) % 220
+        samples = int(self.sample_rate * self.seconds_per_word * max(len(text.split()), 1))
+        # 1周期分を繰り返すだけにして、イベントループ上でサンプルごとの計算をしない
+        period = _tone_period(pitch, self.sample_rate)
+        frames = (period * (samples * 2 // len(period) + 1))[: samples * 2]
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(frames)
+        return buffer.getvalue()
+
+
+def create_tts() -> TextToSpeech:
+    """Backend selected by GREETING_TTS_PROVIDER"""
+    if settings.greeting_tts_provider == "fake":
+        return FakeTTS()
+    return DeepgramTTS(
+        api_key=settings.deepgram_api_key,
+        url=settings.deepgram_speak_url,
+        encoding=settings.greeting_audio_encoding,
+    )
@@ -0,0 +1,160 @@
+"""
+Voice Activity Gate
+
+Thins out silent microphone audio on the relay path. Learners often pause for
+a long time while thinking; streaming that silence costs upstream bandwidth
+and agent audio minutes for nothing. Each linear16 chunk is split into short
+frames and classified with vectorized NumPy features: RMS energy against an
+adaptive noise floor, and the zero-crossing rate to reject hiss. Speech is
+forwarded unchanged; after speech ends, a hangover keeps forwarding the
+trailing silence the agent needs to detect the end of the turn. Beyond that
+silent chunks are held in a short pre-roll buffer (flushed ahead of the next
+speech onset so it is not clipped) and otherwise dropped, with KeepAlive
+messages sent in their place.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from .voice_relay import KEEPALIVE
+
+# 16bit のフルスケール (dBFS の基準)
+FULL_SCALE = 32768.0
+
+
+@dataclass
+class VoiceGateStats:
+    chunks: int = 0
+    bytes_in: int = 0
+    bytes_forwarded: int = 0
+    chunks_dropped: int = 0
+    onsets: int = 0
+    keepalives: int = 0
+    processing_seconds: float = 0.0
+    max_processing_seconds: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_forwarded
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.bytes_saved / self.bytes_in if self.bytes_in else 0.0
+
+    @property
+    def mean_latency_ms(self) -> float:
+        """Processing time the gate adds per chunk"""
+        return self.processing_seconds / self.chunks * 1000 if self.chunks else 0.0
+
+
+def frame_features(samples: np.ndarray, frame: int) -> tuple[np.ndarray, np.ndarray]:
+    """Energy (dBFS) and zero-crossing rate of each `frame`-sample frame"""
+    count = len(samples) // frame
+    frames = samples[: count * frame].reshape(count, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(rms / FULL_SCALE + 1e-9)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame - 1)
+    return energy_db, zcr
+
+
+class VoiceGate:
+    """Per-session speech gate over 16-bit little-endian mono PCM chunks"""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 16.0,
+        min_db: float = -50.0,
+        margin_db: float = 12.0,
+        max_zcr: float = 0.35,
+        min_speech_frames: int = 2,
+        hangover: float = 1.5,
+        pre_roll: float = 0.3,
+        keepalive_interval: float = 4.0,
+    ):
+        self.frame = max(int(sample_rate * frame_ms / 1000), 2)
+        self.min_db = min_db
+        self.margin_db = margin_db
+        self.max_zcr = max_zcr
+        self.min_speech_frames = min_speech_frames
+        self.hangover = hangover
+        self.pre_roll_bytes = int(sample_rate * pre_roll) * 2
+        self.keepalive_interval = keepalive_interval
+        self.noise_db = min_db - margin_db
+        self.active = False
+        self._last_speech = 0.0
+        self._last_sent: Optional[float] = None
+        self._pre_roll: deque[bytes] = deque()
+        self._pre_roll_size = 0
+        self.stats = VoiceGateStats()
+
+    @property
+    def threshold_db(self) -> float:
+        return max(self.min_db, self.noise_db + self.margin_db)
+
+    def is_speech(self, chunk: bytes) -> bool:
+        """Classify a chunk and update the noise floor from its quiet frames"""
+        # バイト列をコピーせずにサンプル列として読む
+        samples = np.frombuffer(chunk, dtype="<i2", count=len(chunk) // 2)
+        if len(samples) < self.frame:
+            return self.active
+        energy_db, zcr = frame_features(samples, self.frame)
+        threshold = self.threshold_db
+        # 雑音 (ヒスノイズ) は零交差率が高い。十分に大きな音は零交差率によらず発話とみなす
+        voiced = (energy_db > threshold) & ((zcr < self.max_zcr) | (energy_db > threshold + 10))
+        quiet = energy_db[~voiced]
+        if quiet.size:
+            # 雑音レベルは下がる時は速く、上がる時はゆっくり追従する
+            level = float(np.median(quiet))
+            rate = 0.5 if level < self.noise_db else 0.05
+            self.noise_db += rate * (level - self.noise_db)
+        return int(np.count_nonzero(voiced)) >= self.min_speech_frames
+
+    def _hold(self, chunk: bytes) -> None:
+        self._pre_roll.append(chunk)
+        self._pre_roll_size += len(chunk)
+        while self._pre_roll_size > self.pre_roll_bytes and len(self._pre_roll) > 1:
+            self._pre_roll_size -= len(self._pre_roll.popleft())
+
+    def process(self, chunk: bytes, now: float) -> list[Union[bytes, str]]:
+        """Messages to send upstream for one microphone chunk (possibly none)"""
+        started = time.perf_counter()
+        if self._last_sent is None:
+            self._last_sent = now
+        out: list[Union[bytes, str]] = []
+        if self.is_speech(chunk):
+            if not self.active:
+                # 発話の立ち上がりが切れないよう、直前の無音を先に送る
+                out.extend(self._pre_roll)
+                self.stats.chunks_dropped -= len(self._pre_roll)
+                self._pre_roll.clear()
+                self._pre_roll_size = 0
+                self.stats.onsets += 1
+            self.active = True
+            self._last_speech = now
+            out.append(chunk)
+        elif self.active and now - self._last_speech < self.hangover:
+            # 発話終了の検出に必要な無音は送る
+            out.append(chunk)
+        else:
+            self.active = False
+            self._hold(chunk)
+            self.stats.chunks_dropped += 1
+            if now - self._last_sent >= self.keepalive_interval:
+                out.append(KEEPALIVE)
+                self.stats.keepalives += 1
+        if out:
+            self._last_sent = now
+
+        elapsed = time.perf_counter() - started
+        self.stats.chunks += 1
+        self.stats.bytes_in += len(chunk)
+        self.stats.bytes_forwarded += sum(len(m) for m in out if isinstance(m, bytes))
+        self.stats.processing_seconds += elapsed
+        self.stats.max_processing_seconds = max(self.stats.max_processing_seconds, elapsed)
+        return out
@@ -0,0 +1,480 @@
+"""
+Voice Agent Relay
+
+Server-side relay between the browser and the Deepgram Voice Agent. The
+browser connects to the API instead of dialing Deepgram itself; the API
+attaches it to an upstream agent connection that is already open and
+configured. `UpstreamPool` keeps a few such connections per compiled prompt
+(the Settings message is the pool key), kept alive with KeepAlive messages
+and refilled in the background after each hand-off, so session start skips
+the TLS/WebSocket handshake and the Settings round trip.
+
+Frames are forwarded as-is in both directions (no re-encoding, no
+permessage-deflate). Backpressure is per connection: frames are sent one at a
+time and reading from a side pauses while the other side is not taking data;
+a peer that cannot take a frame within `send_timeout` is disconnected.
+Microphone audio can optionally pass through a `VoiceGate` (voice_gate.py)
+that drops silence and sends KeepAlive messages in its place.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+
+from ..config import settings
+from .fast_json import dumps
+from .metrics import registry
+
+if TYPE_CHECKING:
+    from .voice_gate import VoiceGate, VoiceGateStats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ブラウザから直接接続していた時と同じ音声形式 (16kHz linear16)
+AGENT_AUDIO = {
+    "input": {"encoding": "linear16", "sample_rate": 16000},
+    "output": {"encoding": "linear16", "sample_rate": 16000, "container": "none"},
+}
+KEEPALIVE = json.dumps({"type": "KeepAlive"})
+
+RELAY_CONNECT_SECONDS = registry.histogram(
+    "voice_relay_connect_seconds",
+    "Time to attach a relay session to an upstream agent connection",
+    ("pool",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+RELAY_FIRST_AUDIO_SECONDS = registry.histogram(
+    "voice_relay_first_audio_seconds",
+    "Time from the first microphone frame to the first agent audio frame",
+    ("pool",),
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+
+
+class RelayError(Exception):
+    """Raised when no upstream agent connection could be opened"""
+
+
+class FrameTooLarge(Exception):
+    """Raised when a client frame exceeds the relay limits"""
+
+
+@dataclass(frozen=True)
+class RelayLimits:
+    max_frame_bytes: int = 64 << 10
+    write_limit: int = 256 << 10  # 上流への送信バッファの上限 (超えると送信側が待つ)
+    max_queue: int = 32  # 上流から受信済みで未転送のフレーム数の上限
+    send_timeout: float = 5.0  # これ以上受け取れない相手は切断する
+
+
+@dataclass
+class RelayStats:
+    client_frames: int = 0
+    client_bytes: int = 0
+    agent_frames: int = 0
+    agent_bytes: int = 0
+    first_audio_seconds: Optional[float] = None
+    gate: Optional["VoiceGateStats"] = None
+    _first_client_audio: Optional[float] = field(default=None, repr=False)
+
+
+@lru_cache(maxsize=512)
+def agent_settings(config_json: bytes, spoken_greeting: bool) -> tuple[str, str]:
+    """Pool key and Settings message for a compiled session config
+
+    With `spoken_greeting=False` the client plays the cached greeting audio
+    itself, so the greeting is given to the agent as history; such upstreams
+    can be opened ahead of time because the agent stays silent until spoken to.
+    """
+    config = json.loads(config_json)
+    agent: dict[str, Any] = {
+        "listen": {"provider": {"type": "deepgram", "model": config["listen_model"]}},
+        "think": {
+            "provider": {"type": config["think_provider"], "model": config["think_model"]},
+            "prompt": config["prompt"],
+        },
+        "speak": {"provider": {"type": "deepgram", "model": config["voice"]}},
+    }
+    if spoken_greeting:
+        agent["greeting"] = config["greeting"]
+    else:
+        agent["context"] = {
+            "messages": [{"type": "History", "role": "assistant", "content": config["greeting"]}]
+        }
+    message = dumps({"type": "Settings", "audio": AGENT_AUDIO, "agent": agent})
+    return hashlib.sha256(message).hexdigest()[:16], message.decode()
+
+
+@dataclass
+class Upstream:
+    """Configured agent connection"""
+    connection: Any  # websockets.asyncio.client.ClientConnection
+    key: str
+    opened_at: float
+    warm: bool = False
+
+    @property
+    def is_open(self) -> bool:
+        from websockets.protocol import State
+
+        return self.connection.state is State.OPEN
+
+
+class UpstreamPool:
+    """Pre-opened, pre-configured agent connections per Settings message"""
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        size: int = 1,
+        max_keys: int = 16,
+        idle_ttl: float = 60.0,
+        key_ttl: float = 300.0,
+        keepalive_interval: float = 5.0,
+        connect_timeout: float = 10.0,
+        limits: RelayLimits = RelayLimits(),
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.size = size
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        self.key_ttl = key_ttl
+        self.keepalive_interval = keepalive_interval
+        self.connect_timeout = connect_timeout
+        self.limits = limits
+        self._idle: dict[str, deque[Upstream]] = {}
+        # 最近要求されたプロンプト (key -> (Settings, 最終要求時刻))。この分だけ温めておく
+        self._wanted: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._refills: dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.warm_hits = 0
+        self.cold_opens = 0
+        self.open_failures = 0
+        self.expired = 0
+
+    @property
+    def idle_count(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+    def idle_for(self, key: str) -> int:
+        return len(self._idle.get(key, ()))
+
+    async def _open(self, key: str, message: str) -> Upstream:
+        from websockets.asyncio.client import connect  # 起動時間短縮のため遅延インポート
+
+        connection = await connect(
+            self.url,
+            additional_headers={"Authorization": f"Token {self.api_key}"},
+            open_timeout=self.connect_timeout,
+            compression=None,  # 音声フレームは圧縮しても縮まない
+            max_size=self.limits.max_frame_bytes,
+            max_queue=self.limits.max_queue,
+            write_limit=self.limits.write_limit,
+        )
+        try:
+            await connection.send(message)
+            async with asyncio.timeout(self.connect_timeout):
+                # Welcome の後、設定が反映されたら音声を流せる
+                while True:
+                    reply = await connection.recv()
+                    if isinstance(reply, bytes):
+                        continue
+                    kind = json.loads(reply).get("type")
+                    if kind == "SettingsApplied":
+                        break
+                    if kind == "Error":
+                        raise RelayError(f"Agent rejected settings: {reply}")
+        except BaseException:
+            await connection.close()
+            raise
+        return Upstream(connection=connection, key=key, opened_at=time.monotonic())
+
+    async def acquire(self, key: str, message: str, pooled: bool = True) -> Upstream:
+        """Take a warm connection for `key`, or open one (raises RelayError)"""
+        if pooled and self.size > 0:
+            self._want(key, message)
+            idle = self._idle.get(key)
+            while idle:
+                upstream = idle.popleft()
+                if upstream.is_open:
+                    self.warm_hits += 1
+                    upstream.warm = True
+                    self._refill_later(key)
+                    return upstream
+                self.expired += 1
+            self._refill_later(key)
+
+        self.cold_opens += 1
+        try:
+            return await self._open(key, message)
+        except Exception as e:
+            self.open_failures += 1
+            raise RelayError(f"Failed to connect to the voice agent: {e}") from e
+
+    def warm(self, key: str, message: str) -> None:
+        """Start keeping connections open for a prompt ahead of its first session"""
+        if self.size > 0:
+            self._want(key, message)
+            self._refill_later(key)
+
+    def _want(self, key: str, message: str) -> None:
+        self._wanted[key] = (message, time.monotonic())
+        self._wanted.move_to_end(key)
+        while len(self._wanted) > self.max_keys:
+            evicted, _ = self._wanted.popitem(last=False)
+            self._discard_key(evicted)
+
+    def _discard_key(self, key: str) -> None:
+        refill = self._refills.pop(key, None)
+        if refill:
+            refill.cancel()
+        for upstream in self._idle.pop(key, ()):
+            asyncio.create_task(upstream.connection.close())
+
+    def _refill_later(self, key: str) -> None:
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: str) -> None:
+        while key in self._wanted and self.idle_for(key) < self.size:
+            message, _ = self._wanted[key]
+            try:
+                upstream = await self._open(key, message)
+            except Exception as e:
+                # 次の保守周期で再試行する
+                self.open_failures += 1
+                logger.warning(f"Failed to pre-open agent connection {key}: {e}")
+                return
+            if key not in self._wanted:
+                await upstream.connection.close()
+                return
+            self._idle.setdefault(key, deque()).append(upstream)
+
+    async def _maintain_once(self) -> None:
+        now = time.monotonic()
+        stale = [k for k, (_, wanted_at) in self._wanted.items() if now - wanted_at > self.key_ttl]
+        for key in stale:
+            del self._wanted[key]
+            self._discard_key(key)
+        for key, idle in list(self._idle.items()):
+            for upstream in list(idle):
+                if not upstream.is_open or now - upstream.opened_at > self.idle_ttl:
+                    # 長時間待機した接続は上流に切られる前に入れ替える
+                    idle.remove(upstream)
+                    self.expired += 1
+                    await upstream.connection.close()
+                    continue
+                try:
+                    await upstream.connection.send(KEEPALIVE)
+                except Exception:
+                    idle.remove(upstream)
+                    self.expired += 1
+        for key in self._wanted:
+            if self.idle_for(key) < self.size:
+                self._refill_later(key)
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self._maintain_once()
+            except Exception:
+                logger.exception("Agent connection pool maintenance failed")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._maintain())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for key in list(self._wanted):
+            self._discard_key(key)
+        self._wanted.clear()
+        for task in list(self._refills.values()):
+            task.cancel()
+        self._refills.clear()
+
+
+@dataclass
+class GateTotals:
+    """Voice gate results summed over finished relay sessions"""
+    sessions: int = 0
+    bytes_in: int = 0
+    bytes_saved: int = 0
+    keepalives: int = 0
+
+    def add(self, stats: "VoiceGateStats") -> None:
+        self.sessions += 1
+        self.bytes_in += stats.bytes_in
+        self.bytes_saved += stats.bytes_saved
+        self.keepalives += stats.keepalives
+
+
+_gate_unavailable_logged = False
+
+
+def create_voice_gate() -> Optional["VoiceGate"]:
+    """A VoiceGate for one relay session, or None when disabled or numpy is missing"""
+    global _gate_unavailable_logged
+    if not settings.voice_gate_enabled:
+        return None
+    try:
+        from .voice_gate import VoiceGate  # numpy の読み込みは最初の中継セッションまで遅らせる
+    except ImportError:
+        if not _gate_unavailable_logged:
+            _gate_unavailable_logged = True
+            logger.warning(
+                "numpy is not installed; relaying microphone audio without the voice gate"
+            )
+        return None
+    return VoiceGate(
+        sample_rate=AGENT_AUDIO["input"]["sample_rate"],
+        min_db=settings.voice_gate_min_db,
+        hangover=settings.voice_gate_hangover,
+        pre_roll=settings.voice_gate_pre_roll,
+    )
+
+
+async def _client_to_agent(
+    client: WebSocket, upstream: Upstream, limits: RelayLimits, stats: RelayStats,
+    gate: Optional["VoiceGate"],
+) -> None:
+    while True:
+        message = await client.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        data = message.get("bytes")
+        if data is not None:
+            if len(data) > limits.max_frame_bytes:
+                raise FrameTooLarge(f"{len(data)} bytes")
+            stats.client_frames += 1
+            stats.client_bytes += len(data)
+            # 受け取ったバイト列をそのまま上流に渡す (無音は間引いて KeepAlive に置き換える)
+            outgoing = [data] if gate is None else gate.process(data, time.monotonic())
+            for frame in outgoing:
+                if stats._first_client_audio is None and isinstance(frame, bytes):
+                    stats._first_client_audio = time.monotonic()
+                await asyncio.wait_for(upstream.connection.send(frame), limits.send_timeout)
+        elif message.get("text") is not None:
+            await asyncio.wait_for(upstream.connection.send(message["text"]), limits.send_timeout)
+
+
+async def _agent_to_client(
+    client: WebSocket, upstream: Upstream, limits: RelayLimits, stats: RelayStats
+) -> None:
+    async for message in upstream.connection:
+        if isinstance(message, bytes):
+            if stats.first_audio_seconds is None and stats._first_client_audio is not None:
+                stats.first_audio_seconds = time.monotonic() - stats._first_client_audio
+            await asyncio.wait_for(client.send_bytes(message), limits.send_timeout)
+            stats.agent_frames += 1
+            stats.agent_bytes += len(message)
+        else:
+            await asyncio.wait_for(client.send_text(message), limits.send_timeout)
+
+
+async def relay(
+    client: WebSocket, upstream: Upstream, limits: RelayLimits, gate: Optional["VoiceGate"] = None
+) -> RelayStats:
+    """Forward frames between an accepted client and the agent until either side closes"""
+    stats = RelayStats(gate=gate.stats if gate is not None else None)
+    tasks = [
+        asyncio.create_task(_client_to_agent(client, upstream, limits, stats, gate)),
+        asyncio.create_task(_agent_to_client(client, upstream, limits, stats)),
+    ]
+    code, reason = 1000, ""
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if isinstance(error, FrameTooLarge):
+                code, reason = 1009, "Frame too large"
+            elif isinstance(error, asyncio.TimeoutError):
+                # 相手が受け取れないままなので、バッファを増やさず切断する
+                code, reason = 1013, "Peer too slow"
+            elif error is not None and not _is_disconnect(error):
+                logger.warning(f"Voice relay failed: {error!r}")
+                code, reason = 1011, "Relay error"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await upstream.connection.close()
+        if upstream.connection.close_code not in (None, 1000, 1005) and code == 1000:
+            code = 1011
+        if client.application_state == WebSocketState.CONNECTED:
+            # クライアント側が先に切断している場合は送れない
+            with contextlib.suppress(RuntimeError, WebSocketDisconnect):
+                await client.close(code=code, reason=reason)
+    pool = "warm" if upstream.warm else "cold"
+    if stats.first_audio_seconds is not None:
+        RELAY_FIRST_AUDIO_SECONDS.labels(pool).observe(stats.first_audio_seconds)
+    if stats.gate is not None:
+        gate_totals.add(stats.gate)
+    return stats
+
+
+def _is_disconnect(error: BaseException) -> bool:
+    from websockets.exceptions import ConnectionClosed
+
+    return isinstance(error, (WebSocketDisconnect, ConnectionClosed))
+
+
+def relay_enabled() -> bool:
+    return settings.voice_relay_enabled and bool(settings.deepgram_api_key)
+
+
+upstream_pool = UpstreamPool(
+    url=settings.deepgram_agent_url,
+    api_key=settings.deepgram_api_key,
+    size=settings.voice_relay_pool_size,
+    max_keys=settings.voice_relay_pool_keys,
+    idle_ttl=settings.voice_relay_idle_ttl,
+    key_ttl=settings.voice_relay_key_ttl,
+    limits=RelayLimits(
+        max_frame_bytes=settings.voice_relay_max_frame_bytes,
+        write_limit=settings.voice_relay_write_limit,
+        send_timeout=settings.voice_relay_send_timeout,
+    ),
+)
+
+gate_totals = GateTotals()
+
+registry.gauge("voice_relay_idle_connections",
+               "Pre-opened agent connections waiting for a session",
+               lambda: upstream_pool.idle_count)
+registry.counter("voice_relay_warm_hits_total",
+                 "Relay sessions attached to a pre-opened connection",
+                 lambda: upstream_pool.warm_hits)
+registry.counter("voice_relay_cold_opens_total",
+                 "Relay sessions that opened a connection on demand",
+                 lambda: upstream_pool.cold_opens)
+registry.counter("voice_relay_open_failures_total", "Agent connections that failed to open",
+                 lambda: upstream_pool.open_failures)
+registry.counter("voice_relay_expired_total", "Pre-opened agent connections closed unused",
+                 lambda: upstream_pool.expired)
+registry.counter("voice_gate_bytes_in_total", "Microphone audio bytes received by the voice gate",
+                 lambda: gate_totals.bytes_in)
+registry.counter("voice_gate_bytes_saved_total", "Silent microphone audio bytes not sent upstream",
+                 lambda: gate_totals.bytes_saved)
+registry.counter("voice_gate_keepalives_total", "KeepAlive messages sent in place of silence",
+                 lambda: gate_totals.keepalives)
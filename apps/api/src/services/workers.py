@@ -0,0 +1,133 @@
+"""
+Worker Processes
+
+Identity of this process under the pre-fork server (src/server.py) and the
+state its workers share. The supervisor numbers its workers and fills in
+`worker_context` in each child after the fork; a plain `uvicorn src.main:app`
+is worker 0 of 1 and none of this applies.
+
+With N workers:
+- Every worker runs its own content watchers (each holds a copy of the
+  content), HTTP clients, voice relay upstream pool, session store writer
+  (SQLite serializes the writers) and greeting audio cache (shared on disk).
+- Admission limits and the Deepgram token pool are divided by N.
+- Only the primary worker (index 0) synthesizes greetings ahead of time; the
+  others read the audio from the disk cache.
+- The object detector agent pool does not run: detection updates are
+  delivered from process memory, so a join and its detection stream must
+  reach the same process. Serve calls from `src.agent_worker` instead.
+
+Every worker writes its metrics and admission state to a shared directory
+each `worker_state_interval` seconds; /metrics and /ready merge them. Files
+are named by worker number and pid: during a SIGHUP rolling restart the old
+and new worker with the same number both publish until the old one has
+drained, and readers take the state of the worker started last.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from ..config import settings
+from .admission import admission_controller
+from .metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# この回数分の間隔より古い状態は終了したワーカーのものとみなす
+STALE_INTERVALS = 5
+
+
+@dataclass
+class WorkerContext:
+    """This process's place among the workers sharing one socket"""
+    index: int = 0
+    count: int = 1
+    state_dir: Optional[Path] = None
+    started_at: float = 0.0
+
+    @property
+    def primary(self) -> bool:
+        return self.index == 0
+
+    @property
+    def forked(self) -> bool:
+        return self.count > 1
+
+    def share(self, total: int) -> int:
+        """One worker's even share of a server-wide count (at least 1 unless `total` is 0)"""
+        if total <= 0:
+            return 0
+        return max(math.ceil(total / self.count), 1)
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "metrics": registry.collect(),
+            "admission": admission_controller.stats(),
+        }
+
+    @property
+    def _state_path(self) -> Path:
+        return self.state_dir / f"worker-{self.index}-{os.getpid()}.json"
+
+    def _write(self, data: bytes) -> None:
+        path = self._state_path
+        fd, tmp = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _read_states(self) -> dict[int, dict[str, Any]]:
+        states = {}
+        stale = time.time() - settings.worker_state_interval * STALE_INTERVALS
+        for path in self.state_dir.glob("worker-*.json"):
+            try:
+                if path.stat().st_mtime < stale:
+                    continue
+                index = int(path.stem.split("-")[1])
+                state = json.loads(path.read_bytes())
+            except (OSError, ValueError, IndexError):
+                continue
+            # 入れ替え中は同じ番号の新旧ワーカーが並ぶため、後から起動した方を採る
+            current = states.get(index)
+            if current is None or state.get("started_at", 0) > current.get("started_at", 0):
+                states[index] = state
+        return states
+
+    async def states(self) -> dict[int, dict[str, Any]]:
+        """Latest published state of every live worker (this one's is current)"""
+        states = await asyncio.to_thread(self._read_states) if self.state_dir else {}
+        states[self.index] = self.state()
+        return states
+
+    async def publish(self) -> None:
+        """Share this worker's state with the others until cancelled"""
+        try:
+            while True:
+                # 集計はイベントループ上で行い、書き込みだけを別スレッドに任せる
+                data = json.dumps(self.state()).encode()
+                try:
+                    await asyncio.to_thread(self._write, data)
+                except OSError as e:
+                    logger.warning(f"Failed to publish worker state: {e}")
+                await asyncio.sleep(settings.worker_state_interval)
+        finally:
+            # 終了したワーカーの状態を残さない
+            self._state_path.unlink(missing_ok=True)
+
+
+worker_context = WorkerContext()
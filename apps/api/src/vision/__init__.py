@@ -0,0 +1,24 @@
+from .announcer import DetectionDiff, ObjectAnnouncer
+from .detection_cache import DetectionCache, hamming, perceptual_hash
+from .detector import Detection, Detector, OnnxDetector, create_detector
+from .frame_gate import FrameGate, frame_signature, scene_change
+from .prefilter import DetectionPrefilter
+from .tracker import ObjectTracker, iou_matrix
+
+__all__ = [
+    "Detection",
+    "DetectionCache",
+    "DetectionDiff",
+    "DetectionPrefilter",
+    "Detector",
+    "FrameGate",
+    "ObjectAnnouncer",
+    "ObjectTracker",
+    "OnnxDetector",
+    "create_detector",
+    "frame_signature",
+    "hamming",
+    "iou_matrix",
+    "perceptual_hash",
+    "scene_change",
+]
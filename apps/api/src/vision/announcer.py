@@ -0,0 +1,90 @@
+"""
+Object Announcer
+
+Turns successive detection results into what the agent should say.
+Only objects that newly appeared or disappeared are announced; an object
+must be missing from several consecutive results before it counts as gone,
+so a single missed detection does not make the agent repeat itself.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+def normalize_label(label: str) -> str:
+    """Lower-case, trim and drop a leading article"""
+    words = label.strip().lower().split()
+    if words and words[0] in ("a", "an", "the", "some"):
+        words = words[1:]
+    return " ".join(words)
+
+
+def _with_article(label: str) -> str:
+    return f"{'an' if label[:1] in 'aeiou' else 'a'} {label}"
+
+
+def _join(items: list[str]) -> str:
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+@dataclass(frozen=True)
+class DetectionDiff:
+    appeared: tuple[str, ...] = ()
+    disappeared: tuple[str, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return not self.appeared and not self.disappeared
+
+
+class ObjectAnnouncer:
+    """Tracks the announced object set and diffs new detections against it"""
+
+    def __init__(self, absent_after: int = 2):
+        self.absent_after = absent_after
+        self._announced: dict[str, int] = {}  # ラベル -> 連続して検出されなかった回数
+        self.updates = 0
+        self.silent_updates = 0
+
+    @property
+    def announced(self) -> tuple[str, ...]:
+        return tuple(sorted(self._announced))
+
+    def reset(self) -> None:
+        self._announced.clear()
+
+    def update(self, objects: Iterable[str]) -> DetectionDiff:
+        """Record a detection result and return what changed since the last announcement"""
+        current = {normalize_label(label) for label in objects}
+        current.discard("")
+        appeared = sorted(current - self._announced.keys())
+        disappeared = []
+        for label in list(self._announced):
+            if label in current:
+                self._announced[label] = 0
+                continue
+            self._announced[label] += 1
+            if self._announced[label] >= self.absent_after:
+                del self._announced[label]
+                disappeared.append(label)
+        for label in appeared:
+            self._announced[label] = 0
+
+        diff = DetectionDiff(appeared=tuple(appeared), disappeared=tuple(sorted(disappeared)))
+        self.updates += 1
+        if diff.empty:
+            self.silent_updates += 1
+        return diff
+
+    @staticmethod
+    def phrase(diff: DetectionDiff) -> Optional[str]:
+        """Sentence announcing the diff, or None when nothing changed"""
+        sentences = []
+        if diff.appeared:
+            sentences.append(f"I see {_join([_with_article(o) for o in diff.appeared])}.")
+        if diff.disappeared:
+            verb = "is" if len(diff.disappeared) == 1 else "are"
+            sentences.append(f"The {_join(list(diff.disappeared))} {verb} gone.")
+        return " ".join(sentences) or None
@@ -0,0 +1,87 @@
+"""
+Detection Cache
+
+Reuses the last detection result for frames that look the same.
+Frames are keyed by a 64-bit difference hash (dHash); a lookup matches any
+cached hash within a small Hamming distance, so sensor noise and small
+movements still hit. Entries expire after a TTL and the least recently
+used entry is evicted when the cache is full.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from .frame_gate import frame_signature
+
+
+def perceptual_hash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """64-bit dHash: whether each thumbnail pixel is brighter than its right neighbour"""
+    # 横方向の差分を取るため1列多いサムネイルを作る
+    thumbnail = frame_signature(frame, size=hash_size + 1)[:hash_size]
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@dataclass(frozen=True)
+class CachedDetection:
+    objects: tuple[Any, ...]
+    stored_at: float
+
+
+class DetectionCache:
+    """TTL + LRU cache of detection results keyed by perceptual hash"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0, max_distance: int = 6):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries: OrderedDict[int, CachedDetection] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float) -> None:
+        # 古い順に並んでいるとは限らないため全件を確認する (件数は小さい)
+        expired = [h for h, entry in self._entries.items() if now - entry.stored_at > self.ttl]
+        for frame_hash in expired:
+            del self._entries[frame_hash]
+
+    def lookup(self, frame_hash: int, now: Optional[float] = None) -> Optional[tuple[Any, ...]]:
+        """Objects detected in a near-duplicate frame, or None"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        match = frame_hash if frame_hash in self._entries else None
+        if match is None:
+            best = self.max_distance + 1
+            for cached_hash in self._entries:
+                distance = hamming(frame_hash, cached_hash)
+                if distance < best:
+                    match, best = cached_hash, distance
+        if match is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(match)
+        self.hits += 1
+        return self._entries[match].objects
+
+    def store(self, frame_hash: int, objects: tuple[Any, ...], now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._entries[frame_hash] = CachedDetection(objects=tuple(objects), stored_at=now)
+        self._entries.move_to_end(frame_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
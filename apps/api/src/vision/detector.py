@@ -0,0 +1,185 @@
+"""
+Local Object Detector
+
+CPU object detection on decoded frames, used to decide whether the realtime
+LLM needs to look at a frame at all. `Detector` is the backend interface;
+`OnnxDetector` runs a YOLOv8-style ONNX export (e.g. yolov8n.onnx) with
+onnxruntime. Pre- and post-processing are plain NumPy, so no OpenCV is needed.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# YOLOv8 (COCO) のクラス順
+COCO_LABELS = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat",
+    "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack",
+    "umbrella", "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball",
+    "kite", "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket",
+    "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair",
+    "couch", "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse",
+    "remote", "keyboard", "cell phone", "microwave", "oven", "toaster", "sink",
+    "refrigerator", "book", "clock", "vase", "scissors", "teddy bear", "hair drier",
+    "toothbrush",
+)
+
+
+@dataclass(frozen=True)
+class Detection:
+    label: str
+    score: float
+    box: tuple[float, float, float, float]  # x1, y1, x2, y2 (0-1 に正規化)
+
+
+class Detector(ABC):
+    """Object detector backend working on HxWx3 RGB uint8 frames"""
+
+    name = "detector"
+
+    @abstractmethod
+    def detect(self, frame: np.ndarray) -> list[Detection]:
+        """Detect objects in a single frame"""
+
+
+def letterbox(frame: np.ndarray, size: int) -> tuple[np.ndarray, float, int, int]:
+    """Resize keeping aspect ratio and pad to size x size (nearest neighbour)
+
+    Returns the padded image, the scale and the x/y padding.
+    """
+    height, width = frame.shape[:2]
+    scale = size / max(height, width)
+    new_h, new_w = max(round(height * scale), 1), max(round(width * scale), 1)
+    if (new_h, new_w) == (height, width):
+        resized = frame
+    else:
+        rows = np.minimum((np.arange(new_h) / scale).astype(np.intp), height - 1)
+        cols = np.minimum((np.arange(new_w) / scale).astype(np.intp), width - 1)
+        # 2次元のファンシーインデックスより軸ごとの take の方が速い
+        resized = frame.take(rows, axis=0).take(cols, axis=1)
+    pad_y, pad_x = (size - new_h) // 2, (size - new_w) // 2
+    # YOLO の学習時と同じグレー (114) で余白を埋める
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y : pad_y + new_h, pad_x : pad_x + new_w] = resized[..., :3]
+    return canvas, scale, pad_x, pad_y
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> list[int]:
+    """Greedy non-maximum suppression over xyxy boxes"""
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        x1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+class OnnxDetector(Detector):
+    """YOLOv8 ONNX model on onnxruntime's CPU execution provider"""
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str,
+        input_size: int = 640,
+        score_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        threads: int = 1,
+        labels: Sequence[str] = COCO_LABELS,
+    ):
+        import onnxruntime as ort  # 任意依存のため遅延インポート
+
+        options = ort.SessionOptions()
+        # 1フレーム1コアで回し、並列度はプロセス/通話数で稼ぐ
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_size = input_size
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.labels = tuple(labels)
+
+    def preprocess(self, frame: np.ndarray) -> tuple[np.ndarray, float, int, int]:
+        image, scale, pad_x, pad_y = letterbox(frame, self.input_size)
+        # HWC uint8 -> NCHW float32 を中間配列なしで一度に変換する
+        tensor = np.empty((1, 3, self.input_size, self.input_size), dtype=np.float32)
+        np.multiply(
+            image.transpose(2, 0, 1), np.float32(1 / 255.0), out=tensor[0], casting="unsafe"
+        )
+        return tensor, scale, pad_x, pad_y
+
+    def postprocess(
+        self, output: np.ndarray, scale: float, pad_x: int, pad_y: int, shape: tuple[int, int]
+    ) -> list[Detection]:
+        """Decode (1, 4 + classes, anchors) YOLOv8 output into detections"""
+        predictions = output[0].T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = scores >= self.score_threshold
+        if not mask.any():
+            return []
+        cx, cy, w, h = predictions[mask, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        scores, class_ids = scores[mask], class_ids[mask]
+
+        # クラスごとにNMSするため、クラスIDでボックスをずらしてから一括で処理する
+        offsets = class_ids[:, None].astype(np.float32) * (self.input_size + 1)
+        keep = nms(boxes + offsets, scores, self.iou_threshold)
+
+        height, width = shape
+        boxes = (boxes[keep] - [pad_x, pad_y, pad_x, pad_y]) / scale
+        boxes = np.clip(boxes / [width, height, width, height], 0.0, 1.0)
+        return [
+            Detection(
+                label=self._label(int(class_ids[k])),
+                score=float(scores[k]),
+                box=tuple(float(v) for v in box),
+            )
+            for k, box in zip(keep, boxes)
+        ]
+
+    def _label(self, class_id: int) -> str:
+        return self.labels[class_id] if class_id < len(self.labels) else str(class_id)
+
+    def detect(self, frame: np.ndarray) -> list[Detection]:
+        tensor, scale, pad_x, pad_y = self.preprocess(frame)
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        return self.postprocess(output, scale, pad_x, pad_y, frame.shape[:2])
+
+
+def create_detector(
+    model_path: str, score_threshold: float = 0.25, threads: int = 1
+) -> Optional[Detector]:
+    """Build the ONNX detector, or None when no model or runtime is available"""
+    if not model_path:
+        return None
+    try:
+        return OnnxDetector(model_path, score_threshold=score_threshold, threads=threads)
+    except ImportError:
+        logger.warning("onnxruntime is not installed; local detector pre-filter disabled")
+    except Exception:
+        logger.exception(f"Failed to load detector model: {model_path}")
+    return None
@@ -0,0 +1,97 @@
+"""
+Frame Gate
+
+Decides which video frames are worth sending to the realtime LLM.
+Each frame is reduced to a small luma thumbnail with NumPy; a frame is
+forwarded only when the thumbnail changed past a threshold since the last
+forwarded frame, or when the last forwarded frame is older than the
+max-staleness timer.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# ITU-R BT.601 の輝度係数
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def frame_signature(frame: np.ndarray, size: int = 32) -> np.ndarray:
+    """Downsample a frame to a `size` x `size` luma thumbnail in [0, 1]
+
+    Accepts HxW (luma/gray) or HxWxC (RGB/RGBA) uint8 arrays.
+    """
+    height, width = frame.shape[:2]
+    # まず間引きで約2倍サイズまで縮小してから、ブロック平均でノイズを均す
+    step_y = max(height // (size * 2), 1)
+    step_x = max(width // (size * 2), 1)
+    sampled = frame[::step_y, ::step_x]
+    if sampled.ndim == 3:
+        sampled = sampled[..., :3] @ LUMA_WEIGHTS
+    sampled = sampled.astype(np.float32, copy=False)
+
+    block_y = max(sampled.shape[0] // size, 1)
+    block_x = max(sampled.shape[1] // size, 1)
+    rows = min(size, sampled.shape[0] // block_y)
+    cols = min(size, sampled.shape[1] // block_x)
+    cropped = sampled[: rows * block_y, : cols * block_x]
+    thumbnail = cropped.reshape(rows, block_y, cols, block_x).mean(axis=(1, 3))
+    return thumbnail / 255.0
+
+
+def scene_change(previous: np.ndarray, current: np.ndarray) -> float:
+    """Mean absolute difference between two signatures, ignoring global brightness shifts"""
+    if previous.shape != current.shape:
+        return 1.0
+    delta = (current - current.mean()) - (previous - previous.mean())
+    return float(np.abs(delta).mean())
+
+
+@dataclass
+class FrameGateStats:
+    forwarded: int = 0
+    dropped: int = 0
+
+    @property
+    def forward_ratio(self) -> float:
+        total = self.forwarded + self.dropped
+        return self.forwarded / total if total else 0.0
+
+
+class FrameGate:
+    """Forwards frames only on scene change or after max staleness"""
+
+    def __init__(self, threshold: float = 0.04, max_staleness: float = 5.0, size: int = 32):
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.size = size
+        self.stats = FrameGateStats()
+        self._last_signature: Optional[np.ndarray] = None
+        self._last_sent_at = 0.0
+        self.last_score = 0.0
+
+    def reset(self) -> None:
+        self._last_signature = None
+        self._last_sent_at = 0.0
+
+    def should_send(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        signature = frame_signature(frame, self.size)
+        if self._last_signature is None:
+            send = True
+            self.last_score = 1.0
+        else:
+            self.last_score = scene_change(self._last_signature, signature)
+            send = (
+                self.last_score >= self.threshold
+                or now - self._last_sent_at >= self.max_staleness
+            )
+        if send:
+            self._last_signature = signature
+            self._last_sent_at = now
+            self.stats.forwarded += 1
+        else:
+            self.stats.dropped += 1
+        return send
@@ -0,0 +1,70 @@
+"""
+Detector Pre-filter
+
+Runs the local detector on a frame and decides whether the realtime LLM
+needs to see it: only when the set of confidently detected labels changed
+since the last frame sent, or when some detection is too uncertain for the
+local model to be trusted.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .detector import Detection, Detector
+
+
+@dataclass
+class PrefilterStats:
+    frames: int = 0
+    sent_label_change: int = 0
+    sent_low_confidence: int = 0
+    sent_stale: int = 0
+    skipped: int = 0
+
+
+class DetectionPrefilter:
+    """Sends a frame to the LLM only when the local detector is unsure or sees a change"""
+
+    def __init__(
+        self,
+        detector: Detector,
+        min_confidence: float = 0.5,
+        max_staleness: float = 30.0,
+    ):
+        self.detector = detector
+        self.min_confidence = min_confidence
+        self.max_staleness = max_staleness
+        self.stats = PrefilterStats()
+        self.last_detections: list[Detection] = []
+        self._sent_labels: Optional[frozenset[str]] = None
+        self._sent_at = 0.0
+
+    def reset(self) -> None:
+        self._sent_labels = None
+        self._sent_at = 0.0
+
+    def should_send(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """Run the detector (blocking) and decide whether the LLM should see the frame"""
+        now = time.monotonic() if now is None else now
+        detections = self.detector.detect(frame)
+        self.last_detections = detections
+        self.stats.frames += 1
+
+        labels = frozenset(d.label for d in detections if d.score >= self.min_confidence)
+        if self._sent_labels is None or labels != self._sent_labels:
+            self.stats.sent_label_change += 1
+        elif any(d.score < self.min_confidence for d in detections):
+            # ローカルモデルが自信を持てない物体はLLMに確認させる
+            self.stats.sent_low_confidence += 1
+        elif now - self._sent_at >= self.max_staleness:
+            self.stats.sent_stale += 1
+        else:
+            self.stats.skipped += 1
+            return False
+
+        self._sent_labels = labels
+        self._sent_at = now
+        return True
@@ -0,0 +1,246 @@
+"""
+Object Tracker
+
+Keeps object identities stable between realtime LLM keyframes. The LLM
+reports labels at most about once per second and its answers jitter; the
+local detector (when configured) adds boxes for the frames it sees. Detector
+boxes are associated to existing tracks by IoU (vectorized over all
+track/detection pairs, labels must agree), LLM keyframes by label. Track
+confidence decays exponentially once an object has not been seen for longer
+than the usual keyframe interval, and objects a keyframe no longer mentions
+are penalized rather than removed, so a single missed update does not make
+a label vanish. Confidence levels only change past a hysteresis margin.
+`states()` returns the smoothed object list at video rate; it only changes
+when something visible changed.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ..models.detection import Confidence, DetectedObject
+from .announcer import normalize_label
+from .detector import Detection
+
+# LLM の確信度をスコアに読み替える
+LEVEL_SCORES: dict[str, float] = {"high": 0.9, "medium": 0.6, "low": 0.35}
+# スコアがこの値以上ならその確信度として表示する (高い順)
+LEVEL_THRESHOLDS: tuple[tuple[Confidence, float], ...] = (
+    ("high", 0.7),
+    ("medium", 0.45),
+    ("low", 0.0),
+)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes as an (N, M) array"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def associate(iou: np.ndarray, threshold: float) -> list[tuple[int, int]]:
+    """Greedy one-to-one matching of the highest-IoU pairs above `threshold`"""
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for k in order:
+        row, col = int(rows[k]), int(cols[k])
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((row, col))
+    return pairs
+
+
+@dataclass
+class Track:
+    id: int
+    label: str  # 正規化したラベル (対応付けに使う)
+    name: str  # 表示名 (LLM の言い方を優先)
+    score: float
+    seen_at: float
+    hits: int = 1
+    box: Optional[np.ndarray] = None
+    velocity: Optional[np.ndarray] = None  # 箱の移動速度 (座標/秒)
+    confirmed: bool = False
+    reported: bool = False  # LLM が報告したことのある物体
+    level: Optional[Confidence] = None
+
+
+@dataclass
+class TrackerStats:
+    created: int = 0
+    matched: int = 0
+    expired: int = 0
+    keyframes: int = 0
+
+
+class ObjectTracker:
+    """Stable object states from sparse LLM keyframes and local detections"""
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        half_life: float = 4.0,
+        grace: float = 5.0,
+        min_score: float = 0.15,
+        min_hits: int = 2,
+        miss_penalty: float = 0.6,
+        smoothing: float = 0.5,
+        max_prediction: float = 0.5,
+        hysteresis: float = 0.05,
+    ):
+        self.iou_threshold = iou_threshold
+        self.half_life = half_life
+        self.grace = grace
+        self.min_score = min_score
+        self.min_hits = min_hits
+        self.miss_penalty = miss_penalty
+        self.smoothing = smoothing
+        self.max_prediction = max_prediction
+        self.hysteresis = hysteresis
+        self.tracks: list[Track] = []
+        self.stats = TrackerStats()
+        self._next_id = 1
+
+    def reset(self) -> None:
+        self.tracks.clear()
+
+    def decayed(self, track: Track, now: float) -> float:
+        """Track score after exponential decay (starting `grace` seconds after it was seen)"""
+        unseen = max(now - track.seen_at - self.grace, 0.0)
+        return track.score * 0.5 ** (unseen / self.half_life)
+
+    def _create(self, label: str, name: str, score: float, now: float, **kwargs) -> Track:
+        track = Track(id=self._next_id, label=label, name=name, score=score, seen_at=now, **kwargs)
+        self._next_id += 1
+        self.tracks.append(track)
+        self.stats.created += 1
+        return track
+
+    def _refresh(self, track: Track, score: float, now: float) -> None:
+        # 減衰後のスコアと新しい観測を混ぜ、1回の揺らぎで確信度が跳ねないようにする
+        track.score = self.decayed(track, now) * (1 - self.smoothing) + score * self.smoothing
+        track.seen_at = now
+        track.hits += 1
+        self.stats.matched += 1
+
+    def observe(self, detections: Iterable[Detection], now: Optional[float] = None) -> None:
+        """Associate local detector boxes to tracks by IoU"""
+        now = time.monotonic() if now is None else now
+        detections = list(detections)
+        boxed = [t for t in self.tracks if t.box is not None]
+        matched: set[int] = set()
+        if detections and boxed:
+            track_boxes = np.array([self._predict(t, now) for t in boxed], dtype=np.float32)
+            det_boxes = np.array([d.box for d in detections], dtype=np.float32)
+            iou = iou_matrix(track_boxes, det_boxes)
+            # ラベルの異なる組は対応付けない
+            track_labels = np.array([t.label for t in boxed], dtype=object)
+            det_labels = np.array([normalize_label(d.label) for d in detections], dtype=object)
+            iou[track_labels[:, None] != det_labels[None, :]] = 0.0
+            for row, col in associate(iou, self.iou_threshold):
+                track, detection = boxed[row], detections[col]
+                box = det_boxes[col]
+                dt = now - track.seen_at
+                if dt > 0:
+                    velocity = (box - track.box) / dt
+                    track.velocity = velocity if track.velocity is None else (
+                        track.velocity * (1 - self.smoothing) + velocity * self.smoothing
+                    )
+                track.box = track.box * (1 - self.smoothing) + box * self.smoothing
+                self._refresh(track, detection.score, now)
+                matched.add(col)
+
+        for col, detection in enumerate(detections):
+            if col in matched:
+                continue
+            label = normalize_label(detection.label)
+            # 箱なしの (LLM だけが見ている) 同名の物体があれば箱を与える
+            boxless = next((t for t in self.tracks if t.box is None and t.label == label), None)
+            box = np.array(detection.box, dtype=np.float32)
+            if boxless is not None:
+                boxless.box = box
+                self._refresh(boxless, detection.score, now)
+            else:
+                self._create(label, label, detection.score, now, box=box)
+        self._expire(now)
+
+    def keyframe(self, objects: Iterable[DetectedObject], now: Optional[float] = None) -> None:
+        """Apply an LLM result: refresh tracks by label, penalize the ones it no longer mentions"""
+        now = time.monotonic() if now is None else now
+        self.stats.keyframes += 1
+        seen: set[int] = set()
+        for obj in objects:
+            label = normalize_label(obj.name)
+            if not label:
+                continue
+            score = LEVEL_SCORES[obj.confidence]
+            candidates = [t for t in self.tracks if t.label == label and t.id not in seen]
+            if candidates:
+                track = max(candidates, key=lambda t: self.decayed(t, now))
+                track.name = obj.name
+                self._refresh(track, score, now)
+            else:
+                track = self._create(label, obj.name, score, now)
+            # LLM の結果は信頼できるので、1回で表示対象にする
+            track.confirmed = track.reported = True
+            seen.add(track.id)
+        for track in self.tracks:
+            # 検出器だけが見ている物体は LLM が挙げなくても減点しない
+            if track.reported and track.id not in seen:
+                track.score *= self.miss_penalty
+        self._expire(now)
+
+    def _predict(self, track: Track, now: float) -> np.ndarray:
+        if track.velocity is None:
+            return track.box
+        # 最後の観測からの移動を短時間だけ外挿する
+        dt = min(max(now - track.seen_at, 0.0), self.max_prediction)
+        return np.clip(track.box + track.velocity * dt, 0.0, 1.0)
+
+    def _expire(self, now: float) -> None:
+        alive = [t for t in self.tracks if self.decayed(t, now) >= self.min_score]
+        self.stats.expired += len(self.tracks) - len(alive)
+        self.tracks = alive
+
+    def _level(self, track: Track, score: float) -> Confidence:
+        level = next(name for name, floor in LEVEL_THRESHOLDS if score >= floor)
+        if track.level is None or level == track.level:
+            return level
+        # 境界付近で確信度が行き来しないよう、一定以上越えた時だけ切り替える
+        current = dict(LEVEL_THRESHOLDS)[track.level]
+        upper = next((floor for name, floor in reversed(LEVEL_THRESHOLDS) if floor > current), None)
+        dropped = score < current - self.hysteresis
+        raised = upper is not None and score >= upper + self.hysteresis
+        if dropped or raised:
+            return level
+        return track.level
+
+    def states(self, now: Optional[float] = None) -> list[DetectedObject]:
+        """Smoothed objects at `now`, in stable (creation) order"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        objects = []
+        for track in self.tracks:
+            if not track.confirmed and track.hits < self.min_hits:
+                continue
+            track.confirmed = True
+            track.level = self._level(track, self.decayed(track, now))
+            box = None
+            if track.box is not None:
+                # 細かな揺れで更新が発生しないよう丸める
+                box = tuple(round(float(v), 3) for v in self._predict(track, now))
+            objects.append(
+                DetectedObject(name=track.name, confidence=track.level, id=track.id, box=box)
+            )
+        return objects
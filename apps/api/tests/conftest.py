@@ -0,0 +1,14 @@
+import os
+
+# テストではバックグラウンドのサービス (ファイル監視、SQLite、エージェント) を起動しない
+os.environ.setdefault("CONTENT_HOT_RELOAD", "false")
+os.environ.setdefault("SESSION_STORE_ENABLED", "false")
+os.environ.setdefault("AGENT_WARM_POOL_SIZE", "0")
+os.environ.setdefault("GREETING_AUDIO_ENABLED", "false")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.config import settings
+from src.routers import coach as coach_module
+from src.routers import coach_router
+from src.services.admission import (
+    MAX_RETRY_AFTER,
+    AdmissionController,
+    AdmissionRejected,
+    client_key,
+)
+
+
+def test_client_key_uses_the_hop_added_by_the_trusted_proxy():
+    # 先頭はクライアントが自由に書ける
+    assert client_key("6.6.6.6, 203.0.113.7", "10.0.0.1") == "203.0.113.7"
+    assert client_key("203.0.113.7", "10.0.0.1") == "203.0.113.7"
+
+
+def test_client_key_counts_trusted_hops_from_the_right():
+    assert client_key("6.6.6.6, 203.0.113.7, 10.1.2.3", "10.0.0.1", trusted_hops=2) == (
+        "203.0.113.7"
+    )
+    assert client_key("203.0.113.7", "10.0.0.1", trusted_hops=3) == "203.0.113.7"
+
+
+def test_client_key_falls_back_to_the_peer():
+    assert client_key(None, "10.0.0.1") == "10.0.0.1"
+    assert client_key("6.6.6.6", "10.0.0.1", trusted_hops=0) == "10.0.0.1"
+    assert client_key(None, None) == "unknown"
+
+
+@pytest.mark.anyio
+async def test_slot_is_held_until_released():
+    controller = AdmissionController(
+        rate=100.0, burst=100, client_rate=100.0, client_burst=100,
+        max_inflight=1, max_queue=1, queue_timeout=0.05,
+    )
+    await controller.acquire("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("b")
+    assert rejected.value.status_code == 503
+    controller.release()
+    await asyncio.wait_for(controller.acquire("b"), timeout=1.0)
+    assert controller.inflight == 1
+
+
+@pytest.mark.anyio
+async def test_zero_rate_rejects_with_a_bounded_retry_after():
+    controller = AdmissionController(
+        rate=100.0, burst=100, client_rate=0.0, client_burst=1,
+        max_inflight=8, max_queue=8, queue_timeout=0.05,
+    )
+    await controller.acquire("a")
+    controller.release()
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("a")
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == MAX_RETRY_AFTER
+
+
+@pytest.mark.anyio
+async def test_prefetch_does_not_use_up_the_session_rate(monkeypatch):
+    controller = AdmissionController(
+        rate=100.0, burst=100, client_rate=0.01, client_burst=1,
+        max_inflight=8, max_queue=8, queue_timeout=0.05,
+    )
+    monkeypatch.setattr(coach_module, "admission_controller", controller)
+    app = FastAPI()
+    app.include_router(coach_router)
+    session = {"mode": "situation", "level": "beginner", "scenario": "restaurant"}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+    ) as client:
+        for _ in range(5):
+            prefetched = await client.post(
+                "/api/coach/session/bootstrap/batch", json={"sessions": [session]}
+            )
+            assert prefetched.status_code == 200
+        started = await client.post("/api/coach/voice-agent/config", json=session)
+        again = await client.post("/api/coach/voice-agent/config", json=session)
+    assert started.status_code == 200
+    assert again.status_code == 429
+
+
+@pytest.mark.anyio
+async def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(monkeypatch):
+    controller = AdmissionController(
+        rate=100.0, burst=100, client_rate=0.01, client_burst=1,
+        max_inflight=8, max_queue=8, queue_timeout=0.05,
+    )
+    monkeypatch.setattr(coach_module, "admission_controller", controller)
+    monkeypatch.setattr(settings, "admission_trusted_hops", 0)
+    app = FastAPI()
+    app.include_router(coach_router)
+    session = {"mode": "situation", "level": "beginner", "scenario": "restaurant"}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+    ) as client:
+        statuses = [
+            (await client.post(
+                "/api/coach/voice-agent/config", json=session,
+                headers={"X-Forwarded-For": f"198.51.100.{i}"},
+            )).status_code
+            for i in range(3)
+        ]
+    assert statuses == [200, 429, 429]
+
+
+def test_workers_do_not_take_the_client_address_from_forwarded_headers():
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    from src.server import worker_config
+
+    config = worker_config(limit=None, graceful_timeout=1.0)
+    config.load()
+    # X-Forwarded-For の解釈は client_key に任せ、接続元は書き換えない
+    assert not isinstance(config.loaded_app, ProxyHeadersMiddleware)
@@ -0,0 +1,39 @@
+from src.vision.announcer import DetectionDiff, ObjectAnnouncer, normalize_label
+
+
+def test_labels_are_normalized():
+    assert normalize_label("  A Cup ") == "cup"
+    assert normalize_label("the red apple") == "red apple"
+    assert normalize_label("apple") == "apple"
+
+
+def test_new_objects_are_announced_once():
+    announcer = ObjectAnnouncer()
+    assert announcer.update(["a cup", "An apple"]).appeared == ("apple", "cup")
+    # 同じ物を言い直さない
+    assert announcer.update(["the cup", "apple"]).empty
+    assert announcer.update(["cup", "apple", "pen"]) == DetectionDiff(appeared=("pen",))
+    assert (announcer.updates, announcer.silent_updates) == (3, 1)
+
+
+def test_a_single_missed_detection_is_not_announced():
+    announcer = ObjectAnnouncer(absent_after=2)
+    announcer.update(["cup", "apple"])
+    assert announcer.update(["cup"]).empty
+    assert announcer.update(["cup", "apple"]).empty
+    assert announcer.update(["cup"]).empty
+    assert announcer.update(["cup"]) == DetectionDiff(disappeared=("apple",))
+    assert announcer.announced == ("cup",)
+
+
+def test_phrase():
+    assert ObjectAnnouncer.phrase(DetectionDiff()) is None
+    assert ObjectAnnouncer.phrase(DetectionDiff(appeared=("apple", "cup", "pen"))) == (
+        "I see an apple, a cup and a pen."
+    )
+    assert ObjectAnnouncer.phrase(DetectionDiff(appeared=("cup",), disappeared=("pen",))) == (
+        "I see a cup. The pen is gone."
+    )
+    assert ObjectAnnouncer.phrase(DetectionDiff(disappeared=("cup", "pen"))) == (
+        "The cup and pen are gone."
+    )
@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.config import settings
+from src.routers import coach_router
+from src.services import deepgram_tokens
+from src.services.deepgram_tokens import DeepgramTokenBroker, TokenUnavailableError
+
+pytestmark = pytest.mark.anyio
+
+GRANT_URL = "https://deepgram.test/v1/auth/grant"
+
+
+class TokenService:
+    """Local stand-in for the Deepgram token grant endpoint"""
+
+    def __init__(self, expires_in=lambda n: 60.0, status: int = 200):
+        self.expires_in = expires_in
+        self.status = status
+        self.requests: list[httpx.Request] = []
+        self._ids = itertools.count(1)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"err_msg": "unavailable"})
+        n = next(self._ids)
+        return httpx.Response(
+            200, json={"access_token": f"token-{n}", "expires_in": self.expires_in(n)}
+        )
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+def make_broker(**kwargs) -> DeepgramTokenBroker:
+    options = dict(api_key="key", grant_url=GRANT_URL, pool_size=3, min_remaining=20.0)
+    options.update(kwargs)
+    return DeepgramTokenBroker(**options)
+
+
+async def test_refills_pool_in_background():
+    service = TokenService()
+    broker = make_broker()
+    await broker.start(service.transport)
+    try:
+        await wait_for(lambda: len(broker) == 3)
+        token = await broker.acquire()
+        assert token.remaining() > 50
+        # 取り出した分だけ補充される
+        await wait_for(lambda: len(broker) == 3)
+        assert broker.minted == 4
+        assert broker.inline_mints == 0
+        assert service.requests[0].headers["Authorization"] == "Token key"
+    finally:
+        await broker.close()
+
+
+async def test_prunes_tokens_below_min_remaining():
+    # 最初の3本は min_remaining をすぐに切る
+    service = TokenService(expires_in=lambda n: 20.2 if n <= 3 else 60.0)
+    broker = make_broker()
+    await broker.start(service.transport)
+    try:
+        await wait_for(lambda: broker.minted >= 3)
+        await asyncio.sleep(0.3)
+        token = await broker.acquire()
+        assert token.access_token not in {"token-1", "token-2", "token-3"}
+        assert token.remaining() >= broker.min_remaining
+    finally:
+        await broker.close()
+
+
+async def test_mints_inline_when_pool_is_empty():
+    service = TokenService()
+    broker = make_broker(pool_size=0)
+    await broker.start(service.transport)
+    try:
+        token = await broker.acquire()
+        assert token.access_token == "token-1"
+        assert broker.inline_mints == 1
+        assert len(broker) == 0
+    finally:
+        await broker.close()
+
+
+async def test_inline_mint_failure_raises():
+    service = TokenService(status=500)
+    broker = make_broker(pool_size=0)
+    await broker.start(service.transport)
+    try:
+        with pytest.raises(TokenUnavailableError):
+            await broker.acquire()
+    finally:
+        await broker.close()
+
+
+async def test_does_not_refill_while_idle():
+    service = TokenService(expires_in=lambda n: 20.2)
+    broker = make_broker(pool_size=2, idle_after=0.1)
+    await broker.start(service.transport)
+    try:
+        await wait_for(lambda: broker.minted == 2)
+        # 利用がないので、期限が近づいたトークンは補充されない
+        await asyncio.sleep(0.5)
+        assert broker.minted == 2
+        await broker.acquire()
+        assert broker.inline_mints == 1
+        # 取得されたら補充を再開する
+        await wait_for(lambda: len(broker) == 2)
+    finally:
+        await broker.close()
+
+
+async def test_voice_agent_config_returns_503_when_tokens_unavailable(monkeypatch):
+    service = TokenService(status=503)
+    broker = make_broker(pool_size=0)
+    monkeypatch.setattr(settings, "deepgram_api_key", "key")
+    monkeypatch.setattr(settings, "deepgram_token_broker", True)
+    monkeypatch.setattr(settings, "admission_enabled", False)
+    monkeypatch.setattr(deepgram_tokens, "deepgram_token_broker", broker)
+    app = FastAPI()
+    app.include_router(coach_router)
+    await broker.start(service.transport)
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+        ) as client:
+            response = await client.post(
+                "/api/coach/voice-agent/config", json={"mode": "freetalk", "level": "beginner"}
+            )
+        assert response.status_code == 503
+        assert len(service.requests) == 1
+    finally:
+        await broker.close()
+
+
+async def test_voice_agent_config_returns_token_and_margin(monkeypatch):
+    service = TokenService()
+    broker = make_broker(pool_size=0)
+    monkeypatch.setattr(settings, "deepgram_api_key", "key")
+    monkeypatch.setattr(settings, "deepgram_token_broker", True)
+    monkeypatch.setattr(settings, "admission_enabled", False)
+    monkeypatch.setattr(deepgram_tokens, "deepgram_token_broker", broker)
+    app = FastAPI()
+    app.include_router(coach_router)
+    await broker.start(service.transport)
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+        ) as client:
+            response = await client.post(
+                "/api/coach/voice-agent/config", json={"mode": "freetalk", "level": "beginner"}
+            )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["api_key"] == "token-1"
+        assert body["auth_scheme"] == "bearer"
+        assert body["min_remaining"] == 20
+        assert 55 <= body["expires_in"] <= 60
+    finally:
+        await broker.close()
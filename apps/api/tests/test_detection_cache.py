@@ -0,0 +1,83 @@
+import numpy as np
+
+from src.vision.detection_cache import DetectionCache, hamming, perceptual_hash
+
+HEIGHT, WIDTH = 240, 320
+
+
+def scene(seed: int) -> np.ndarray:
+    """Luma frame with smooth gradients, so neighbouring thumbnail pixels differ"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    y, x = y / HEIGHT, x / WIDTH
+    image = np.zeros((HEIGHT, WIDTH))
+    for fx, fy, px, py in rng.uniform(1, 6, size=(6, 4)):
+        image += np.sin(2 * np.pi * fx * x + px) * np.cos(2 * np.pi * fy * y + py)
+    image = (image - image.min()) / (image.max() - image.min()) * 255
+    return image.astype(np.uint8)
+
+
+def with_noise(frame: np.ndarray, seed: int, amplitude: int = 3) -> np.ndarray:
+    """Same frame with sensor noise"""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(-amplitude, amplitude + 1, size=frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_hash_is_stable_under_noise_and_differs_between_scenes():
+    frame = scene(0)
+    frame_hash = perceptual_hash(frame)
+    assert frame_hash == perceptual_hash(frame.copy())
+    assert frame_hash < 2 ** 64
+    for seed in range(1, 6):
+        assert hamming(frame_hash, perceptual_hash(with_noise(frame, seed))) <= 2
+        assert hamming(frame_hash, perceptual_hash(scene(seed))) > 16
+
+
+def test_colour_frames_hash_like_their_luma():
+    frame = scene(0)
+    rgb = np.repeat(frame[..., None], 3, axis=2)
+    assert hamming(perceptual_hash(rgb), perceptual_hash(frame)) <= 2
+
+
+def test_hamming_counts_differing_bits():
+    assert hamming(0b1011, 0b1011) == 0
+    assert hamming(0b1011, 0b0010) == 2
+    assert hamming(0, 2 ** 64 - 1) == 64
+
+
+def test_near_duplicate_hash_hits():
+    cache = DetectionCache(max_distance=2)
+    cache.store(0b0000, ("cup",), now=0.0)
+    assert cache.lookup(0b0011, now=1.0) == ("cup",)
+    # 距離が許容値を超えるものは別の画面
+    assert cache.lookup(0b0111, now=1.0) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_nearest_cached_hash_wins():
+    cache = DetectionCache(max_distance=6)
+    cache.store(0b1111_0000, ("cup",), now=0.0)
+    cache.store(0b1111_1111, ("apple",), now=0.0)
+    assert cache.lookup(0b1111_1110, now=0.0) == ("apple",)
+    assert cache.lookup(0b1111_0000, now=0.0) == ("cup",)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = DetectionCache(ttl=30.0)
+    cache.store(1, ("cup",), now=0.0)
+    assert cache.lookup(1, now=30.0) == ("cup",)
+    assert cache.lookup(1, now=30.1) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DetectionCache(max_entries=2, max_distance=0)
+    cache.store(1, ("cup",), now=0.0)
+    cache.store(2, ("apple",), now=0.0)
+    # 参照された 1 は残り、2 が追い出される
+    cache.lookup(1, now=0.0)
+    cache.store(4, ("pen",), now=0.0)
+    assert cache.lookup(2, now=0.0) is None
+    assert cache.lookup(1, now=0.0) == ("cup",)
+    assert cache.evictions == 1
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src.models.detection import DetectedObject
+from src.services.detection_stream import DetectionHub
+
+pytestmark = pytest.mark.anyio
+
+
+def event_name(frame: bytes) -> str:
+    for line in frame.decode().splitlines():
+        if line.startswith("event: "):
+            return line.removeprefix("event: ")
+    return "comment"
+
+
+async def collect(hub: DetectionHub, call_id: str, into: list[str]) -> None:
+    async for frame in hub.stream(call_id):
+        into.append(event_name(frame))
+
+
+async def test_stream_ends_after_call_closes():
+    hub = DetectionHub(keepalive=10.0)
+    events: list[str] = []
+    viewer = asyncio.create_task(collect(hub, "call", events))
+    await asyncio.sleep(0)
+    hub.publish("call", [DetectedObject(name="cup")])
+    hub.close_call("call")
+    await asyncio.wait_for(viewer, timeout=1.0)
+    # 残りの更新を受け取ってから終了イベントで閉じる
+    assert events == ["detections", "end"]
+    assert hub.subscriber_count == 0
+
+
+async def test_viewer_of_ended_call_gets_latest_then_end():
+    hub = DetectionHub(keepalive=10.0)
+    events: list[str] = []
+    blocker = asyncio.create_task(collect(hub, "call", []))
+    await asyncio.sleep(0)
+    hub.publish("call", [DetectedObject(name="cup")])
+    hub.close_call("call")
+    await asyncio.wait_for(collect(hub, "call", events), timeout=1.0)
+    await asyncio.wait_for(blocker, timeout=1.0)
+    assert events == ["detections", "end"]
+
+
+async def test_keepalive_while_call_is_running():
+    hub = DetectionHub(keepalive=0.01)
+    events: list[str] = []
+    viewer = asyncio.create_task(collect(hub, "call", events))
+    await asyncio.sleep(0.05)
+    hub.close_call("call")
+    await asyncio.wait_for(viewer, timeout=1.0)
+    assert events[0] == "comment"
+    assert events[-1] == "end"
+
+
+async def test_viewer_connecting_after_the_end_is_told_right_away():
+    hub = DetectionHub(keepalive=10.0)
+    hub.publish("call", [DetectedObject(name="cup")])
+    hub.close_call("call")
+    events: list[str] = []
+    # 視聴者がいない間に終了した通話でも、keepalive を待たずに閉じる
+    await asyncio.wait_for(collect(hub, "call", events), timeout=1.0)
+    assert events == ["detections", "end"]
+
+
+async def test_ended_calls_are_forgotten_after_the_ttl():
+    hub = DetectionHub(keepalive=10.0, ended_ttl=0.0)
+    hub.publish("call", [DetectedObject(name="cup")])
+    hub.close_call("call")
+    # 次の終了時に期限切れの通話を消す
+    hub.close_call("other")
+    assert list(hub._channels) == ["other"]
+
+
+async def test_rejoined_call_streams_again():
+    hub = DetectionHub(keepalive=10.0)
+    hub.close_call("call")
+    hub.publish("call", [DetectedObject(name="cup")])
+    events: list[str] = []
+    viewer = asyncio.create_task(collect(hub, "call", events))
+    await asyncio.sleep(0)
+    hub.close_call("call")
+    await asyncio.wait_for(viewer, timeout=1.0)
+    assert events == ["detections", "end"]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.vision.detector import letterbox, nms
+
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    boxes = np.array([
+        [0, 0, 10, 10],
+        [1, 1, 11, 11],  # 先頭とほぼ重なる
+        [20, 20, 30, 30],
+    ], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.7], dtype=np.float32)
+    assert nms(boxes, scores, iou_threshold=0.45) == [1, 2]
+    # 閾値を上げれば重なっていても残す
+    assert nms(boxes, scores, iou_threshold=0.9) == [1, 2, 0]
+
+
+def test_nms_of_no_boxes():
+    assert nms(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), 0.45) == []
+
+
+def test_letterbox_keeps_the_aspect_ratio_and_centers_the_image():
+    frame = np.full((240, 320, 3), 7, dtype=np.uint8)
+    image, scale, pad_x, pad_y = letterbox(frame, 64)
+    assert image.shape == (64, 64, 3)
+    assert scale == 0.2
+    assert (pad_x, pad_y) == (0, 8)
+    assert (image[8:56] == 7).all()
+    # 余白は YOLO の学習時と同じグレー
+    assert (image[:8] == 114).all() and (image[56:] == 114).all()
+
+
+def test_letterbox_maps_pixels_back_through_scale_and_padding():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[40:60, 150:170] = 255
+    image, scale, pad_x, pad_y = letterbox(frame, 100)
+    ys, xs = np.nonzero(image[..., 0] == 255)
+    # 元の座標 = (レターボックス上の座標 - 余白) / 倍率
+    assert (xs.min() - pad_x) / scale == 150
+    assert (ys.min() - pad_y) / scale == 40
+
+
+def test_letterbox_of_a_frame_already_at_size_is_only_copied():
+    frame = np.arange(16 * 16 * 3, dtype=np.uint8).reshape(16, 16, 3)
+    image, scale, pad_x, pad_y = letterbox(frame, 16)
+    assert (scale, pad_x, pad_y) == (1.0, 0, 0)
+    assert np.array_equal(image, frame)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.vision.frame_gate import FrameGate, frame_signature, scene_change
+
+HEIGHT, WIDTH = 240, 320
+
+
+def scene(seed: int) -> np.ndarray:
+    """Luma frame with coarse structure, like a room seen by the camera"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, size=(6, 8), dtype=np.uint8)
+    return np.kron(blocks, np.ones((HEIGHT // 6, WIDTH // 8), dtype=np.uint8))
+
+
+def with_noise(frame: np.ndarray, seed: int, amplitude: int = 3) -> np.ndarray:
+    """Same frame with sensor noise"""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(-amplitude, amplitude + 1, size=frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_first_frame_is_sent():
+    gate = FrameGate()
+    assert gate.should_send(scene(0), now=0.0)
+    assert gate.stats.forwarded == 1
+
+
+def test_static_scene_is_suppressed():
+    gate = FrameGate(threshold=0.04, max_staleness=5.0)
+    frame = scene(0)
+    gate.should_send(frame, now=0.0)
+    sent = [gate.should_send(with_noise(frame, i), now=0.1 * i) for i in range(1, 40)]
+    assert not any(sent)
+    assert gate.stats.dropped == 39
+    assert gate.last_score < gate.threshold
+
+
+def test_brightness_shift_is_not_a_scene_change():
+    gate = FrameGate()
+    frame = scene(0)
+    gate.should_send(frame, now=0.0)
+    brighter = np.clip(frame.astype(np.int16) + 20, 0, 255).astype(np.uint8)
+    # 飽和しない範囲の一様な明るさの変化は無視する
+    assert scene_change(frame_signature(frame), frame_signature(brighter)) < 0.02
+    assert not gate.should_send(brighter, now=0.1)
+
+
+def test_scene_change_passes():
+    gate = FrameGate(threshold=0.04, max_staleness=5.0)
+    gate.should_send(scene(0), now=0.0)
+    assert gate.should_send(scene(1), now=0.1)
+    assert gate.last_score >= gate.threshold
+    # 変化後の光景が新しい基準になる
+    assert not gate.should_send(with_noise(scene(1), 1), now=0.2)
+
+
+def test_frame_is_forced_after_max_staleness():
+    gate = FrameGate(threshold=0.04, max_staleness=5.0)
+    frame = scene(0)
+    gate.should_send(frame, now=0.0)
+    assert not gate.should_send(frame, now=4.9)
+    assert gate.should_send(frame, now=5.0)
+    # 送信時刻から再び数える
+    assert not gate.should_send(frame, now=9.9)
+    assert gate.should_send(frame, now=10.0)
+
+
+def test_rgb_frames_use_luma():
+    gate = FrameGate()
+    luma = scene(0)
+    rgb = np.repeat(luma[..., None], 3, axis=2)
+    gate.should_send(rgb, now=0.0)
+    assert frame_signature(rgb).shape == (32, 32)
+    assert not gate.should_send(luma, now=0.1)
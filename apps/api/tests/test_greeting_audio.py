@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.config import settings
+from src.routers import coach as coach_module
+from src.routers import coach_router
+from src.services.greeting_audio import GreetingAudioCache
+from src.services.tts import FakeTTS, TTSError
+
+pytestmark = pytest.mark.anyio
+
+VOICE = "aura-2-thalia-en"
+
+
+class FailingTTS(FakeTTS):
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls += 1
+        raise TTSError("speak API is down")
+
+
+def test_key_changes_with_the_text_and_the_voice(tmp_path):
+    cache = GreetingAudioCache(FakeTTS(), tmp_path)
+    key = cache.key("Hello! Welcome in.", VOICE)
+    assert cache.key("Hello! Welcome in.", VOICE) == key
+    # 挨拶文や声が変われば別のキーになり、古い音声は返らない
+    assert cache.key("Hello! Welcome back.", VOICE) != key
+    assert cache.key("Hello! Welcome in.", "aura-2-apollo-en") != key
+
+
+async def test_evicted_audio_is_read_back_from_disk(tmp_path):
+    tts = FakeTTS(seconds_per_word=0.1)
+    first = await GreetingAudioCache(tts, tmp_path).get("Hello there", VOICE)
+    # 1件分しか持てないメモリに2件目を入れて1件目を追い出す
+    cache = GreetingAudioCache(tts, tmp_path, max_memory_bytes=len(first.data))
+    await cache.get("Hello there", VOICE)
+    await cache.get("Good morning", VOICE)
+    audio = await cache.get("Hello there", VOICE)
+    assert audio == first
+    assert cache.memory_hits == 0
+    assert cache.disk_hits == 2
+    assert cache.synthesized == 1
+    assert tts.calls == 2
+
+
+async def test_concurrent_misses_share_one_synthesis(tmp_path):
+    tts = FakeTTS(seconds_per_word=0.1, delay=0.05)
+    cache = GreetingAudioCache(tts, tmp_path)
+    results = await asyncio.gather(*(cache.get("Hello there", VOICE) for _ in range(5)))
+    assert tts.calls == 1
+    assert cache.synthesized == 1
+    assert len({audio.digest for audio in results}) == 1
+
+
+async def test_failed_synthesis_is_not_cached(tmp_path):
+    cache = GreetingAudioCache(FailingTTS(), tmp_path)
+    with pytest.raises(TTSError):
+        await cache.get("Hello there", VOICE)
+    with pytest.raises(TTSError):
+        await cache.get("Hello there", VOICE)
+    assert cache.failures == 2
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.fixture
+def serve_greetings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "greeting_audio_enabled", True)
+    monkeypatch.setattr(settings, "greeting_tts_provider", "fake")
+
+    def serve(tts):
+        monkeypatch.setattr(coach_module, "greeting_audio", GreetingAudioCache(tts, tmp_path))
+        app = FastAPI()
+        app.include_router(coach_router)
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+        )
+
+    return serve
+
+
+async def test_greeting_audio_is_revalidated_by_etag(serve_greetings):
+    params = {"mode": "situation", "scenario": "restaurant"}
+    async with serve_greetings(FakeTTS(seconds_per_word=0.1)) as client:
+        first = await client.get("/api/coach/greeting-audio", params=params)
+        etag = first.headers["etag"]
+        again = await client.get(
+            "/api/coach/greeting-audio", params=params, headers={"If-None-Match": etag}
+        )
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "audio/wav"
+    assert first.content.startswith(b"RIFF")
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+async def test_greeting_audio_is_503_when_synthesis_fails(serve_greetings):
+    async with serve_greetings(FailingTTS()) as client:
+        response = await client.get(
+            "/api/coach/greeting-audio", params={"mode": "situation", "scenario": "restaurant"}
+        )
+    assert response.status_code == 503
@@ -0,0 +1,78 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.routers import coach_router
+
+pytestmark = pytest.mark.anyio
+
+SCENARIOS = "/api/coach/scenarios"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(coach_router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api.test")
+
+
+async def fetch(client, encoding: str, **headers: str) -> httpx.Response:
+    return await client.get(SCENARIOS, headers={"Accept-Encoding": encoding, **headers})
+
+
+async def test_each_encoding_has_its_own_strong_etag(client):
+    async with client:
+        identity = await fetch(client, "identity")
+        gzipped = await fetch(client, "gzip")
+        brotli = await fetch(client, "br, gzip")
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert brotli.headers["content-encoding"] == "br"
+    # 同じ内容でも表現ごとに別の強い ETag
+    tag = identity.headers["etag"]
+    assert not tag.startswith("W/")
+    assert gzipped.headers["etag"] == tag[:-1] + '-gzip"'
+    assert brotli.headers["etag"] == tag[:-1] + '-br"'
+    assert identity.json() == gzipped.json() == brotli.json()
+    for response in (identity, gzipped, brotli):
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+async def test_if_none_match_is_checked_against_the_served_representation(client):
+    async with client:
+        gzipped = await fetch(client, "gzip")
+        tag = gzipped.headers["etag"]
+        revalidated = await fetch(client, "gzip", **{"If-None-Match": tag})
+        # gzip の ETag で identity を再検証しても 304 にはならない
+        other = await fetch(client, "identity", **{"If-None-Match": tag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == tag
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+    assert other.status_code == 200
+    assert other.headers["etag"] != tag
+
+
+async def test_if_none_match_uses_weak_comparison(client):
+    async with client:
+        tag = (await fetch(client, "identity")).headers["etag"]
+        weak = await fetch(client, "identity", **{"If-None-Match": f'"other", W/{tag}'})
+        star = await fetch(client, "br", **{"If-None-Match": "*"})
+    assert (weak.status_code, star.status_code) == (304, 304)
+
+
+async def test_encoding_refused_with_q_zero_is_not_served(client):
+    async with client:
+        response = await fetch(client, "br;q=0, gzip")
+    assert response.headers["content-encoding"] == "gzip"
+
+
+async def test_if_modified_since(client):
+    async with client:
+        last_modified = (await fetch(client, "gzip")).headers["last-modified"]
+        unchanged = await fetch(client, "gzip", **{"If-Modified-Since": last_modified})
+        changed = await fetch(
+            client, "gzip", **{"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}
+        )
+        invalid = await fetch(client, "gzip", **{"If-Modified-Since": "yesterday"})
+    assert (unchanged.status_code, changed.status_code, invalid.status_code) == (304, 200, 200)
@@ -0,0 +1,67 @@
+from src.agents.script_coach import ScriptCoach
+from src.models.script import Script, ScriptLine
+from src.services.prompt_compiler import PromptBlock, compile_prompt
+
+FILLER = "\n".join(f"- example phrase number {i}" for i in range(40))
+
+
+def test_blocks_are_ordered_by_scope():
+    compiled = compile_prompt([
+        PromptBlock("session", "Talk about coffee.", "session"),
+        PromptBlock("global", "You are an English coach.", "global"),
+    ])
+    assert compiled.text == "You are an English coach.\n\nTalk about coffee.\n"
+
+
+def test_repeated_rules_are_stated_once():
+    compiled = compile_prompt([
+        PromptBlock("global", "- Speak slowly.\n- Be kind.", "global"),
+        PromptBlock("session", "- be kind\n- Use the learner's name.", "session"),
+    ])
+    assert compiled.text.count("ind") == 1
+    assert "- Use the learner's name." in compiled.text
+
+
+def test_rules_of_a_dropped_block_stay_in_later_blocks():
+    compiled = compile_prompt(
+        [
+            PromptBlock("examples", "- Greet the learner first.\n" + FILLER, "mode", False),
+            PromptBlock("session", "- Greet the learner first.\n- Ask one question.", "session"),
+        ],
+        budget=30,
+    )
+    assert compiled.dropped == ("examples",)
+    # 削られたブロックが先に述べていた項目は残る
+    assert compiled.text == "- Greet the learner first.\n- Ask one question.\n"
+
+
+def test_required_blocks_are_kept_over_budget():
+    compiled = compile_prompt([PromptBlock("session", FILLER, "session")], budget=10)
+    assert compiled.over_budget
+    assert compiled.tokens > 10
+    assert "example phrase number 39" in compiled.text
+
+
+def test_long_script_compiles_over_budget():
+    coach = ScriptCoach(level="beginner")
+    coach.script = Script(
+        id="long",
+        title="A long conversation",
+        title_ja="長い会話",
+        description="Many turns",
+        difficulty="beginner",
+        category="daily",
+        estimated_minutes=30,
+        lines=[
+            ScriptLine(
+                id=i,
+                speaker="partner" if i % 2 else "user",
+                text=f"This is line number {i} of a long conversation about weekend plans.",
+            )
+            for i in range(1, 121)
+        ],
+    )
+    compiled = coach.compile_instructions(budget=2000)
+    # 台本は削れないため、予算を超えても全行を含めて返す
+    assert compiled.over_budget
+    assert "Line 120 - USER (learner)" in compiled.text
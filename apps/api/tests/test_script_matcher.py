@@ -0,0 +1,70 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.models.script import Script, ScriptLine
+from src.routers import coach_router
+from src.services import script_matcher as matcher_module
+from src.services.script_matcher import ScriptIndex, ScriptMatcher
+
+
+def make_script(lines: list[tuple[str, str]], script_id: str = "cafe") -> Script:
+    return Script(
+        id=script_id,
+        title="At the cafe",
+        title_ja="カフェで",
+        description="Ordering a drink",
+        difficulty="beginner",
+        category="daily",
+        estimated_minutes=3,
+        lines=[ScriptLine(id=i, speaker=s, text=t) for i, (s, t) in enumerate(lines, 1)],
+    )
+
+
+CAFE = make_script([
+    ("partner", "Hi, what can I get for you?"),
+    ("user", "Can I have a large latte, please?"),
+    ("partner", "Sure. Anything else?"),
+    ("user", "No thanks, that's all."),
+])
+
+
+def test_best_candidate_line_is_matched():
+    result = ScriptMatcher().score(ScriptIndex.build(CAFE), "can I have a large latte please")
+    assert result.line_id == 2
+    assert result.verdict == "match"
+
+
+def test_empty_transcript_is_a_miss():
+    result = ScriptMatcher().score(ScriptIndex.build(CAFE), "")
+    assert result.score == 0.0
+    assert result.verdict == "miss"
+
+
+def test_unrelated_transcript_is_a_miss():
+    result = ScriptMatcher().score(ScriptIndex.build(CAFE), "zzz")
+    assert result.verdict == "miss"
+
+
+def test_unknown_line_id_returns_none():
+    assert ScriptMatcher().score(ScriptIndex.build(CAFE), "hello", line_id=1) is None
+
+
+@pytest.mark.anyio
+async def test_score_endpoint_rejects_scripts_without_user_lines(monkeypatch):
+    listening = make_script([("partner", "Welcome in!")], script_id="listening")
+    indexes = {"cafe": ScriptIndex.build(CAFE), "listening": ScriptIndex.build(listening)}
+    monkeypatch.setattr(matcher_module.script_matcher, "index", indexes.get)
+    app = FastAPI()
+    app.include_router(coach_router)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api.test"
+    ) as client:
+        empty = await client.post("/api/coach/scripts/cafe/score", json={"transcript": ""})
+        no_lines = await client.post(
+            "/api/coach/scripts/listening/score", json={"transcript": "welcome"}
+        )
+    assert empty.status_code == 200
+    assert empty.json()["verdict"] == "miss"
+    assert no_lines.status_code == 422
+    assert no_lines.json()["detail"] == "Script has no user lines: listening"
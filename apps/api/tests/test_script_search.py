@@ -0,0 +1,94 @@
+import pytest
+
+from src.models.script import Script, ScriptLine
+from src.services.script_catalog import ScriptCatalog
+from src.services.script_search import InvalidCursorError, SearchIndex, _script_tokens
+
+
+def make_script(script_id: str, title: str, category: str, difficulty: str, minutes: int,
+                text: str) -> Script:
+    return Script(
+        id=script_id,
+        title=title,
+        title_ja=title,
+        description=f"Practice: {title.lower()}",
+        difficulty=difficulty,
+        category=category,
+        estimated_minutes=minutes,
+        lines=[ScriptLine(id=1, speaker="partner", text="Hello!"),
+               ScriptLine(id=2, speaker="user", text=text)],
+    )
+
+
+SCRIPTS = {
+    "cafe": make_script("cafe", "At the cafe", "daily", "beginner", 3,
+                        "A coffee, please."),
+    "bakery": make_script("bakery", "At the bakery", "daily", "beginner", 4,
+                          "Two croissants, please."),
+    "hotel": make_script("hotel", "Hotel check-in", "travel", "intermediate", 5,
+                         "I have a reservation."),
+    "airport": make_script("airport", "At the airport", "travel", "beginner", 6,
+                           "Where is gate five?"),
+    # JSON の id がファイル名と異なるスクリプト
+    "meeting-v2": make_script("meeting", "Team meeting", "business", "advanced", 10,
+                              "Let's review the reservation numbers."),
+}
+
+
+@pytest.fixture
+def index(tmp_path) -> SearchIndex:
+    for name, script in SCRIPTS.items():
+        (tmp_path / f"{name}.json").write_text(script.model_dump_json())
+    catalog = ScriptCatalog(tmp_path)
+    snapshot = catalog.snapshot
+    tokens = {script_id: _script_tokens(script) for script_id, script in snapshot.scripts.items()}
+    return SearchIndex.build(snapshot, tokens)
+
+
+def ids(page) -> list[str]:
+    return [info.id for info in page.scripts]
+
+
+def test_filters_are_combined(index):
+    assert ids(index.search(categories=["daily"])) == ["bakery", "cafe"]
+    assert ids(index.search(categories=["travel"], difficulties=["beginner"])) == ["airport"]
+    assert ids(index.search(min_minutes=5, max_minutes=6)) == ["airport", "hotel"]
+    assert index.search(categories=["daily", "business"]).total == 3
+
+
+def test_text_search_matches_words_and_a_typed_prefix(index):
+    assert ids(index.search(query="coffee please")) == ["cafe"]
+    # 入力途中の最後の語は前方一致
+    assert ids(index.search(query="reserv")) == ["meeting", "hotel"]
+    assert ids(index.search(query="reserv ")) == []
+
+
+def test_script_whose_id_differs_from_its_file_name_is_indexed(index):
+    page = index.search(categories=["business"])
+    assert ids(page) == ["meeting"]
+    assert page.total == 1
+
+
+def test_cursor_pages_through_every_match(index):
+    everything = ids(index.search())
+    seen, cursor = [], None
+    while True:
+        page = index.search(limit=2, cursor=cursor)
+        assert page.total == len(everything)
+        seen += ids(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == everything
+
+
+def test_cursor_keeps_its_place_when_filtered(index):
+    first = index.search(categories=["daily", "travel"], limit=3)
+    rest = index.search(categories=["daily", "travel"], limit=3, cursor=first.next_cursor)
+    assert ids(first) + ids(rest) == ["bakery", "cafe", "airport", "hotel"]
+    assert rest.next_cursor is None
+
+
+def test_invalid_cursor_is_rejected(index):
+    with pytest.raises(InvalidCursorError):
+        index.search(cursor="not-a-cursor")
@@ -0,0 +1,50 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.routers import coach as coach_module
+from src.routers import coach_router
+from src.services.deepgram_tokens import DeepgramCredentials
+
+pytestmark = pytest.mark.anyio
+
+SITUATION = {"mode": "situation", "level": "beginner", "scenario": "restaurant"}
+
+
+@pytest.fixture
+def issued() -> list:
+    return []
+
+
+@pytest.fixture
+def client(monkeypatch, issued):
+    async def credentials() -> DeepgramCredentials:
+        issued.append(1)
+        return DeepgramCredentials(api_key="short-lived", auth_scheme="bearer", expires_in=60)
+
+    monkeypatch.setattr(coach_module, "get_deepgram_credentials", credentials)
+    app = FastAPI()
+    app.include_router(coach_router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api.test")
+
+
+async def test_prefetch_carries_no_credentials(client, issued):
+    async with client:
+        response = await client.post("/api/coach/session/bootstrap/batch", json={"sessions": [
+            SITUATION, {"mode": "script", "script_id": "no-such-script"},
+        ]})
+    assert response.status_code == 200
+    prefetched, missing = response.json()["sessions"]
+    assert prefetched["config"]["greeting"]
+    assert "api_key" not in prefetched["config"]
+    assert missing is None
+    # 先読みではトークンを発行しない
+    assert issued == []
+
+
+async def test_session_start_issues_credentials(client, issued):
+    async with client:
+        response = await client.post("/api/coach/session/bootstrap", json=SITUATION)
+    assert response.status_code == 200
+    assert response.json()["config"]["api_key"] == "short-lived"
+    assert issued == [1]
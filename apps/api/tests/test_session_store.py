@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src.models.coach import EndSessionRequest, SessionEvent
+from src.services.session_store import SessionStore
+
+pytestmark = pytest.mark.anyio
+
+
+def ended(session_id: str, **fields) -> EndSessionRequest:
+    values = {"mode": "situation", "scenario": "restaurant", "duration": 60,
+              "messages_exchanged": 10}
+    return EndSessionRequest(session_id=session_id, **{**values, **fields})
+
+
+async def until(condition) -> None:
+    async with asyncio.timeout(2.0):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), batch_size=3, flush_interval=0.05)
+    await store.start()
+    yield store
+    await store.close()
+
+
+def batch_sizes(store: SessionStore, monkeypatch) -> list[int]:
+    sizes = []
+    write = store._write
+
+    def recording(batch):
+        sizes.append(len(batch))
+        write(batch)
+
+    monkeypatch.setattr(store, "_write", recording)
+    return sizes
+
+
+async def test_records_are_written_in_batches(store, monkeypatch):
+    sizes = batch_sizes(store, monkeypatch)
+    for i in range(7):
+        assert store.record_end(ended(f"s{i}"))
+    await until(lambda: store.written == 7)
+    # batch_size ごとにまとめ、残りは flush_interval 後に書く
+    assert sizes == [3, 3, 1]
+    assert store.pending == 0
+
+
+async def test_rollups_aggregate_every_dimension(store):
+    store.record_end(ended("a", duration=60, messages_exchanged=10))
+    store.record_end(ended("b", duration=120, messages_exchanged=20, level="advanced"))
+    store.record_end(ended("c", mode="script", scenario=None, script_id="cafe", duration=30,
+                           messages_exchanged=4, lines_completed=5))
+    await until(lambda: store.written == 3)
+
+    [restaurant] = await store.stats("scenario")
+    assert (restaurant.key, restaurant.sessions) == ("restaurant", 2)
+    assert (restaurant.avg_duration, restaurant.avg_messages) == (90.0, 15.0)
+    assert restaurant.avg_lines_completed is None
+    [cafe] = await store.stats("script")
+    assert (cafe.key, cafe.sessions, cafe.avg_lines_completed) == ("cafe", 1, 5.0)
+    assert [(g.key, g.sessions) for g in await store.stats("level")] == [
+        ("beginner", 2), ("advanced", 1)]
+    assert [(g.key, g.sessions) for g in await store.stats("mode")] == [
+        ("situation", 2), ("script", 1)]
+
+
+async def test_resent_session_is_counted_once(store):
+    store.record_end(ended("a"))
+    store.record_end(ended("a"))
+    await until(lambda: store.written == 2)
+    store.record_end(ended("a"))
+    await until(lambda: store.written == 3)
+    [group] = await store.stats("mode")
+    assert group.sessions == 1
+
+
+async def test_close_flushes_queued_records(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path, flush_interval=60.0)
+    await store.start()
+    store.record_end(ended("a"))
+    store.record_events("a", [SessionEvent(type="user_turn", text="Hello"),
+                              SessionEvent(type="line_scored", score=0.9, timestamp=5.0)])
+    await store.close()
+    assert store.written == 2
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT count(*) FROM sessions").fetchone() == (1,)
+        rows = conn.execute("SELECT type, score, created_at FROM session_events ORDER BY id")
+        user_turn, scored = rows.fetchall()
+    assert user_turn[0] == "user_turn" and user_turn[2] > 5.0
+    assert scored == ("line_scored", 0.9, 5.0)
+
+
+async def test_full_queue_drops_without_blocking(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), queue_size=1)
+    assert not store.record_end(ended("before-start"))
+    await store.start()
+    try:
+        assert store.record_end(ended("a"))
+        assert not store.record_end(ended("b"))
+        assert store.dropped == 2
+    finally:
+        await store.close()
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.models.detection import DetectedObject
+from src.vision.detector import Detection
+from src.vision.tracker import ObjectTracker, associate, iou_matrix
+
+CUP = (0.1, 0.1, 0.3, 0.3)
+
+
+def test_iou_of_identical_disjoint_and_overlapping_boxes():
+    a = np.array([[0.0, 0.0, 0.2, 0.2]], dtype=np.float32)
+    b = np.array([[0.0, 0.0, 0.2, 0.2], [0.5, 0.5, 0.7, 0.7], [0.1, 0.0, 0.3, 0.2]],
+                 dtype=np.float32)
+    assert iou_matrix(a, b)[0] == pytest.approx([1.0, 0.0, 1 / 3], abs=1e-5)
+
+
+def test_association_is_one_to_one_by_highest_iou():
+    iou = np.array([[0.9, 0.5], [0.8, 0.4]])
+    # 行0が列0を取るため、行1は閾値を超える残りの列1とだけ組む
+    assert associate(iou, threshold=0.3) == [(0, 0), (1, 1)]
+    assert associate(iou, threshold=0.45) == [(0, 0)]
+
+
+def test_detector_boxes_keep_their_track():
+    tracker = ObjectTracker()
+    tracker.observe([Detection("cup", 0.8, CUP)], now=0.0)
+    # 1回の検出だけでは表示しない
+    assert tracker.states(now=0.0) == []
+    tracker.observe([Detection("cup", 0.8, (0.12, 0.1, 0.32, 0.3))], now=0.1)
+    [cup] = tracker.states(now=0.1)
+    tracker.observe([Detection("cup", 0.8, (0.14, 0.1, 0.34, 0.3))], now=0.2)
+    assert [obj.id for obj in tracker.states(now=0.2)] == [cup.id]
+    assert tracker.stats.created == 1
+
+
+def test_labels_must_agree_to_match():
+    tracker = ObjectTracker()
+    tracker.observe([Detection("cup", 0.8, CUP)], now=0.0)
+    tracker.observe([Detection("bowl", 0.8, CUP)], now=0.1)
+    assert tracker.stats.created == 2
+
+
+def test_keyframe_objects_show_at_once_and_decay_after_the_grace_period():
+    tracker = ObjectTracker(half_life=4.0, grace=5.0)
+    tracker.keyframe([DetectedObject(name="a cup", confidence="high")], now=0.0)
+    assert [obj.name for obj in tracker.states(now=0.0)] == ["a cup"]
+    [track] = tracker.tracks
+    assert tracker.decayed(track, now=5.0) == pytest.approx(0.9)
+    assert tracker.decayed(track, now=9.0) == pytest.approx(0.45)
+    # 最低スコアを下回ると消える
+    assert tracker.states(now=30.0) == []
+    assert tracker.stats.expired == 1
+
+
+def test_objects_missing_from_a_keyframe_are_penalized_not_removed():
+    tracker = ObjectTracker(miss_penalty=0.6)
+    tracker.keyframe([DetectedObject(name="cup", confidence="high")], now=0.0)
+    tracker.keyframe([], now=1.0)
+    [cup] = tracker.states(now=1.0)
+    assert tracker.tracks[0].score == pytest.approx(0.54)
+    assert cup.confidence == "medium"
+
+
+def test_confidence_changes_only_past_the_hysteresis_margin():
+    tracker = ObjectTracker(hysteresis=0.05)
+    tracker.keyframe([DetectedObject(name="cup", confidence="high")], now=0.0)
+    track = tracker.tracks[0]
+
+    def level(score: float) -> str:
+        track.score = score
+        return tracker.states(now=0.0)[0].confidence
+
+    assert level(0.9) == "high"
+    # high の下限 0.7 を少し下回っただけでは変えない
+    assert level(0.68) == "high"
+    assert level(0.64) == "medium"
+    assert level(0.72) == "medium"
+    assert level(0.76) == "high"
@@ -0,0 +1,73 @@
+import numpy as np
+
+from src.services.voice_gate import VoiceGate
+from src.services.voice_relay import KEEPALIVE
+
+SAMPLE_RATE = 16000
+CHUNK = 0.1  # 秒
+
+
+def speech(seconds: float = CHUNK) -> bytes:
+    """A loud 200 Hz tone, classified as voiced"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (8000 * np.sin(2 * np.pi * 200 * t)).astype("<i2").tobytes()
+
+
+def silence(seed: int, seconds: float = CHUNK) -> bytes:
+    """Faint room noise (each seed gives different bytes)"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(-5, 6, size=int(SAMPLE_RATE * seconds)).astype("<i2").tobytes()
+
+
+def test_speech_is_forwarded_unchanged():
+    gate = VoiceGate()
+    chunk = speech()
+    assert gate.process(chunk, now=0.0) == [chunk]
+    assert gate.active
+
+
+def test_silence_is_dropped_with_keepalives():
+    gate = VoiceGate(keepalive_interval=1.0)
+    sent = [gate.process(silence(i), now=i * CHUNK) for i in range(25)]
+    # 1秒ごとに KeepAlive だけが送られる
+    assert [i for i, out in enumerate(sent) if out] == [10, 20]
+    assert sent[10] == [KEEPALIVE]
+    assert gate.stats.keepalives == 2
+
+
+def test_pre_roll_is_flushed_ahead_of_the_onset():
+    gate = VoiceGate(pre_roll=0.2)
+    quiet = [silence(i) for i in range(5)]
+    for i, chunk in enumerate(quiet):
+        assert gate.process(chunk, now=i * CHUNK) == []
+    onset = speech()
+    # 直前の 0.2 秒分の無音を先に送ってから発話を送る
+    assert gate.process(onset, now=0.5) == [quiet[3], quiet[4], onset]
+    assert gate.stats.onsets == 1
+
+
+def test_hangover_keeps_the_end_of_the_turn():
+    gate = VoiceGate(hangover=0.35)
+    gate.process(speech(), now=0.0)
+    trailing = [silence(i) for i in range(5)]
+    sent = [gate.process(chunk, now=(i + 1) * CHUNK) for i, chunk in enumerate(trailing)]
+    assert sent[:3] == [[trailing[0]], [trailing[1]], [trailing[2]]]
+    assert sent[3:] == [[], []]
+    assert not gate.active
+
+
+def test_stats_count_only_what_was_not_sent():
+    gate = VoiceGate(pre_roll=0.2, hangover=0.0, keepalive_interval=60.0)
+    chunks = [silence(i) for i in range(5)] + [speech()]
+    for i, chunk in enumerate(chunks):
+        gate.process(chunk, now=i * CHUNK)
+    stats = gate.stats
+    size = len(chunks[0])
+    assert stats.chunks == 6
+    assert stats.bytes_in == 6 * size
+    # 先読み分の2チャンクは送られたので、捨てたのは3チャンク
+    assert stats.bytes_forwarded == 3 * size
+    assert stats.chunks_dropped == 3
+    assert stats.bytes_saved == 3 * size
+    assert stats.saved_ratio == 0.5
+    assert stats.mean_latency_ms > 0
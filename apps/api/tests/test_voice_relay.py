@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketState
+
+from src.services.voice_relay import RelayLimits, UpstreamPool, relay
+
+pytestmark = pytest.mark.anyio
+
+SETTINGS = json.dumps({"type": "Settings", "agent": {}})
+AUDIO_FRAME = b"\x00\x01" * 512
+
+
+class FakeAgent:
+    """Voice Agent stand-in that echoes every audio frame back"""
+
+    def __init__(self):
+        self.connections = 0
+        self.received: list[bytes] = []
+
+    async def handler(self, connection) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        self.connections += 1
+        try:
+            await connection.send(json.dumps({"type": "Welcome"}))
+            async for message in connection:
+                if isinstance(message, bytes):
+                    self.received.append(message)
+                    await connection.send(message)
+                elif json.loads(message)["type"] == "Settings":
+                    await connection.send(json.dumps({"type": "SettingsApplied"}))
+        except ConnectionClosed:
+            pass
+
+
+class FakeClient:
+    """The browser side of a relay session, as the relay sees a Starlette WebSocket"""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled  # 受け取らない相手を模す
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent: list[bytes] = []
+        self.closed = None
+        self.application_state = WebSocketState.CONNECTED
+
+    def push(self, data: bytes) -> None:
+        self.incoming.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def receive(self) -> dict:
+        return await self.incoming.get()
+
+    async def send_bytes(self, data: bytes) -> None:
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed = (code, reason)
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+async def until(condition) -> None:
+    async with asyncio.timeout(2.0):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def agent():
+    from websockets.asyncio.server import serve
+
+    fake = FakeAgent()
+    async with serve(fake.handler, "127.0.0.1", 0, compression=None) as server:
+        port = server.sockets[0].getsockname()[1]
+        fake.url = f"ws://127.0.0.1:{port}"
+        yield fake
+
+
+async def test_frames_are_forwarded_unchanged(agent):
+    pool = UpstreamPool(agent.url, api_key="test", size=0)
+    upstream = await pool.acquire("key", SETTINGS)
+    client = FakeClient()
+    session = asyncio.create_task(relay(client, upstream, RelayLimits()))
+    client.push(AUDIO_FRAME)
+    await until(lambda: client.sent)
+    client.disconnect()
+    stats = await session
+    assert agent.received == [AUDIO_FRAME]
+    assert client.sent == [AUDIO_FRAME]
+    assert (stats.client_bytes, stats.agent_bytes) == (len(AUDIO_FRAME), len(AUDIO_FRAME))
+    assert client.closed == (1000, "")
+
+
+async def test_oversize_frame_closes_with_1009(agent):
+    pool = UpstreamPool(agent.url, api_key="test", size=0)
+    upstream = await pool.acquire("key", SETTINGS)
+    client = FakeClient()
+    client.push(AUDIO_FRAME)
+    await relay(client, upstream, RelayLimits(max_frame_bytes=len(AUDIO_FRAME) - 1))
+    assert client.closed == (1009, "Frame too large")
+    assert agent.received == []
+
+
+async def test_slow_client_closes_with_1013(agent):
+    pool = UpstreamPool(agent.url, api_key="test", size=0)
+    upstream = await pool.acquire("key", SETTINGS)
+    client = FakeClient(stalled=True)
+    client.push(AUDIO_FRAME)
+    await relay(client, upstream, RelayLimits(send_timeout=0.05))
+    assert client.closed == (1013, "Peer too slow")
+
+
+async def test_second_session_takes_the_pre_opened_connection(agent):
+    pool = UpstreamPool(agent.url, api_key="test", size=1)
+    try:
+        cold = await pool.acquire("key", SETTINGS)
+        # 最初の要求の後、同じプロンプト用の接続が裏で開かれる
+        await until(lambda: pool.idle_for("key") == 1)
+        warm = await pool.acquire("key", SETTINGS)
+        assert (cold.warm, warm.warm) == (False, True)
+        assert (pool.cold_opens, pool.warm_hits) == (1, 1)
+        await cold.connection.close()
+        await warm.connection.close()
+    finally:
+        await pool.close()
+
+
+async def test_idle_connections_expire_after_idle_ttl(agent):
+    pool = UpstreamPool(agent.url, api_key="test", size=1, idle_ttl=0.0)
+    try:
+        pool.warm("key", SETTINGS)
+        await until(lambda: pool.idle_for("key") == 1)
+        idle = pool._idle["key"][0]
+        await pool._maintain_once()
+        assert pool.expired == 1
+        assert not idle.is_open
+        # 期限切れの接続は入れ替えられる
+        await until(lambda: pool.idle_for("key") == 1)
+        assert pool._idle["key"][0] is not idle
+        assert agent.connections == 2
+    finally:
+        await pool.close()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from src.services.admission import AdmissionController
+from src.services.metrics import merge_worker_families, render_families
+from src.services.workers import WorkerContext
+
+
+def test_share_divides_counts_rounding_up():
+    context = WorkerContext(index=1, count=3)
+    assert context.share(8) == 3
+    assert context.share(1) == 1
+    assert context.share(0) == 0
+    assert not context.primary
+    assert context.forked
+
+
+def test_admission_limits_are_divided_between_workers():
+    controller = AdmissionController(
+        rate=6.0, burst=20, client_rate=0.3, client_burst=5,
+        max_inflight=32, max_queue=64, queue_timeout=2.0,
+    )
+    controller.divide(4)
+    assert controller.bucket.rate == 1.5
+    assert controller.bucket.burst == 5
+    assert controller.client_rate == pytest.approx(0.075)
+    assert controller.client_burst == 2
+    assert controller.max_inflight == 8
+    assert controller.max_queue == 16
+
+
+def test_metrics_of_workers_are_merged_with_a_worker_label():
+    families = merge_worker_families({
+        1: [("admitted_total", "Admitted", "counter", [("admitted_total", "", 2)])],
+        0: [("admitted_total", "Admitted", "counter", [("admitted_total", "", 3)])],
+    })
+    assert render_families(families) == (
+        "# HELP admitted_total Admitted\n"
+        "# TYPE admitted_total counter\n"
+        'admitted_total{worker="0"} 3\n'
+        'admitted_total{worker="1"} 2\n'
+    )
+
+
+@pytest.mark.anyio
+async def test_states_include_live_peers_only(tmp_path):
+    context = WorkerContext(index=0, count=3, state_dir=tmp_path)
+    (tmp_path / "worker-1-101.json").write_text(
+        json.dumps({"pid": 101, "metrics": [], "admission": {}})
+    )
+    stale = tmp_path / "worker-2-102.json"
+    stale.write_text(json.dumps({"pid": 2, "metrics": [], "admission": {}}))
+    # 終了したワーカーの古い状態は無視する
+    os.utime(stale, (0, 0))
+    states = await context.states()
+    assert sorted(states) == [0, 1]
+    assert states[0]["admission"]["saturated"] is False
+
+
+@pytest.mark.anyio
+async def test_replacement_worker_state_wins_during_a_rolling_restart(tmp_path):
+    context = WorkerContext(index=0, count=2, state_dir=tmp_path)
+    # SIGHUP の入れ替え中は同じ番号の旧ワーカーも状態を書き続ける
+    for pid, started_at in ((201, 50.0), (102, 10.0)):
+        (tmp_path / f"worker-1-{pid}.json").write_text(
+            json.dumps({"pid": pid, "started_at": started_at, "metrics": [], "admission": {}})
+        )
+    states = await context.states()
+    assert states[1]["pid"] == 201
+
+
+@pytest.mark.anyio
+async def test_published_state_is_removed_when_the_worker_stops(tmp_path):
+    context = WorkerContext(index=1, count=2, state_dir=tmp_path)
+    task = asyncio.create_task(context.publish())
+    path = tmp_path / f"worker-1-{os.getpid()}.json"
+    async with asyncio.timeout(2.0):
+        while not path.exists():
+            await asyncio.sleep(0.01)
+    assert json.loads(path.read_text())["pid"] == os.getpid()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert list(tmp_path.iterdir()) == []
@@ -3,7 +3,13 @@
 import Link from "next/link";
 import { useSearchParams } from "next/navigation";
 import { Suspense, useEffect, useState } from "react";
-import { getScripts, ScriptInfo, Category, Difficulty } from "@/lib/script-api";
+import {
+  getScripts,
+  prefetchScriptSessions,
+  ScriptInfo,
+  Category,
+  Difficulty,
+} from "@/lib/script-api";
 
 const categoryIcons: Record<Category, string> = {
   daily: "☕",
@@ -23,6 +29,9 @@ const difficultyColors: Record<Difficulty, string> = {
   advanced: "bg-red-600/20 text-red-400",
 };
 
+// カタログ全体ではなく1ページ分ずつ取得する
+const PAGE_SIZE = 24;
+
 function ScriptSelectionContent() {
   const searchParams = useSearchParams();
   const level = (searchParams.get("level") as Difficulty) || "beginner";
@@ -30,24 +39,51 @@ function ScriptSelectionContent() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [filterCategory, setFilterCategory] = useState<Category | "all">("all");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
+    let cancelled = false;
     async function fetchScripts() {
       try {
-        const data = await getScripts();
-        setScripts(data);
+        const data = await getScripts({
+          category: filterCategory === "all" ? undefined : filterCategory,
+          limit: PAGE_SIZE,
+        });
+        if (cancelled) return;
+        setScripts(data.scripts);
+        setNextCursor(data.next_cursor);
       } catch (e) {
-        setError(e instanceof Error ? e.message : "Failed to load scripts");
+        if (!cancelled) {
+          setError(e instanceof Error ? e.message : "Failed to load scripts");
+        }
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     }
     fetchScripts();
-  }, []);
-
-  const filteredScripts = filterCategory === "all"
-    ? scripts
-    : scripts.filter((s) => s.category === filterCategory);
+    return () => {
+      cancelled = true;
+    };
+  }, [filterCategory]);
+
+  async function loadMore() {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await getScripts({
+        category: filterCategory === "all" ? undefined : filterCategory,
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      setScripts((current) => [...current, ...data.scripts]);
+      setNextCursor(data.next_cursor);
+    } catch (e) {
+      setError(e instanceof Error ? e.message : "Failed to load scripts");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
 
   if (loading) {
     return (
@@ -67,6 +103,10 @@ function ScriptSelectionContent() {
 
   const capitalizeLevel = level.charAt(0).toUpperCase() + level.slice(1);
 
+  // 選びそうなスクリプト (ホバー/フォーカス/タッチ) のセッションを先読みする
+  const prefetch = (scriptId: string) =>
+    prefetchScriptSessions([{ mode: "script", level, script_id: scriptId }]);
+
   return (
     <main className="container mx-auto px-4 py-12">
       <div className="mb-8">
@@ -117,10 +157,13 @@ function ScriptSelectionContent() {
       </div>
 
       <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
-        {filteredScripts.map((script) => (
+        {scripts.map((script) => (
           <Link
             key={script.id}
             href={"/coach/script/" + script.id + "?level=" + level}
+            onMouseEnter={() => prefetch(script.id)}
+            onFocus={() => prefetch(script.id)}
+            onTouchStart={() => prefetch(script.id)}
             className="group relative overflow-hidden rounded-2xl bg-slate-800 p-6 transition-all hover:bg-slate-700 hover:shadow-xl hover:shadow-blue-900/20"
           >
             <div className="flex items-start gap-4">
@@ -147,7 +190,19 @@ function ScriptSelectionContent() {
         ))}
       </div>
 
-      {filteredScripts.length === 0 && (
+      {nextCursor && (
+        <div className="mt-8 flex justify-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="rounded-full bg-slate-700 px-6 py-2 text-sm text-slate-300 transition-colors hover:bg-slate-600 disabled:opacity-50"
+          >
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
+
+      {scripts.length === 0 && (
         <div className="text-center text-slate-400 py-12">
           No scripts found for this category.
         </div>
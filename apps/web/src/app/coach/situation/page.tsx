@@ -3,6 +3,7 @@
 import Link from "next/link";
 import { useSearchParams } from "next/navigation";
 import { Suspense } from "react";
+import { prefetchVoiceAgentConfig, VoiceAgentConfigRequest } from "@/lib/coach-api";
 
 const scenarios = [
   {
@@ -43,6 +44,14 @@ function SituationContent() {
   const searchParams = useSearchParams();
   const level = searchParams.get("level") || "beginner";
 
+  // 選びそうなシナリオ (ホバー/フォーカス/タッチ) の設定を先読みする
+  const prefetch = (scenario: string) =>
+    prefetchVoiceAgentConfig({
+      mode: "situation",
+      level: level as VoiceAgentConfigRequest["level"],
+      scenario,
+    });
+
   return (
     <main className="container mx-auto px-4 py-12">
       <div className="mb-8">
@@ -71,6 +80,9 @@ function SituationContent() {
           <Link
             key={scenario.id}
             href={`/coach/situation/${scenario.id}?level=${level}`}
+            onMouseEnter={() => prefetch(scenario.id)}
+            onFocus={() => prefetch(scenario.id)}
+            onTouchStart={() => prefetch(scenario.id)}
             className="group relative overflow-hidden rounded-2xl bg-slate-800 p-6 transition-all hover:bg-slate-700 hover:shadow-xl hover:shadow-blue-900/20"
           >
             <div className="flex items-start gap-4">
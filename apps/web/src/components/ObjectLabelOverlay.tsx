@@ -5,6 +5,24 @@ import { useEffect, useState } from "react";
 export interface DetectedObject {
   name: string;
   confidence: "high" | "medium" | "low";
+  // エージェントのトラッカーが振る識別子（更新をまたいで同じ物体を指す）
+  id?: number | null;
+  // x1, y1, x2, y2（0-1 に正規化、ローカル検出器がある場合のみ）
+  box?: [number, number, number, number] | null;
+}
+
+// 同じ物体は更新をまたいで同じ要素として描画し、再マウントを避ける
+function objectKey(obj: DetectedObject, index: number): string {
+  return obj.id != null ? `track-${obj.id}` : `${obj.name}-${index}`;
+}
+
+function boxPosition(box: [number, number, number, number]) {
+  return {
+    top: box[1] * 100,
+    left: box[0] * 100,
+    width: (box[2] - box[0]) * 100,
+    height: (box[3] - box[1]) * 100,
+  };
 }
 
 interface ObjectLabelOverlayProps {
@@ -89,14 +107,14 @@ export function ObjectLabelOverlay({ objects }: ObjectLabelOverlayProps) {
     <div className="absolute inset-0 pointer-events-none overflow-hidden">
       {/* バウンディングボックス */}
       {objects.map((obj, index) => {
-        const pos = positions[index];
+        const pos = obj.box ? boxPosition(obj.box) : positions[index];
         if (!pos) return null;
 
         const colors = confidenceColors[obj.confidence];
 
         return (
           <div
-            key={`${obj.name}-${index}`}
+            key={objectKey(obj, index)}
             className={`
               absolute
               border-2 ${colors.border}
@@ -163,7 +181,7 @@ export function ObjectLabelOverlay({ objects }: ObjectLabelOverlayProps) {
             const colors = confidenceColors[obj.confidence];
             return (
               <div
-                key={`label-${obj.name}-${index}`}
+                key={`label-${objectKey(obj, index)}`}
                 className={`
                   ${colors.bg}
                   px-4 py-2 rounded-full
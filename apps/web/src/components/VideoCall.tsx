@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef } from "react";
 import {
   StreamVideoClient,
   StreamVideo,
@@ -12,7 +12,7 @@ import {
 import "@stream-io/video-react-sdk/dist/css/styles.css";
 import { StreamChat } from "stream-chat";
 
-import { getCallToken, createCall, joinCallWithAgent } from "@/lib/stream";
+import { getCallToken, createCall, joinCallWithAgent, subscribeDetections } from "@/lib/stream";
 import { ObjectLabelOverlay, DetectedObject } from "./ObjectLabelOverlay";
 
 // エージェントの発話テキストから物体名を抽出
@@ -78,6 +78,7 @@ export function VideoCall({ onObjectsDetected }: VideoCallProps) {
   const [isConnecting, setIsConnecting] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [detectedObjects, setDetectedObjects] = useState<DetectedObject[]>([]);
+  const unsubscribeRef = useRef<(() => void) | null>(null);
 
   const initializeCall = useCallback(async () => {
     try {
@@ -115,12 +116,22 @@ export function VideoCall({ onObjectsDetected }: VideoCallProps) {
       const channel = chat.channel("messaging", callData.call_id);
       await channel.watch();
 
+      // エージェントの構造化された検出結果を購読（届いた時点でこちらを優先）
+      let hasStructuredDetections = false;
+      unsubscribeRef.current?.();
+      unsubscribeRef.current = subscribeDetections(callData.call_id, (update) => {
+        hasStructuredDetections = true;
+        setDetectedObjects(update.objects);
+        onObjectsDetected?.(update.objects);
+      });
+
       // Listen for new messages from the agent
       // メッセージを累積して物体リストを構築
       let accumulatedObjects: DetectedObject[] = [];
       let lastUpdateTime = 0;
 
       channel.on("message.new", (event) => {
+        if (hasStructuredDetections) return;
         if (event.message?.text && event.message.user?.id !== tokenData.user_id) {
           console.log("Agent message:", event.message.text);
           const newObjects = parseObjectsFromMessage(event.message.text);
@@ -173,6 +184,7 @@ export function VideoCall({ onObjectsDetected }: VideoCallProps) {
     initializeCall();
 
     return () => {
+      unsubscribeRef.current?.();
       if (call) {
         call.leave();
       }
@@ -3,7 +3,13 @@
 import { useEffect, useState, useCallback, useRef } from "react";
 import Link from "next/link";
 
-import { getVoiceAgentConfig } from "@/lib/coach-api";
+import {
+  getGreetingAudioUrl,
+  getVoiceAgentConfig,
+  reportSessionEnd,
+  VOICE_AGENT_RELAY,
+  voiceAgentRelayUrl,
+} from "@/lib/coach-api";
 import { DeepgramVoiceAgentClient } from "@/lib/deepgram-voice-agent";
 
 type Level = "beginner" | "intermediate" | "advanced";
@@ -45,6 +51,7 @@ export function CoachSession({
   const [isMuted, setIsMuted] = useState(false);
   const [isAgentThinking, setIsAgentThinking] = useState(false);
   const [sessionStartTime] = useState<Date>(new Date());
+  const [sessionId] = useState(() => crypto.randomUUID());
   const transcriptEndRef = useRef<HTMLDivElement>(null);
   const clientRef = useRef<DeepgramVoiceAgentClient | null>(null);
   const isInitializedRef = useRef(false);
@@ -77,8 +84,11 @@ export function CoachSession({
       const client = new DeepgramVoiceAgentClient(
         {
           apiKey: config.api_key,
+          authScheme: config.auth_scheme,
           prompt: config.prompt,
           greeting: config.greeting,
+          greetingAudioUrl: getGreetingAudioUrl({ mode, level, scenario }),
+          relayUrl: VOICE_AGENT_RELAY ? voiceAgentRelayUrl({ mode, level, scenario }) : undefined,
           voice: config.voice,
           listenModel: config.listen_model,
           thinkProvider: config.think_provider,
@@ -154,6 +164,14 @@ export function CoachSession({
     const duration = Math.round(
       (new Date().getTime() - sessionStartTime.getTime()) / 1000
     );
+    reportSessionEnd({
+      session_id: sessionId,
+      mode,
+      level,
+      scenario,
+      duration,
+      messages_exchanged: transcripts.length,
+    });
     onSessionEnd?.({
       duration,
       messagesExchanged: transcripts.length,
@@ -164,7 +182,7 @@ export function CoachSession({
     }
     // Navigate back
     window.location.href = `/coach/situation?level=${level}`;
-  }, [sessionStartTime, transcripts.length, onSessionEnd, level]);
+  }, [sessionStartTime, sessionId, mode, scenario, transcripts.length, onSessionEnd, level]);
 
   if (error) {
     return (
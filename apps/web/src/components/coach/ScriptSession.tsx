@@ -4,12 +4,21 @@ import { useEffect, useState, useCallback, useRef } from "react";
 import Link from "next/link";
 
 import {
+  getScriptGreetingAudioUrl,
   getScriptVoiceAgentConfig,
-  getScript,
+  getScriptSessionBootstrap,
+  takePrefetchedScriptSession,
   Script,
   ScriptLine,
   Difficulty,
+  VoiceAgentConfigResponse,
 } from "@/lib/script-api";
+import {
+  isConfigFresh,
+  reportSessionEnd,
+  VOICE_AGENT_RELAY,
+  voiceAgentRelayUrl,
+} from "@/lib/coach-api";
 import { DeepgramVoiceAgentClient } from "@/lib/deepgram-voice-agent";
 
 interface ScriptSessionProps {
@@ -43,10 +52,14 @@ export function ScriptSession({
   const [isMuted, setIsMuted] = useState(false);
   const [isAgentThinking, setIsAgentThinking] = useState(false);
   const [sessionStartTime] = useState<Date>(new Date());
+  const [sessionId] = useState(() => crypto.randomUUID());
   const [currentLineIndex, setCurrentLineIndex] = useState(0);
   const transcriptEndRef = useRef<HTMLDivElement>(null);
   const scriptLineRef = useRef<HTMLDivElement>(null);
   const clientRef = useRef<DeepgramVoiceAgentClient | null>(null);
+  const configRef = useRef<{ config: VoiceAgentConfigResponse; fetchedAt: number } | null>(
+    null
+  );
 
   const scrollToBottom = useCallback(() => {
     transcriptEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -60,12 +73,27 @@ export function ScriptSession({
     scrollToBottom();
   }, [transcripts, scrollToBottom]);
 
-  // Load script data on mount (doesn't require user gesture)
+  // Load script and voice agent config in one request on mount (doesn't require user gesture)
+  // ピッカーで先読み済みなら台本だけを使い、認証情報は開始時に取得する
   useEffect(() => {
-    getScript(scriptId).then(setScript).catch((err) => {
-      setError(err instanceof Error ? err.message : "Failed to load script");
-    });
-  }, [scriptId]);
+    configRef.current = null;
+    const request = { mode: "script" as const, level, script_id: scriptId };
+    takePrefetchedScriptSession(request)
+      .then(async (prefetched) => {
+        if (prefetched?.script) {
+          return prefetched.script;
+        }
+        const data = await getScriptSessionBootstrap(request);
+        configRef.current = { config: data.config, fetchedAt: Date.now() };
+        return data.script;
+      })
+      .then((loaded) => {
+        setScript(loaded);
+      })
+      .catch((err) => {
+        setError(err instanceof Error ? err.message : "Failed to load script");
+      });
+  }, [scriptId, level]);
 
   const initializeSession = useCallback(async () => {
     if (!script) return;
@@ -75,12 +103,17 @@ export function ScriptSession({
       setIsConnecting(true);
       setError(null);
 
-      // Get voice agent configuration from backend
-      const config = await getScriptVoiceAgentConfig({
-        mode: "script",
-        level,
-        script_id: scriptId,
-      });
+      // Use the config fetched on mount unless its short-lived token has expired
+      const prefetched = configRef.current;
+      const isFresh = prefetched !== null && isConfigFresh(prefetched.config, prefetched.fetchedAt);
+      const config =
+        (isFresh ? prefetched.config : null) ??
+        (await getScriptVoiceAgentConfig({
+          mode: "script",
+          level,
+          script_id: scriptId,
+        }));
+      configRef.current = null;
 
       if (!config.api_key) {
         throw new Error("Deepgram API key not configured on server");
@@ -90,8 +123,17 @@ export function ScriptSession({
       const client = new DeepgramVoiceAgentClient(
         {
           apiKey: config.api_key,
+          authScheme: config.auth_scheme,
           prompt: config.prompt,
           greeting: config.greeting,
+          greetingAudioUrl: getScriptGreetingAudioUrl({
+            mode: "script",
+            level,
+            script_id: scriptId,
+          }),
+          relayUrl: VOICE_AGENT_RELAY
+            ? voiceAgentRelayUrl({ mode: "script", level, script_id: scriptId })
+            : undefined,
           voice: config.voice,
           listenModel: config.listen_model,
           thinkProvider: config.think_provider,
@@ -172,6 +214,15 @@ export function ScriptSession({
     const duration = Math.round(
       (new Date().getTime() - sessionStartTime.getTime()) / 1000
     );
+    reportSessionEnd({
+      session_id: sessionId,
+      mode: "script",
+      level,
+      script_id: scriptId,
+      duration,
+      messages_exchanged: transcripts.length,
+      lines_completed: currentLineIndex + 1,
+    });
     onSessionEnd?.({
       duration,
       messagesExchanged: transcripts.length,
@@ -182,7 +233,7 @@ export function ScriptSession({
       clientRef.current = null;
     }
     window.location.href = "/coach/script?level=" + level;
-  }, [sessionStartTime, transcripts.length, currentLineIndex, onSessionEnd, level]);
+  }, [sessionStartTime, sessionId, scriptId, transcripts.length, currentLineIndex, onSessionEnd, level]);
 
   if (error) {
     return (
@@ -1,5 +1,18 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+// Route voice sessions through the API relay (requires VOICE_RELAY_ENABLED on the API)
+export const VOICE_AGENT_RELAY = process.env.NEXT_PUBLIC_VOICE_AGENT_RELAY === "true";
+
+export function voiceAgentRelayUrl(params: Record<string, string | undefined>): string {
+  const query = new URLSearchParams();
+  for (const [name, value] of Object.entries(params)) {
+    if (value) {
+      query.set(name, value);
+    }
+  }
+  return `${API_BASE_URL.replace(/^http/, "ws")}/api/coach/voice-agent/relay?${query}`;
+}
+
 export interface VoiceAgentConfigRequest {
   mode: "freetalk" | "pronunciation" | "situation";
   level: "beginner" | "intermediate" | "advanced";
@@ -8,6 +21,9 @@ export interface VoiceAgentConfigRequest {
 
 export interface VoiceAgentConfigResponse {
   api_key: string;
+  auth_scheme: string;
+  expires_in: number | null;
+  min_remaining?: number | null;
   prompt: string;
   greeting: string;
   voice: string;
@@ -31,3 +47,72 @@ export async function getVoiceAgentConfig(
   }
   return response.json();
 }
+
+// Whether a config fetched at `fetchedAt` can still be used to connect. The server stops
+// handing out tokens with less than `min_remaining` seconds left, so apply the same margin.
+export function isConfigFresh(
+  config: Pick<VoiceAgentConfigResponse, "expires_in" | "min_remaining">,
+  fetchedAt: number
+): boolean {
+  if (config.expires_in === null) return true;
+  const usableFor = config.expires_in - (config.min_remaining ?? 0);
+  return Date.now() - fetchedAt < usableFor * 1000;
+}
+
+// Sessions already prefetched from the scenario picker
+const prefetchedConfigs = new Set<string>();
+
+function configKey(request: VoiceAgentConfigRequest): string {
+  return `${request.mode}:${request.level}:${request.scenario ?? ""}`;
+}
+
+// Have the server compile the prompt of a session the user is likely to open next (bootstrap
+// batch endpoint). The prefetch carries no credentials; the session start fetches its own token.
+export function prefetchVoiceAgentConfig(request: VoiceAgentConfigRequest): void {
+  const key = configKey(request);
+  if (prefetchedConfigs.has(key)) return;
+  prefetchedConfigs.add(key);
+  fetch(`${API_BASE_URL}/api/coach/session/bootstrap/batch`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({ sessions: [request] }),
+  })
+    .then((response) => {
+      if (!response.ok) prefetchedConfigs.delete(key);
+    })
+    .catch(() => prefetchedConfigs.delete(key));
+}
+
+// Pre-synthesized greeting audio for the session (played while the agent connects)
+export function getGreetingAudioUrl(request: VoiceAgentConfigRequest): string {
+  const params = new URLSearchParams({ mode: request.mode, level: request.level });
+  if (request.scenario) {
+    params.set("scenario", request.scenario);
+  }
+  return `${API_BASE_URL}/api/coach/greeting-audio?${params}`;
+}
+
+export interface EndSessionRequest {
+  session_id: string;
+  mode: "freetalk" | "pronunciation" | "situation" | "script";
+  level: "beginner" | "intermediate" | "advanced";
+  scenario?: string;
+  script_id?: string;
+  duration: number;
+  messages_exchanged: number;
+  lines_completed?: number;
+}
+
+// セッション終了を記録（ページ遷移後も送信されるよう keepalive、失敗しても画面には影響させない）
+export function reportSessionEnd(request: EndSessionRequest): void {
+  fetch(`${API_BASE_URL}/api/coach/session/end`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(request),
+    keepalive: true,
+  }).catch((err) => console.warn("Failed to report session end:", err));
+}
@@ -7,8 +7,14 @@
 
 export interface VoiceAgentConfig {
   apiKey: string;
+  // "bearer" for short-lived tokens issued by the API, "token" for a raw API key
+  authScheme?: string;
   prompt: string;
   greeting: string;
+  // Pre-synthesized greeting played while the agent connects (the agent speaks it otherwise)
+  greetingAudioUrl?: string;
+  // API relay (pre-configured upstream connection); Deepgram is dialed directly when unset
+  relayUrl?: string;
   voice?: string;
   listenModel?: string;
   thinkProvider?: string;
@@ -38,6 +44,8 @@ export class DeepgramVoiceAgentClient {
   private isPlaying = false;
   private nextPlayTime = 0;
   private activeSourceNodes: AudioBufferSourceNode[] = [];
+  private settingsSent = false;
+  private greetingPlayed = false;
 
   constructor(
     private config: VoiceAgentConfig,
@@ -53,6 +61,11 @@ export class DeepgramVoiceAgentClient {
     try {
       console.log("[Deepgram] Starting connection...");
 
+      // Download the cached greeting in parallel with the microphone and WebSocket setup
+      const greetingAudio = this.config.greetingAudioUrl
+        ? this.fetchGreetingAudio(this.config.greetingAudioUrl)
+        : null;
+
       // Initialize audio context (16kHz for Deepgram compatibility)
       this.audioContext = new AudioContext({ sampleRate: 16000 });
       console.log("[Deepgram] AudioContext created, state:", this.audioContext.state);
@@ -63,6 +76,10 @@ export class DeepgramVoiceAgentClient {
         console.log("[Deepgram] AudioContext resumed");
       }
 
+      const greetingPlayback = greetingAudio
+        ? greetingAudio.then((data) => this.playGreeting(data))
+        : Promise.resolve();
+
       // Get microphone access
       console.log("[Deepgram] Requesting microphone access...");
       this.mediaStream = await navigator.mediaDevices.getUserMedia({
@@ -76,12 +93,30 @@ export class DeepgramVoiceAgentClient {
       console.log("[Deepgram] Microphone access granted");
 
       // Connect WebSocket
-      console.log("[Deepgram] Connecting to WebSocket:", DEEPGRAM_AGENT_URL);
-      this.ws = new WebSocket(DEEPGRAM_AGENT_URL, ["token", this.config.apiKey]);
+      if (this.config.relayUrl) {
+        // The relay hands over an already configured connection when the greeting is
+        // playing locally; otherwise it connects one that speaks the greeting
+        await greetingPlayback;
+        const relayUrl = new URL(this.config.relayUrl);
+        relayUrl.searchParams.set("greeting", this.greetingPlayed ? "played" : "agent");
+        console.log("[Deepgram] Connecting to relay:", relayUrl.toString());
+        this.ws = new WebSocket(relayUrl);
+      } else {
+        console.log("[Deepgram] Connecting to WebSocket:", DEEPGRAM_AGENT_URL);
+        this.ws = new WebSocket(DEEPGRAM_AGENT_URL, [
+          this.config.authScheme ?? "token",
+          this.config.apiKey,
+        ]);
+      }
 
       this.ws.onopen = () => {
         console.log("[Deepgram] WebSocket connected");
-        this.sendSettings();
+        if (this.config.relayUrl) {
+          // Settings were applied by the relay
+          this.settingsSent = true;
+        } else {
+          this.sendSettings();
+        }
         this.startKeepAlive();
         this.isConnected = true;
         this.callbacks.onConnected?.();
@@ -141,6 +176,45 @@ export class DeepgramVoiceAgentClient {
     });
   }
 
+  private async fetchGreetingAudio(url: string): Promise<ArrayBuffer | null> {
+    try {
+      const response = await fetch(url);
+      if (!response.ok) return null;
+      return await response.arrayBuffer();
+    } catch (error) {
+      console.warn("[Deepgram] Greeting audio unavailable:", error);
+      return null;
+    }
+  }
+
+  private async playGreeting(data: ArrayBuffer | null): Promise<void> {
+    // Too late once the settings are sent: the agent is already speaking the greeting
+    if (!data || !this.audioContext || this.settingsSent) return;
+    try {
+      const audioBuffer = await this.audioContext.decodeAudioData(data);
+      if (!this.audioContext || this.settingsSent) return;
+      this.greetingPlayed = true;
+
+      const source = this.audioContext.createBufferSource();
+      source.buffer = audioBuffer;
+      source.connect(this.audioContext.destination);
+      this.activeSourceNodes.push(source);
+      const startTime = Math.max(this.audioContext.currentTime, this.nextPlayTime);
+      source.start(startTime);
+      // Agent audio is queued after the greeting
+      this.nextPlayTime = startTime + audioBuffer.duration;
+      source.onended = () => {
+        const index = this.activeSourceNodes.indexOf(source);
+        if (index > -1) {
+          this.activeSourceNodes.splice(index, 1);
+        }
+      };
+      this.callbacks.onTranscript?.("agent", this.config.greeting);
+    } catch (error) {
+      console.warn("[Deepgram] Failed to play greeting audio:", error);
+    }
+  }
+
   private sendSettings(): void {
     if (!this.ws || this.ws.readyState !== WebSocket.OPEN) return;
 
@@ -177,10 +251,20 @@ export class DeepgramVoiceAgentClient {
             model: this.config.voice || "aura-2-thalia-en",
           },
         },
-        greeting: this.config.greeting,
+        // A greeting already played locally is passed as history instead of being spoken again
+        ...(this.greetingPlayed
+          ? {
+              context: {
+                messages: [
+                  { type: "History", role: "assistant", content: this.config.greeting },
+                ],
+              },
+            }
+          : { greeting: this.config.greeting }),
       },
     };
 
+    this.settingsSent = true;
     this.ws.send(JSON.stringify(settings));
     console.log("Sent settings to Deepgram Voice Agent", settings);
   }
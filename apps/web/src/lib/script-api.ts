@@ -35,6 +35,18 @@ export interface ScriptInfo {
 
 export interface ScriptsResponse {
   scripts: ScriptInfo[];
+  total: number | null;
+  next_cursor: string | null;
+}
+
+export interface ScriptQuery {
+  category?: Category;
+  difficulty?: Difficulty;
+  minMinutes?: number;
+  maxMinutes?: number;
+  q?: string;
+  limit?: number;
+  cursor?: string;
 }
 
 export interface ScriptResponse {
@@ -49,6 +61,9 @@ export interface ScriptVoiceAgentConfigRequest {
 
 export interface VoiceAgentConfigResponse {
   api_key: string;
+  auth_scheme: string;
+  expires_in: number | null;
+  min_remaining?: number | null;
   prompt: string;
   greeting: string;
   voice: string;
@@ -57,13 +72,41 @@ export interface VoiceAgentConfigResponse {
   think_model: string;
 }
 
-export async function getScripts(): Promise<ScriptInfo[]> {
-  const response = await fetch(`${API_BASE_URL}/api/coach/scripts`);
+export interface SessionBootstrapResponse {
+  script: Script | null;
+  config: VoiceAgentConfigResponse;
+}
+
+// Prefetched session: the config has no credentials (fetched when the session starts)
+export interface SessionPrefetchResponse {
+  script: Script | null;
+  config: Omit<
+    VoiceAgentConfigResponse,
+    "api_key" | "auth_scheme" | "expires_in" | "min_remaining"
+  >;
+}
+
+export interface SessionBootstrapBatchResponse {
+  sessions: (SessionPrefetchResponse | null)[];
+}
+
+export async function getScripts(query: ScriptQuery = {}): Promise<ScriptsResponse> {
+  const params = new URLSearchParams();
+  if (query.category) params.set("category", query.category);
+  if (query.difficulty) params.set("difficulty", query.difficulty);
+  if (query.minMinutes !== undefined) params.set("min_minutes", String(query.minMinutes));
+  if (query.maxMinutes !== undefined) params.set("max_minutes", String(query.maxMinutes));
+  if (query.q) params.set("q", query.q);
+  if (query.limit !== undefined) params.set("limit", String(query.limit));
+  if (query.cursor) params.set("cursor", query.cursor);
+  const search = params.toString();
+  const response = await fetch(
+    `${API_BASE_URL}/api/coach/scripts${search ? `?${search}` : ""}`
+  );
   if (!response.ok) {
     throw new Error(`Failed to fetch scripts: ${response.statusText}`);
   }
-  const data: ScriptsResponse = await response.json();
-  return data.scripts;
+  return response.json();
 }
 
 export async function getScript(scriptId: string): Promise<Script> {
@@ -90,3 +133,72 @@ export async function getScriptVoiceAgentConfig(
   }
   return response.json();
 }
+
+// Pre-synthesized greeting (first partner line) played while the agent connects
+export function getScriptGreetingAudioUrl(request: ScriptVoiceAgentConfigRequest): string {
+  const params = new URLSearchParams({
+    mode: request.mode,
+    level: request.level,
+    script_id: request.script_id,
+  });
+  return `${API_BASE_URL}/api/coach/greeting-audio?${params}`;
+}
+
+export async function getScriptSessionBootstrap(
+  request: ScriptVoiceAgentConfigRequest
+): Promise<SessionBootstrapResponse> {
+  const response = await fetch(`${API_BASE_URL}/api/coach/session/bootstrap`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(request),
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to bootstrap session: ${response.statusText}`);
+  }
+  return response.json();
+}
+
+// Sessions prefetched from the picker, taken once by the session page
+const prefetchedSessions = new Map<string, Promise<SessionPrefetchResponse | null>>();
+
+function sessionKey(request: ScriptVoiceAgentConfigRequest): string {
+  return `${request.level}:${request.script_id}`;
+}
+
+// Prefetch scripts and configs (up to 10 per request) the user is likely to open next
+export function prefetchScriptSessions(requests: ScriptVoiceAgentConfigRequest[]): void {
+  const pending = requests
+    .filter((request) => !prefetchedSessions.has(sessionKey(request)))
+    .slice(0, 10);
+  if (pending.length === 0) return;
+  const batch: Promise<SessionBootstrapBatchResponse | null> = fetch(
+    `${API_BASE_URL}/api/coach/session/bootstrap/batch`,
+    {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ sessions: pending }),
+    }
+  )
+    .then((response) => (response.ok ? response.json() : null))
+    .catch(() => null);
+  pending.forEach((request, index) => {
+    prefetchedSessions.set(
+      sessionKey(request),
+      batch.then((result) => result?.sessions[index] ?? null)
+    );
+  });
+}
+
+// Take a prefetched session (null when none was prefetched or the prefetch failed)
+export async function takePrefetchedScriptSession(
+  request: ScriptVoiceAgentConfigRequest
+): Promise<SessionPrefetchResponse | null> {
+  const key = sessionKey(request);
+  const prefetched = prefetchedSessions.get(key);
+  prefetchedSessions.delete(key);
+  return prefetched ?? null;
+}
@@ -50,3 +50,29 @@ export async function joinCallWithAgent(callId: string): Promise<JoinCallRespons
   }
   return response.json();
 }
+
+export interface DetectionUpdate {
+  call_id: string;
+  seq: number;
+  objects: {
+    name: string;
+    confidence: "high" | "medium" | "low";
+    id?: number | null;
+    box?: [number, number, number, number] | null;
+  }[];
+  timestamp: number;
+}
+
+// 通話の検出結果をSSEで購読（常に最新の全体状態が届く）
+export function subscribeDetections(
+  callId: string,
+  onUpdate: (update: DetectionUpdate) => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/call/${callId}/detections`);
+  source.addEventListener("detections", (event) => {
+    onUpdate(JSON.parse((event as MessageEvent).data));
+  });
+  // 通話が終了したら再接続しない
+  source.addEventListener("end", () => source.close());
+  return () => source.close();
+}